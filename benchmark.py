@@ -0,0 +1,542 @@
+"""Sync benchmark against local stand-ins for NetSuite, Azure DevOps and Teams.
+
+A mock server (run in its own process so it does not skew the client's numbers) serves the
+NetSuite supportCase records, the Azure DevOps wit endpoints (workitems, workitemsbatch,
+wiql, $batch) and a Teams webhook. Latency, page size, error rate and 429 throttling can be
+injected. Each scenario runs the real sync code end to end and reports requests issued,
+wall time, p50/p99 per-call latency and peak memory.
+
+    python benchmark.py --cases 1000 10000 --latency-ms 20 --error-rate 0.01 --throttle-rate 0.01
+    python benchmark.py --record-memory 100000
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+import requests
+
+import sync_core
+
+SCENARIOS = ["sync", "undo", "sync_reverse", "selected", "sync_both", "report"]  # Run in this order; undo reverts the scenario before it
+
+# Mock services
+DESCRIPTION = "Steps to reproduce, logs and customer correspondence. " * 20  # Bulk that full-record reads would carry
+class MockState:
+    """Seeded records held by the mock server."""
+
+    def __init__(self, case_count, overlap, seed):
+        rng = random.Random(seed)
+        priorities = random.Random(seed + 1)  # Separate stream, so the seeded statuses stay the same
+        now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        statuses = ["Open", "In Progress", "Closed"]
+        self.cases = {}
+        self.work_items = {}
+        for i in range(case_count):
+            case_id = str(10000 + i)
+            status = rng.choice(statuses)
+            self.cases[case_id] = {"id": case_id, "title": f"Benchmark case {i}", "status": {"name": status},
+                                   "type": "Enhancement", "company": f"Company {'ABCD'[i % 4]}", "lastModifiedDate": now,
+                                   "priority": {"name": priorities.choice(["High", "Medium", "Low"])}, "incomingMessage": DESCRIPTION}
+            if rng.random() < overlap:  # Some cases already have a work item, in some other state
+                work_item_id = len(self.work_items) + 1
+                self.work_items[work_item_id] = {"id": work_item_id, "rev": 1, "fields": {
+                    "System.Title": f"Benchmark case {i}", "System.State": rng.choice(["New", "Active", "Closed"]),
+                    "System.WorkItemType": "Enhancement", "System.ChangedDate": now, "System.Description": DESCRIPTION,
+                    "Microsoft.VSTS.Common.Priority": priorities.choice([1, 2, 3])}}
+        self.case_ids = list(self.cases)
+        self.next_work_item_id = len(self.work_items) + 1
+        self.recycle_bin = {}
+        self.lock = threading.Lock()
+        self.stats = {}
+
+    def count(self, endpoint):
+        with self.lock:
+            self.stats[endpoint] = self.stats.get(endpoint, 0) + 1
+
+    def create_work_item(self, work_item_type, patch):
+        with self.lock:
+            work_item_id = self.next_work_item_id
+            self.next_work_item_id += 1
+            fields = {"System.WorkItemType": work_item_type,
+                      "System.CreatedDate": datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')}
+            fields.update({op["path"].split("/fields/", 1)[1]: op["value"] for op in patch})
+            self.work_items[work_item_id] = {"id": work_item_id, "rev": 1, "fields": fields}
+            return self.work_items[work_item_id]
+
+    def update_work_item(self, work_item_id, patch):
+        """Apply a JSON patch. Returns the item, None if it does not exist, or False if a test op fails."""
+        with self.lock:
+            item = self.work_items.get(work_item_id)
+            if item is None:
+                return None
+            if any(op["op"] == "test" and item["rev"] != op["value"] for op in patch if op["path"] == "/rev"):
+                return False
+            for op in patch:
+                if op["op"] != "test":
+                    item["fields"][op["path"].split("/fields/", 1)[1]] = op["value"]
+            item["rev"] += 1
+            return item
+
+    def delete_work_item(self, work_item_id):
+        with self.lock:
+            item = self.work_items.pop(work_item_id, None)
+            if item is not None:
+                self.recycle_bin[work_item_id] = item
+            return item
+
+    def restore_work_item(self, work_item_id):
+        with self.lock:
+            item = self.recycle_bin.pop(work_item_id, None)
+            if item is not None:
+                item["rev"] += 1
+                self.work_items[work_item_id] = item
+            return item
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real services
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes; avoid delayed-ACK stalls
+    state = None
+    options = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, code, body=None, headers=None):
+        data = b"" if body is None else json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else None
+
+    def handle_any(self, method):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        body = self.read_json() if method in ("POST", "PATCH") else None
+        if url.path == "/_stats":
+            return self.reply(200, self.state.stats)
+
+        options = self.options
+        if options["latency"]:
+            time.sleep(options["latency"])
+        if random.random() < options["throttle_rate"]:
+            self.state.count("throttled")
+            return self.reply(429, {"message": "Too many requests"}, {"Retry-After": str(options["retry_after"])})
+        if random.random() < options["error_rate"]:
+            self.state.count("errors")
+            return self.reply(503, {"message": "Injected failure"})
+
+        for pattern, handler in ROUTES:
+            match = re.fullmatch(pattern, f"{method} {url.path}")
+            if match:
+                self.state.count(handler.__name__)
+                return handler(self, query, body, *match.groups())
+        return self.reply(404, {"message": f"No mock for {method} {url.path}"})
+
+    def do_GET(self):
+        self.handle_any("GET")
+
+    def do_POST(self):
+        self.handle_any("POST")
+
+    def do_PATCH(self):
+        self.handle_any("PATCH")
+
+    def do_DELETE(self):
+        self.handle_any("DELETE")
+
+def netsuite_list(handler, query, body):
+    limit = min(int(query.get("limit", 1000)), handler.options["page_size"])
+    offset = int(query.get("offset", 0))
+    case_ids = handler.state.case_ids
+    items = [handler.state.cases[case_id] for case_id in case_ids[offset:offset + limit]]
+    has_more = offset + limit < len(case_ids)
+    links = [{"rel": "next", "href": f"http://{handler.headers['Host']}/services/rest/record/v1/supportCase?limit={limit}&offset={offset + limit}"}] if has_more else []
+    handler.reply(200, {"items": items, "offset": offset, "count": len(items), "totalResults": len(case_ids),
+                        "hasMore": has_more, "links": links})
+
+def netsuite_suiteql(handler, query, body):
+    """Understands the conditions sync_core generates: id >, id IN, LOWER(title) IN, status =/!=, company =/IN."""
+    q = body["q"]
+    rows = [{"id": int(case["id"]), "title": case["title"], "status": case["status"]["name"], "type": case["type"],
+             "company": case["company"], "priority": case["priority"]["name"], "modified": case["lastModifiedDate"].rstrip("Z")}
+            for case in handler.state.cases.values()]
+    after = re.search(r"sc\.id > (\d+)", q)
+    if after:
+        rows = [row for row in rows if row["id"] > int(after.group(1))]
+    ids = re.search(r"sc\.id IN \(([^)]*)\)", q)
+    if ids:
+        rows = [row for row in rows if str(row["id"]) in {value.strip() for value in ids.group(1).split(",")}]
+    titles = re.search(r"LOWER\(sc\.title\) IN \((.*)\)", q)
+    if titles:
+        wanted = {title.replace("''", "'") for title in re.findall(r"'((?:[^']|'')*)'", titles.group(1))}
+        rows = [row for row in rows if row["title"].lower() in wanted]
+    for operator, value in re.findall(r"BUILTIN\.DF\(sc\.status\) (!=|=) '([^']*)'", q):
+        rows = [row for row in rows if (row["status"] == value) == (operator == "=")]
+    companies = re.search(r"BUILTIN\.DF\(sc\.company\) IN \(([^)]*)\)", q)
+    if companies:
+        names = {name.replace("''", "'") for name in re.findall(r"'((?:[^']|'')*)'", companies.group(1))}
+        rows = [row for row in rows if row["company"] in names]
+    for name in re.findall(r"BUILTIN\.DF\(sc\.company\) = '((?:[^']|'')*)'", q):
+        rows = [row for row in rows if row["company"] == name.replace("''", "'")]
+    limit = min(int(query.get("limit", 1000)), handler.options["page_size"])
+    offset = int(query.get("offset", 0))
+    handler.reply(200, {"items": rows[offset:offset + limit], "offset": offset, "count": len(rows[offset:offset + limit]),
+                        "totalResults": len(rows), "hasMore": offset + limit < len(rows)})
+
+def netsuite_get(handler, query, body, case_id):
+    case = handler.state.cases.get(case_id)
+    handler.reply(200 if case else 404, case or {"message": "No such case"})
+
+def netsuite_update(handler, query, body, case_id):
+    case = handler.state.cases.get(case_id)
+    if case is None:
+        return handler.reply(404, {"message": "No such case"})
+    case.update(body)
+    handler.reply(204)
+
+def azure_list(handler, query, body):
+    top = min(int(query.get("$top", 200)), handler.options["page_size"])
+    start = int(query.get("continuationToken", 0))
+    with handler.state.lock:
+        items = list(handler.state.work_items.values())
+    headers = {"x-ms-continuationtoken": str(start + top)} if start + top < len(items) else {}
+    handler.reply(200, {"count": len(items[start:start + top]), "value": items[start:start + top]}, headers)
+
+def azure_create(handler, query, body, work_item_type="Task"):
+    handler.reply(200, handler.state.create_work_item(work_item_type, body))
+
+def azure_update(handler, query, body, work_item_id):
+    item = handler.state.update_work_item(int(work_item_id), body)
+    if item is False:
+        return handler.reply(412, {"message": "Revision mismatch"})
+    handler.reply(200 if item else 404, item or {"message": "No such work item"})
+
+def azure_delete(handler, query, body, work_item_id):
+    item = handler.state.delete_work_item(int(work_item_id))
+    handler.reply(204 if item else 404)
+
+def azure_restore(handler, query, body, work_item_id):
+    item = handler.state.restore_work_item(int(work_item_id))
+    handler.reply(200 if item else 404, {"id": int(work_item_id)} if item else {"message": "Not in the recycle bin"})
+
+def azure_read_batch(handler, query, body):
+    items = [handler.state.work_items.get(work_item_id) for work_item_id in body["ids"]]
+    if body.get("fields"):
+        items = [item and dict(item, fields={name: value for name, value in item["fields"].items() if name in body["fields"]})
+                 for item in items]
+    handler.reply(200, {"count": len(items), "value": items})
+
+def azure_wiql(handler, query, body):
+    with handler.state.lock:
+        items = list(handler.state.work_items.values())
+    wiql = body["query"]
+    titles = set(re.findall(r"'((?:[^']|'')*)'", wiql.split("[System.Title] IN", 1)[1].split(")", 1)[0])) if "[System.Title] IN" in wiql else None
+    if titles is not None:
+        titles = {title.replace("''", "'") for title in titles}
+        items = [item for item in items if item["fields"]["System.Title"] in titles]
+    state = re.search(r"\[System\.State\] = '([^']*)'", wiql)
+    if state:
+        items = [item for item in items if item["fields"]["System.State"] == state.group(1)]
+    created = re.search(r"\[System\.CreatedDate\] >= '([^']*)'", wiql)
+    if created:
+        items = [item for item in items if item["fields"].get("System.CreatedDate", "") >= created.group(1)]
+    after = re.search(r"\[System\.Id\] > (\d+)", wiql)
+    if after:
+        items = [item for item in items if item["id"] > int(after.group(1))]
+    items.sort(key=lambda item: item["id"])
+    top = int(query.get("$top", 20000))
+    handler.reply(200, {"workItems": [{"id": item["id"]} for item in items[:top]]})
+
+def azure_write_batch(handler, query, body):
+    results = []
+    for request in body:
+        path = request["uri"].split("?", 1)[0]
+        create = re.fullmatch(r"/[^/]+/_apis/wit/workitems/\$(.+)", path)
+        existing = re.fullmatch(r"/_apis/wit/workitems/(\d+)", path)
+        if create:
+            item = handler.state.create_work_item(unquote(create.group(1)), request["body"])
+        elif existing and request["method"] == "DELETE":
+            item = handler.state.delete_work_item(int(existing.group(1)))
+        elif existing:
+            item = handler.state.update_work_item(int(existing.group(1)), request["body"])
+        else:
+            item = None
+        results.append({"code": 412 if item is False else 200 if item else 404, "headers": {}, "body": json.dumps(item or {})})
+    handler.reply(200, {"count": len(results), "value": results})
+
+def teams_post(handler, query, body):
+    handler.reply(200, {})
+
+ROUTES = [
+    (r"GET /services/rest/record/v1/supportCase", netsuite_list),
+    (r"POST /services/rest/query/v1/suiteql", netsuite_suiteql),
+    (r"GET /services/rest/record/v1/supportCase/([^/]+)", netsuite_get),
+    (r"PATCH /services/rest/record/v1/supportCase/([^/]+)", netsuite_update),
+    (r"GET /[^/]+/[^/]+/_apis/wit/workitems", azure_list),
+    (r"POST /[^/]+/[^/]+/_apis/wit/workitems/\$(.+)", azure_create),
+    (r"POST /[^/]+/[^/]+/_apis/wit/workitems", azure_create),
+    (r"PATCH /[^/]+/[^/]+/_apis/wit/workitems/(\d+)", azure_update),
+    (r"DELETE /[^/]+/[^/]+/_apis/wit/workitems/(\d+)", azure_delete),
+    (r"PATCH /[^/]+/[^/]+/_apis/wit/recyclebin/(\d+)", azure_restore),
+    (r"POST /[^/]+/[^/]+/_apis/wit/workitemsbatch", azure_read_batch),
+    (r"POST /[^/]+/[^/]+/_apis/wit/wiql", azure_wiql),
+    (r"POST /[^/]+/_apis/wit/\$batch", azure_write_batch),
+    (r"POST /teams", teams_post),
+]
+
+def run_mock_server(port_queue, case_count, overlap, seed, options):
+    """Process target: seed the mock state, serve it and report the port back."""
+    MockHandler.state = MockState(case_count, overlap, seed)
+    MockHandler.options = options
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+    server.daemon_threads = True
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+def start_mock_server(case_count, overlap=0.5, seed=1, latency=0.0, page_size=1000, error_rate=0.0,
+                      throttle_rate=0.0, retry_after=1):
+    """Start the mock services in a child process. Returns (process, base URL)."""
+    options = {"latency": latency, "page_size": page_size, "error_rate": error_rate,
+               "throttle_rate": throttle_rate, "retry_after": retry_after}
+    port_queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_mock_server, args=(port_queue, case_count, overlap, seed, options), daemon=True)
+    process.start()
+    return process, f"http://127.0.0.1:{port_queue.get(timeout=600)}"
+
+# Measurement
+class CallRecorder:
+    """request_listeners hook collecting per-call latencies."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.durations = []
+        self.statuses = {}
+
+    def __call__(self, service, method, url, status, seconds):
+        with self.lock:
+            self.durations.append(seconds)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+def run_scenario_steps(name):
+    if name == "sync":
+        sync_core.selected_cases.clear()
+        sync_core.run_sync(sync_core.NETSUITE_TO_AZURE, full=True)
+    elif name == "sync_reverse":
+        sync_core.selected_cases.clear()
+        sync_core.run_sync(sync_core.AZURE_TO_NETSUITE, full=True)
+    elif name == "sync_both":
+        sync_core.selected_cases.clear()
+        sync_core.run_sync(sync_core.BIDIRECTIONAL, full=True)
+    elif name == "selected":
+        cases = list(sync_core.get_store().iter_netsuite_cases())
+        sync_core.run_selected_sync(sync_core.NETSUITE_TO_AZURE, cases[:max(1, len(cases) // 10)])
+    elif name == "undo":
+        sync_core.run_undo()
+    elif name == "report":
+        sync_core.sync_log.clear()  # Not a run of its own, so nothing else resets the log
+        with tempfile.TemporaryDirectory() as directory:
+            sync_core.export_company_report([f"Company {letter}" for letter in "ABCD"], os.path.join(directory, "report.csv.gz"))
+    else:
+        raise ValueError(f"Unknown scenario: {name}")
+    sync_core.flush_notifications()  # Count the Teams digests in the scenario that queued them
+
+def run_scenario(name, trace_memory=False):
+    """Run one scenario through the sync core and return its measurements."""
+    recorder = CallRecorder()
+    sync_core.request_listeners.append(recorder)
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # Drop per-item progress prints
+            run_scenario_steps(name)
+        wall = time.perf_counter() - started
+    finally:
+        sync_core.request_listeners.remove(recorder)
+        peak_traced = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "requests": len(recorder.durations),
+        "statuses": {str(status): count for status, count in sorted(recorder.statuses.items(), key=str)},
+        "wall_seconds": round(wall, 3),
+        "p50_ms": round(percentile(recorder.durations, 0.50) * 1000, 2),
+        "p99_ms": round(percentile(recorder.durations, 0.99) * 1000, 2),
+        "changes": len(sync_core.sync_log),
+        "errors": len(sync_core.run_errors),
+        "peak_traced_mb": round(peak_traced / 2**20, 1) if peak_traced is not None else None,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),  # Process-wide, so it only grows
+        "phases": {name: round(totals["seconds"], 3) for name, totals in sync_core.run_metrics.summary()["phases"].items()},
+    }
+
+def run_benchmark(case_count, scenarios, latency=0.0, page_size=1000, error_rate=0.0, throttle_rate=0.0,
+                  retry_after=1, overlap=0.5, trace_memory=False, settings=None):
+    """Seed a fresh mock server with case_count cases and run the scenarios against it in order."""
+    process, base_url = start_mock_server(case_count, overlap, latency=latency, page_size=page_size,
+                                          error_rate=error_rate, throttle_rate=throttle_rate, retry_after=retry_after)
+    store_dir = tempfile.mkdtemp(prefix="synctool-bench-")
+    saved_config = dict(sync_core.config)
+    try:
+        sync_core.config.update({
+            "netsuite_base_url": base_url, "azure_base_url": base_url, "teams_webhook_url": f"{base_url}/teams",
+            "netsuite_account": "BENCH", "netsuite_consumer_key": "bench", "netsuite_consumer_secret": "bench",
+            "netsuite_token_key": "bench", "netsuite_token_secret": "bench", "azure_org": "bench", "azure_project": "bench", "azure_pat": "bench",
+            "local_store_path": os.path.join(store_dir, "bench.db"), "teams_spill_path": '',
+            "netsuite_page_size": page_size, "azure_page_size": min(page_size, 200),
+        })
+        for key, value in (settings or {}).items():
+            sync_core.config[key] = sync_core.coerce_config_value(key, value)
+        sync_core.reset_clients()
+        sync_core.local_store = None
+        sync_core.error_handler = lambda title, message: None  # Counted in run_errors instead
+        results = []
+        for name in scenarios:
+            result = run_scenario(name, trace_memory)
+            result["cases"] = case_count
+            results.append(result)
+        results.append({"cases": case_count, "server_stats": requests.get(f"{base_url}/_stats", timeout=30).json()})
+        return results
+    finally:
+        sync_core.config.clear()
+        sync_core.config.update(saved_config)
+        sync_core.reset_clients()
+        sync_core.local_store = None
+        sync_core.error_handler = None
+        process.terminate()
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+# Record memory: what holding normalized cases and work items costs, as plain dicts (before) and as records
+def dict_netsuite_case(row):
+    """A case as the sync held it before records: one dict per case, strings as parsed."""
+    return {"id": str(row["id"]), "title": row["title"], "status": row["status"], "type": row.get("type") or "Enhancement",
+            "modified": row.get("modified")}
+
+def dict_azure_work_item(item):
+    return {"id": item["id"], "title": item["fields"]["System.Title"], "status": item["fields"]["System.State"],
+            "external_id": None, "type": item["fields"].get("System.WorkItemType"), "rev": item.get("rev"),
+            "modified": item["fields"].get("System.ChangedDate")}
+
+def record_pages(kind, count, page_size=1000):
+    """Yield JSON pages of count SuiteQL rows or workitemsbatch items, as the services send them."""
+    rng = random.Random(1)
+    for start in range(0, count, page_size):
+        if kind == "netsuite_cases":
+            page = [{"id": 10000 + i, "title": f"Benchmark case {i}", "status": rng.choice(["Open", "In Progress", "Closed"]),
+                     "type": "Enhancement", "modified": f"2024-05-{1 + i % 28:02d}T12:00:00"}
+                    for i in range(start, min(start + page_size, count))]
+        else:
+            page = [{"id": i + 1, "rev": 1, "fields": {"System.Title": f"Benchmark case {i}",
+                                                        "System.State": rng.choice(["New", "Active", "Closed"]),
+                                                        "System.WorkItemType": "Enhancement",
+                                                        "System.ChangedDate": f"2024-05-{1 + i % 28:02d}T12:00:00Z"}}
+                    for i in range(start, min(start + page_size, count))]
+        yield json.dumps(page)
+
+def measure_record_memory(count):
+    """Bytes held per 100k normalized records, for dicts and for the sync's records."""
+    normalizers = {
+        "netsuite_cases": {"dict": dict_netsuite_case, "record": sync_core.normalize_netsuite_case},
+        "azure_work_items": {"dict": dict_azure_work_item, "record": sync_core.normalize_azure_work_item},
+    }
+    results = []
+    for kind, by_representation in normalizers.items():
+        for representation, normalize in by_representation.items():
+            tracemalloc.start()
+            records = []
+            for page in record_pages(kind, count):
+                records.extend(normalize(row) for row in json.loads(page))
+            held = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            results.append({"records": kind, "representation": representation, "count": len(records),
+                            "mb_per_100k": round(held / len(records) * 100000 / 2**20, 1)})
+            del records
+    return results
+
+def print_table(results):
+    columns = ["cases", "scenario", "requests", "wall_seconds", "p50_ms", "p99_ms", "changes", "errors", "peak_traced_mb", "peak_rss_mb"]
+    print_rows(columns, [result for result in results if "scenario" in result])
+
+def print_rows(columns, results):
+    rows = [[str(result.get(column, "")) for column in columns] for result in results]
+    widths = [max(len(column), *(len(row[i]) for row in rows)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(width) for column, width in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark syncs against local mock NetSuite/Azure/Teams servers.")
+    parser.add_argument("--cases", type=int, nargs="+", default=[1000], help="Case counts to seed, e.g. 1000 10000 100000.")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--latency-ms", type=float, default=0, help="Latency added to every mock response.")
+    parser.add_argument("--page-size", type=int, default=1000, help="Largest page the mock servers return.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 503.")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429.")
+    parser.add_argument("--retry-after", type=float, default=1, help="Retry-After seconds sent with 429s.")
+    parser.add_argument("--overlap", type=float, default=0.5, help="Fraction of cases that already have a work item.")
+    parser.add_argument("--trace-memory", action="store_true", help="Report tracemalloc peaks (slower).")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a sync setting, e.g. --set netsuite_requests_per_second=0 to lift rate limits.")
+    parser.add_argument("--record-memory", type=int, metavar="COUNT",
+                        help="Instead of the scenarios, compare the memory COUNT cases and work items take as dicts and as records.")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+    args = parser.parse_args(argv)
+
+    if args.record_memory:
+        results = measure_record_memory(args.record_memory)
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            print_rows(["records", "representation", "count", "mb_per_100k"], results)
+        return 0
+
+    settings = {}
+    for item in args.set:
+        key, _, value = item.partition("=")
+        if key not in sync_core.config:
+            parser.error(f"Unknown setting: {key}")
+        settings[key] = value
+
+    results = []
+    for case_count in args.cases:
+        results.extend(run_benchmark(case_count, args.scenarios, latency=args.latency_ms / 1000, page_size=args.page_size,
+                                     error_rate=args.error_rate, throttle_rate=args.throttle_rate,
+                                     retry_after=args.retry_after, overlap=args.overlap, trace_memory=args.trace_memory,
+                                     settings=settings))
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
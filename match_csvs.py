@@ -1,278 +1,71 @@
 import tkinter as tk
 from tkinter import messagebox, Toplevel, Label, Listbox, Scrollbar, RIGHT, Y, LEFT, BOTH, Frame, Radiobutton, IntVar, Checkbutton, BooleanVar
-import requests
+from tkinter import font as tkfont
+from tkinter import filedialog
+import queue
 import threading
-
-# Status mapping between Azure DevOps and NetSuite by ticket type
-ticket_type_mapping = {
-    "Enhancement": {
-        "New": "Open",
-        "Active": "In Progress",
-        "Resolved": "Resolved",
-        "Closed": "Closed"
-    },
-    "Bug": {
-        "New": "Open",
-        "Active": "In Progress",
-        "Resolved": "Fixed",
-        "Closed": "Closed"
-    },
-    "User Story": {
-        "New": "Open",
-        "Active": "In Progress",
-        "Resolved": "Completed",
-        "Closed": "Closed"
-    }
-}
-
-# Reverse mapping for syncing in the opposite direction
-reverse_ticket_type_mapping = {
-    ticket_type: {v: k for k, v in status_mapping.items()} 
-    for ticket_type, status_mapping in ticket_type_mapping.items()
-}
-
-# Default configurations (replace with your actual values or leave blank)
-config = {
-    "netsuite_account": '',
-    "netsuite_consumer_key": '',
-    "netsuite_consumer_secret": '',
-    "netsuite_token_key": '',
-    "netsuite_token_secret": '',
-    "azure_org": '',
-    "azure_project": '',
-    "azure_pat": '',
-    "teams_webhook_url": '',  # Add Teams webhook URL here
-    "teams_notifications_enabled": True  # Initial state for Teams notifications
-}
-
-# Global log list to track sync changes and their original states for undo
-sync_log = []
-undo_actions = []
-selected_cases = []
-
-def enable_teams_notifications():
-    config["teams_notifications_enabled"] = True
-    print("Teams notifications enabled.")
-
-def disable_teams_notifications():
-    config["teams_notifications_enabled"] = False
-    print("Teams notifications disabled.")
-
-def post_to_teams(case, status):
-    if not config["teams_notifications_enabled"]:
-        print("Teams notifications are disabled.")
-        return
-
-    if not config["teams_webhook_url"]:
-        print("Teams webhook URL not configured.")
-        return
-
-    message = {
-        "text": f"Ticket ID: {case['id']} | Title: {case['title']} | Status: {status} has been updated in Azure DevOps."
-    }
-    
-    response = requests.post(config["teams_webhook_url"], json=message)
-    if response.status_code == 200:
-        print("Posted update to Teams successfully.")
-    else:
-        print(f"Failed to post update to Teams: {response.status_code}, {response.text}")
-
-def map_status(ticket_type, status):
-    """Map status based on ticket type."""
-    if ticket_type in ticket_type_mapping:
-        return ticket_type_mapping[ticket_type].get(status, "Open")
-    else:
-        return ticket_type_mapping["Enhancement"].get(status, "Open")  # Default to Enhancement
-
-def reverse_map_status(ticket_type, status):
-    """Map status in reverse direction based on ticket type."""
-    if ticket_type in reverse_ticket_type_mapping:
-        return reverse_ticket_type_mapping[ticket_type].get(status, "New")
-    else:
-        return reverse_ticket_type_mapping["Enhancement"].get(status, "New")  # Default to Enhancement
-
-def fetch_netsuite_cases():
-    try:
-        url = f'https://YOUR_ACCOUNT.suitetalk.api.netsuite.com/services/rest/record/v1/supportCase'
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {config["netsuite_token_key"]}'
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        cases = response.json().get('items', [])
-        return [{"id": case["id"], "title": case["title"], "status": case["status"]["name"], "type": case.get("type", "Enhancement")} for case in cases]
-    except requests.exceptions.RequestException as e:
-        messagebox.showerror("Fetch Error", f"Failed to fetch NetSuite cases: {str(e)}")
-        return []
-
-def fetch_azure_work_items():
-    try:
-        url = f'https://dev.azure.com/{config["azure_org"]}/{config["azure_project"]}/_apis/wit/workitems?api-version=6.0'
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Basic {config["azure_pat"]}'
-        }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        work_items = response.json().get('value', [])
-        return [{"id": item["id"], "title": item["fields"]["System.Title"], "status": item["fields"]["System.State"]} for item in work_items]
-    except requests.exceptions.RequestException as e:
-        messagebox.showerror("Fetch Error", f"Failed to fetch Azure DevOps work items: {str(e)}")
-        return []
-
-def create_or_update_azure_work_item(case):
-    work_item = None
-    azure_work_items = fetch_azure_work_items()
-    for item in azure_work_items:
-        if item['title'] == case['title']:
-            work_item = item
+import sync_core
+from sync_core import (config, sync_log, selected_cases, enable_teams_notifications, disable_teams_notifications,
+                       reset_clients, get_store, iter_netsuite_cases, iter_azure_work_items,
+                       export_company_report, run_sync, run_selected_sync, run_undo)
+
+# Tk is not thread-safe: worker threads queue their dialogs, and process_ui_queue shows them on the Tk thread
+ui_calls = queue.Queue()
+queued_errors = queue.Queue()
+MAX_ERRORS_SHOWN = 10
+
+def queue_error(title, message):
+    """sync_core.error_handler: called from pool and batch threads, several at a time."""
+    queued_errors.put((title, message))
+
+def process_ui_queue(window):
+    """Show the errors and run the calls queued by worker threads, then check again shortly."""
+    errors = []
+    while True:
+        try:
+            errors.append(queued_errors.get_nowait())
+        except queue.Empty:
             break
+    if len(errors) == 1:
+        messagebox.showerror(*errors[0])
+    elif errors:  # One dialog for a burst of per-item errors
+        lines = [f"{title}: {message}" for title, message in errors[:MAX_ERRORS_SHOWN]]
+        if len(errors) > MAX_ERRORS_SHOWN:
+            lines.append(f"... and {len(errors) - MAX_ERRORS_SHOWN} more.")
+        messagebox.showerror(f"{len(errors)} Errors", "\n".join(lines))
+    while True:
+        try:
+            func, args = ui_calls.get_nowait()
+        except queue.Empty:
+            break
+        func(*args)
+    window.after(200, process_ui_queue, window)
 
-    ticket_type = case.get('type', 'Enhancement')  # Assume Enhancement if not specified
-    mapped_status = reverse_map_status(ticket_type, case['status'])
-
-    if work_item:
-        if case['status'] == 'Closed' and work_item['status'] != 'Closed':
-            original_state = work_item['status']
-            update_azure_work_item_status(work_item['id'], mapped_status)
-            undo_actions.append(("azure", work_item['id'], "System.State", original_state))
-            sync_log.append(f"Azure Work Item {work_item['id']} updated to {mapped_status} due to NetSuite case {case['id']} status change.")
-            post_to_teams(work_item, mapped_status)
-    else:
-        create_azure_work_item(case)
-
-def create_azure_work_item(case):
-    url = f'https://dev.azure.com/{config["azure_org"]}/{config["azure_project"]}/_apis/wit/workitems?api-version=6.0'
-    headers = {
-        'Content-Type': 'application/json-patch+json',
-        'Authorization': f'Basic {config["azure_pat"]}'
-    }
-
-    ticket_type = case.get('type', 'Enhancement')  # Assume Enhancement if not specified
-    mapped_status = reverse_map_status(ticket_type, case['status'])
-
-    data = [
-        {"op": "add", "path": "/fields/System.Title", "value": case['title']},
-        {"op": "add", "path": "/fields/System.State", "value": mapped_status}
-    ]
-    
-    response = requests.post(url, json=data, headers=headers)
-    if response.status_code == 200:
-        work_item_id = response.json().get('id')
-        undo_actions.append(("azure_delete", work_item_id))  # Track creation for possible deletion
-        sync_log.append(f"Azure Work Item {work_item_id} created with status {mapped_status} for NetSuite case {case['id']}.")
-        post_to_teams(case, mapped_status)
-    else:
-        print(f"Failed to create work item: {response.status_code}, {response.text}")
-
-def update_azure_work_item_status(work_item_id, status):
-    try:
-        url = f'https://dev.azure.com/{config["azure_org"]}/{config["azure_project"]}/_apis/wit/workitems/{work_item_id}?api-version=6.0'
-        headers = {
-            'Content-Type': 'application/json-patch+json',
-            'Authorization': f'Basic {config["azure_pat"]}'
-        }
-        
-        data = [
-            {"op": "add", "path": "/fields/System.State", "value": status}
-        ]
-        
-        response = requests.patch(url, json=data, headers=headers)
-        response.raise_for_status()
-        sync_log.append(f"Azure Work Item {work_item_id} updated to {status}.")
-    except requests.exceptions.RequestException as e:
-        messagebox.showerror("Update Error", f"Failed to update Azure Work Item {work_item_id}: {str(e)}")
-
-def update_netsuite_case_status(case_id, status):
+def sync_cases(direction, full=False):
+    """Runs on a worker thread; the result is shown on the Tk thread."""
     try:
-        ticket_type = "Enhancement"  # You can pass the actual ticket type if available
-        mapped_status = map_status(ticket_type, status)
-        
-        url = f'https://YOUR_ACCOUNT.suitetalk.api.netsuite.com/services/rest/record/v1/supportCase/{case_id}'
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Bearer {config["netsuite_token_key"]}'
-        }
-        
-        data = {"status": {"name": mapped_status}}
-        
-        response = requests.patch(url, json=data, headers=headers)
-        response.raise_for_status()
-        undo_actions.append(("netsuite", case_id, "status", "Open" if mapped_status == "Closed" else "Closed"))
-        sync_log.append(f"NetSuite case {case_id} updated to {mapped_status} due to Azure Work Item status change.")
-    except requests.exceptions.RequestException as e:
-        messagebox.showerror("Update Error", f"Failed to update NetSuite case {case_id}: {str(e)}")
-
-def sync_cases():
-    try:
-        sync_log.clear()  # Clear the log before starting a new sync
-        undo_actions.clear()  # Clear undo actions list before a new sync
-        
-        if sync_direction.get() == 1:  # NetSuite to DevOps
-            netsuite_cases = fetch_netsuite_cases()
-            for case in netsuite_cases:
-                create_or_update_azure_work_item(case)
-        elif sync_direction.get() == 2:  # DevOps to NetSuite
-            azure_work_items = fetch_azure_work_items()
-            for work_item in azure_work_items:
-                corresponding_case = next((c for c in selected_cases if c['title'] == work_item['title']), None)
-                if corresponding_case:
-                    if work_item['status'] == 'Closed' and corresponding_case['status'] != 'Closed':
-                        update_netsuite_case_status(corresponding_case['id'], work_item['status'])
-
-        show_sync_result("Sync Complete", "The sync process has completed successfully.")
+        run_sync(direction, full)
+        ui_calls.put((show_sync_result, ("Sync Complete", "The sync process has completed successfully.")))
     except Exception as e:
-        show_sync_result("Sync Failed", f"An error occurred during sync: {str(e)}")
+        ui_calls.put((show_sync_result, ("Sync Failed", f"An error occurred during sync: {str(e)}")))
 
-def sync_selected_cases():
+def sync_selected_cases(direction):
+    """Runs on a worker thread; the result is shown on the Tk thread."""
     try:
-        sync_log.clear()  # Clear the log before starting a new sync
-        undo_actions.clear()  # Clear undo actions list before a new sync
-
-        show_loading_screen()  # Show loading screen only after selection
-
-        if sync_direction.get() == 1:  # NetSuite to DevOps
-            for case in selected_cases:
-                create_or_update_azure_work_item(case)
-        elif sync_direction.get() == 2:  # DevOps to NetSuite
-            for case in selected_cases:
-                update_netsuite_case_status(case['id'], 'Closed')  # Example logic, adjust as needed
-
-        show_sync_result("Sync Complete", "The selected cases have been synced successfully.")
+        run_selected_sync(direction, selected_cases)
+        ui_calls.put((show_sync_result, ("Sync Complete", "The selected cases have been synced successfully.")))
     except Exception as e:
-        show_sync_result("Sync Failed", f"An error occurred during sync: {str(e)}")
+        ui_calls.put((show_sync_result, ("Sync Failed", f"An error occurred during sync: {str(e)}")))
 
 def undo_sync():
     try:
-        for action in reversed(undo_actions):  # Undo in reverse order
-            if action[0] == "azure":
-                update_azure_work_item_status(action[1], action[3])
-            elif action[0] == "azure_delete":
-                delete_azure_work_item(action[1])
-            elif action[0] == "netsuite":
-                update_netsuite_case_status(action[1], action[3])
-        undo_actions.clear()
+        if run_undo() is None:
+            messagebox.showinfo("Nothing to Undo", "There are no sync changes left to undo.")
+            return
         messagebox.showinfo("Undo Successful", "The sync changes have been successfully undone.")
     except Exception as e:
         messagebox.showerror("Undo Failed", f"An error occurred while undoing sync: {str(e)}")
 
-def delete_azure_work_item(work_item_id):
-    try:
-        url = f'https://dev.azure.com/{config["azure_org"]}/{config["azure_project"]}/_apis/wit/workitems/{work_item_id}?api-version=6.0'
-        headers = {
-            'Content-Type': 'application/json',
-            'Authorization': f'Basic {config["azure_pat"]}'
-        }
-        
-        response = requests.delete(url, headers=headers)
-        if response.status_code == 204:
-            sync_log.append(f"Azure Work Item {work_item_id} deleted.")
-        else:
-            print(f"Failed to delete work item {work_item_id}: {response.status_code}, {response.text}")
-    except requests.exceptions.RequestException as e:
-        messagebox.showerror("Delete Error", f"Failed to delete Azure Work Item {work_item_id}: {str(e)}")
-
 def show_loading_screen():
     global loading_screen
     loading_screen = Toplevel()
@@ -292,7 +85,7 @@ def show_sync_result(title, message):
 def start_sync(auto_sync=True):
     if auto_sync:
         show_loading_screen()
-        threading.Thread(target=sync_cases).start()
+        threading.Thread(target=sync_cases, args=(sync_direction.get(), full_reconcile.get())).start()
     else:
         open_case_selection_window()
 
@@ -313,6 +106,8 @@ def save_config():
     else:
         disable_teams_notifications()
 
+    reset_clients()  # Reconnect with the new credentials
+
     messagebox.showinfo("Configuration Saved", "API Keys and configuration have been saved.")
 
 def open_api_settings():
@@ -383,36 +178,229 @@ def open_api_settings():
     save_button = tk.Button(settings_window, text="Save", command=save_config, font=("Arial", 14), bg="green", fg="white")
     save_button.pack(pady=20)
 
+class CaseSearchIndex:
+    """Type-ahead search over cases by ID, title or status.
+
+    Each case's searchable text is built once as its page arrives. A query that extends the
+    previous one only rescans the previous matches, and an exact ID match is listed first.
+    """
+
+    def __init__(self):
+        self.texts = []  # Lower-cased "id, title, status" per case, in fetch order
+        self.by_id = {}
+        self.query = ""
+        self.matches = None  # Case indexes matching query, or None when unfiltered
+
+    def add(self, new_cases):
+        start = len(self.texts)
+        for case in new_cases:
+            self.by_id.setdefault(str(case['id']).casefold(), len(self.texts))
+            self.texts.append(f"{case['id']}\t{case['title']}\t{case['status']}".casefold())
+        if self.matches is not None:
+            self.matches.extend(i for i in range(start, len(self.texts)) if self.query in self.texts[i])
+
+    def search(self, query):
+        query = query.strip().casefold()
+        if not query:
+            self.query, self.matches = "", None
+            return
+        if self.matches is not None and query.startswith(self.query):
+            candidates = self.matches
+        else:
+            candidates = range(len(self.texts))
+        matches = [i for i in candidates if query in self.texts[i]]
+        exact = self.by_id.get(query)
+        if exact is not None and exact in matches[1:]:
+            matches.remove(exact)
+            matches.insert(0, exact)
+        self.query, self.matches = query, matches
+
+class VirtualCaseList:
+    """Listbox that only materializes the rows in view.
+
+    The rows to show are case indexes; the listbox holds just a screenful of lines and is
+    redrawn from the visible slice as it scrolls. Selection is a set of case indexes, so
+    it survives filtering and its count covers hidden rows too.
+    """
+
+    def __init__(self, parent, cases, on_selection_change, **listbox_options):
+        self.cases = cases
+        self.rows = []
+        self.top = 0
+        self.selected = set()
+        self.on_selection_change = on_selection_change
+
+        self.scrollbar = Scrollbar(parent, command=self.on_scroll)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.listbox = Listbox(parent, selectmode=tk.MULTIPLE, activestyle="none", **listbox_options)
+        self.listbox.pack(side=LEFT, fill=BOTH, expand=True)
+        self.line_height = tkfont.Font(font=self.listbox.cget("font")).metrics("linespace") + 1
+
+        self.listbox.bind("<Button-1>", self.on_click)
+        self.listbox.bind("<B1-Motion>", lambda event: "break")  # No drag-selection across redraws
+        self.listbox.bind("<MouseWheel>", lambda event: self.scroll_to(self.top - 3 * (1 if event.delta > 0 else -1)))
+        self.listbox.bind("<Button-4>", lambda event: self.scroll_to(self.top - 3))  # X11 wheel
+        self.listbox.bind("<Button-5>", lambda event: self.scroll_to(self.top + 3))
+        self.listbox.bind("<Configure>", lambda event: self.redraw())
+
+    def visible_count(self):
+        return max(1, self.listbox.winfo_height() // self.line_height)
+
+    def show(self, cases, rows, keep_position=False):
+        self.cases = cases
+        self.rows = rows
+        if not keep_position:
+            self.top = 0
+        self.redraw()
+
+    def scroll_to(self, top):
+        self.top = top
+        self.redraw()
+        return "break"
+
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.rows)))
+        else:
+            self.scroll_to(self.top + int(amount) * (self.visible_count() if unit == "pages" else 1))
+
+    def on_click(self, event):
+        position = self.top + self.listbox.nearest(event.y)
+        if position < len(self.rows):
+            self.selected.symmetric_difference_update({self.rows[position]})
+            self.redraw()
+            self.on_selection_change()
+        return "break"
+
+    def select_rows(self, select):
+        if select:
+            self.selected.update(self.rows)
+        else:
+            self.selected.difference_update(self.rows)
+        self.redraw()
+        self.on_selection_change()
+
+    def redraw(self):
+        count = self.visible_count()
+        self.top = max(0, min(self.top, len(self.rows) - count))
+        visible = self.rows[self.top:self.top + count]
+        self.listbox.delete(0, tk.END)
+        self.listbox.insert(tk.END, *(f"Case {self.cases[i]['id']}: {self.cases[i]['title']} ({self.cases[i]['status']})" for i in visible))
+        for position, case_index in enumerate(visible):
+            if case_index in self.selected:
+                self.listbox.selection_set(position)
+        total = len(self.rows)
+        self.scrollbar.set(self.top / total if total else 0.0, (self.top + len(visible)) / total if total else 1.0)
+
+def read_cases_in_background(source, pages, stop, page_size=500):
+    """Iterate source() on a worker thread, putting lists of cases on the pages queue.
+
+    An exception is put on the queue in place of a page, and None marks the end.
+    """
+    def read():
+        page = []
+        try:
+            for case in source():
+                if stop.is_set():
+                    break
+                page.append(case)
+                if len(page) >= page_size:
+                    pages.put(page)
+                    page = []
+            pages.put(page)
+        except Exception as e:
+            pages.put(e)
+        pages.put(None)
+
+    threading.Thread(target=read, daemon=True).start()
+
 def open_case_selection_window():
     global cases  # Declare cases as a global variable
     cases = []  # Initialize cases as an empty list
+    fetch_state = {"stop": threading.Event(), "after_id": None}
+    search_index = CaseSearchIndex()
 
     def fetch_cases():
         global cases  # Refer to the global cases variable
+        nonlocal search_index
         # Fetch cases based on the selected source
-        if fetch_source.get() == 1:  # NetSuite
-            cases = fetch_netsuite_cases()
+        if use_local_mirror.get():  # Served from the local mirror without touching the network
+            source = get_store().iter_netsuite_cases if fetch_source.get() == 1 else get_store().iter_azure_work_items
+        elif fetch_source.get() == 1:  # NetSuite
+            source = iter_netsuite_cases
         else:  # Azure DevOps
-            cases = fetch_azure_work_items()
-
-        if not cases:  # Check if no cases were fetched
+            source = iter_azure_work_items
+
+        stop_fetch()  # A new fetch replaces one still running
+        fetch_state["stop"] = threading.Event()
+        cases = []
+        search_index = CaseSearchIndex()
+        search_index.search(filter_var.get())
+        case_list.selected.clear()
+        show_cases()
+        update_selected_count()
+        total_cases_label.config(text="Fetching cases...")
+
+        pages = queue.Queue()
+        read_cases_in_background(source, pages, fetch_state["stop"])
+        fetch_state["after_id"] = selection_window.after(50, add_fetched_pages, pages)
+
+    def add_fetched_pages(pages, max_pages=20):
+        """Move pages from the fetch thread into the list; runs on the Tk thread via after()."""
+        fetch_state["after_id"] = None
+        done = False
+        arrived = []
+        for _ in range(max_pages):  # Bounded per tick so the window stays responsive
+            try:
+                page = pages.get_nowait()
+            except queue.Empty:
+                break
+            if page is None:
+                done = True
+                break
+            if isinstance(page, Exception):
+                messagebox.showerror("Fetch Failed", f"Failed to fetch cases: {page}")
+                continue
+            arrived.extend(page)
+
+        if arrived:
+            cases.extend(arrived)
+            search_index.add(arrived)
+            show_cases(keep_position=True)
+        total_cases_label.config(text=f"Total Cases Fetched: {len(cases)}" + ("" if done else " (loading...)"))
+
+        if not done:
+            fetch_state["after_id"] = selection_window.after(50, add_fetched_pages, pages)
+        elif not cases:  # Check if no cases were fetched
             messagebox.showerror("Fetch Failed", "No cases were found from the selected source.")
-            return
 
-        # Clear the listbox and repopulate it with the fetched cases
-        case_listbox.delete(0, tk.END)
-        for i, case in enumerate(cases):
-            case_listbox.insert(tk.END, f"Case {case['id']}: {case['title']} ({case['status']})")
+    def stop_fetch():
+        fetch_state["stop"].set()
+        if fetch_state["after_id"] is not None:
+            selection_window.after_cancel(fetch_state["after_id"])
+            fetch_state["after_id"] = None
+
+    def show_cases(keep_position=False):
+        rows = list(range(len(cases))) if search_index.matches is None else search_index.matches
+        case_list.show(cases, rows, keep_position)
+        shown_count_var.set(f"Showing {len(rows)} of {len(cases)}" if search_index.matches is not None else "")
 
-        # Update the total cases label
-        total_cases_label.config(text=f"Total Cases Fetched: {len(cases)}")
-        selected_count_var.set(f"Selected: 0")
+    def apply_filter():
+        fetch_state["filter_after_id"] = None
+        search_index.search(filter_var.get())
+        show_cases()
+
+    def schedule_filter(*args):
+        if fetch_state.get("filter_after_id"):
+            selection_window.after_cancel(fetch_state["filter_after_id"])
+        fetch_state["filter_after_id"] = selection_window.after(150, apply_filter)  # Wait for a pause in typing
 
     # Window setup
     selection_window = Toplevel()
     selection_window.title("Select Cases to Sync")
-    selection_window.geometry("500x600")
+    selection_window.geometry("500x650")
     selection_window.configure(bg="#34495e")
+    selection_window.bind("<Destroy>", lambda event: stop_fetch() if event.widget is selection_window else None)
 
     # Radio buttons to select fetch source
     fetch_source = IntVar(value=1)  # Default to NetSuite
@@ -428,6 +416,9 @@ def open_case_selection_window():
     azure_rb = Radiobutton(source_frame, text="Azure DevOps", variable=fetch_source, value=2, bg="#34495e", fg="white", font=("Arial", 12))
     azure_rb.pack(side=tk.LEFT, padx=10, pady=10)
 
+    use_local_mirror = BooleanVar(value=False)
+    Checkbutton(selection_window, text="Use local copy (no network)", variable=use_local_mirror, bg="#34495e", fg="white", selectcolor="#34495e", font=("Arial", 12)).pack()
+
     # Fetch Cases Button
     fetch_button = tk.Button(selection_window, text="Fetch Cases", command=fetch_cases, bg="#2980b9", fg="white", font=("Arial", 14))
     fetch_button.pack(pady=10)
@@ -442,31 +433,37 @@ def open_case_selection_window():
     selected_count_label = Label(selection_window, textvariable=selected_count_var, bg="#34495e", fg="white", font=("Arial", 12))
     selected_count_label.pack(pady=5)
 
+    # Type-ahead filter by ID, title or status
+    filter_frame = Frame(selection_window, bg="#34495e")
+    filter_frame.pack(fill=tk.X, padx=10)
+    Label(filter_frame, text="Filter:", bg="#34495e", fg="white", font=("Arial", 12)).pack(side=LEFT)
+    filter_var = tk.StringVar()
+    filter_var.trace_add("write", schedule_filter)
+    tk.Entry(filter_frame, textvariable=filter_var, font=("Arial", 12)).pack(side=LEFT, fill=tk.X, expand=True, padx=5)
+    shown_count_var = tk.StringVar()
+    Label(filter_frame, textvariable=shown_count_var, bg="#34495e", fg="white", font=("Arial", 10)).pack(side=LEFT)
+
+    select_frame = Frame(selection_window, bg="#34495e")
+    select_frame.pack(pady=5)
+    tk.Button(select_frame, text="Select Shown", command=lambda: case_list.select_rows(True), font=("Arial", 10)).pack(side=LEFT, padx=5)
+    tk.Button(select_frame, text="Clear Shown", command=lambda: case_list.select_rows(False), font=("Arial", 10)).pack(side=LEFT, padx=5)
+
     # Create a frame to hold the listbox and scrollbar
     list_frame = Frame(selection_window)
     list_frame.pack(pady=10, fill=BOTH, expand=True)
 
-    # Add a scrollbar and listbox for displaying the cases
-    scrollbar = Scrollbar(list_frame)
-    scrollbar.pack(side=RIGHT, fill=Y)
-
-    case_listbox = Listbox(list_frame, selectmode=tk.MULTIPLE, yscrollcommand=scrollbar.set, font=("Arial", 12), bg="#ecf0f1", fg="#2c3e50", height=20)
-    case_listbox.pack(side=LEFT, fill=BOTH, expand=True)
-
-    scrollbar.config(command=case_listbox.yview)
+    # Scrollable list of the cases; only the rows in view are materialized
+    def update_selected_count():
+        selected_count_var.set(f"Selected: {len(case_list.selected)}")
 
-    # Populate the listbox with the case information
-    def update_selected_count(event):
-        selected_count_var.set(f"Selected: {len(case_listbox.curselection())}")
-
-    case_listbox.bind('<<ListboxSelect>>', update_selected_count)
+    case_list = VirtualCaseList(list_frame, cases, update_selected_count, font=("Arial", 12), bg="#ecf0f1", fg="#2c3e50", height=20)
 
     # Function to confirm selection and start the sync
     def confirm_selection():
-        global selected_cases
-        selected_cases = [cases[i] for i in case_listbox.curselection()]
+        selected_cases[:] = [cases[i] for i in sorted(case_list.selected)]
         selection_window.destroy()
-        threading.Thread(target=sync_selected_cases).start()
+        show_loading_screen()  # Show loading screen only after selection
+        threading.Thread(target=sync_selected_cases, args=(sync_direction.get(),)).start()
 
     tk.Button(selection_window, text="Sync Selected Cases", command=confirm_selection, bg="#2980b9", fg="white", font=("Arial", 14)).pack(pady=20)
 
@@ -488,41 +485,74 @@ def open_report_window():
     for company in companies:
         company_listbox.insert(tk.END, company)
 
+    status_label = Label(report_window, text="", bg="#34495e", fg="white", font=("Arial", 12))
+    status_label.pack()
+    report_state = {"count": 0, "done": False, "error": None, "cancel": threading.Event()}
+
+    def export_in_background(selected_companies, path, preview):
+        def progress(count):
+            if report_state["cancel"].is_set():
+                raise RuntimeError("Report cancelled")
+            report_state["count"] = count
+        try:
+            export_company_report(selected_companies, path, progress, preview)
+        except Exception as e:
+            report_state["error"] = e
+        report_state["done"] = True
+
+    def poll_report(path, preview):
+        if report_state["cancel"].is_set():
+            return
+        if not report_state["done"]:
+            status_label.config(text=f"Exported {report_state['count']:,} tickets...")
+            report_window.after(200, poll_report, path, preview)
+            return
+        generate_button.config(state=tk.NORMAL)
+        if report_state["error"] is not None:
+            status_label.config(text="")
+            messagebox.showerror("Report Failed", f"An error occurred while generating the report: {report_state['error']}")
+        elif not report_state["count"]:
+            status_label.config(text="")
+            messagebox.showinfo("No Tickets", "No open tickets found for the selected companies.")
+        else:
+            status_label.config(text=f"Exported {report_state['count']:,} tickets.")
+            display_tickets(preview, report_state["count"], path)
+
     def generate_report():
         selected_companies = [company_listbox.get(i) for i in company_listbox.curselection()]
         if not selected_companies:
             messagebox.showerror("Error", "Please select at least one company.")
             return
-
-        tickets = fetch_netsuite_tickets_by_companies(selected_companies)
-        if not tickets:
-            messagebox.showinfo("No Tickets", "No open tickets found for the selected companies.")
+        path = filedialog.asksaveasfilename(
+            parent=report_window, title="Save Report As", initialfile="company_tickets_report.csv", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("Compressed CSV", "*.csv.gz"), ("JSON Lines", "*.jsonl"), ("Compressed JSON Lines", "*.jsonl.gz")])
+        if not path:
             return
 
-        display_tickets(tickets)
+        # The export streams to the file on a worker thread; only the first rows are kept for the preview
+        preview = []
+        report_state.update(count=0, done=False, error=None)
+        generate_button.config(state=tk.DISABLED)
+        status_label.config(text="Fetching tickets...")
+        threading.Thread(target=export_in_background, args=(selected_companies, path, preview), daemon=True).start()
+        report_window.after(200, poll_report, path, preview)
+
+    def close_report_window():
+        report_state["cancel"].set()
+        report_window.destroy()
 
     generate_button = tk.Button(report_window, text="Generate Report", command=generate_report, bg="#2980b9", fg="white", font=("Arial", 14))
     generate_button.pack(pady=20)
+    report_window.protocol("WM_DELETE_WINDOW", close_report_window)
 
 
-def fetch_netsuite_tickets_by_companies(selected_companies):
-    # Replace with real API calls to NetSuite
-    all_tickets = [
-        {"id": 123, "company": "Company A", "title": "Sample Case 1", "status": "Open"},
-        {"id": 124, "company": "Company B", "title": "Sample Case 2", "status": "Open"},
-        {"id": 125, "company": "Company A", "title": "Sample Case 3", "status": "Closed"},
-        {"id": 126, "company": "Company C", "title": "Sample Case 4", "status": "Open"}
-    ]
-
-    return [ticket for ticket in all_tickets if ticket['company'] in selected_companies and ticket['status'] == "Open"]
-
-def display_tickets(tickets):
+def display_tickets(tickets, total, path):
     report_display_window = Toplevel()
     report_display_window.title("Open Tickets Report")
     report_display_window.geometry("600x400")
     report_display_window.configure(bg="#34495e")
 
-    Label(report_display_window, text="Open Tickets", bg="#34495e", fg="white", font=("Arial", 14)).pack(pady=10)
+    Label(report_display_window, text=f"Open Tickets (first {len(tickets):,} of {total:,})", bg="#34495e", fg="white", font=("Arial", 14)).pack(pady=10)
 
     listbox = Listbox(report_display_window, font=("Arial", 12), bg="#ecf0f1", fg="#2c3e50")
     listbox.pack(fill=BOTH, expand=True)
@@ -530,17 +560,7 @@ def display_tickets(tickets):
     for ticket in tickets:
         listbox.insert(tk.END, f"ID: {ticket['id']} | Company: {ticket['company']} | Title: {ticket['title']}")
 
-    def export_to_csv():
-        import csv
-        with open("company_tickets_report.csv", "w", newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(["ID", "Company", "Title", "Status"])
-            for ticket in tickets:
-                writer.writerow([ticket['id'], ticket['company'], ticket['title'], ticket['status']])
-        messagebox.showinfo("Export Successful", "Report exported to company_tickets_report.csv")
-
-    export_button = tk.Button(report_display_window, text="Export to CSV", command=export_to_csv, bg="green", fg="white", font=("Arial", 14))
-    export_button.pack(pady=10)
+    Label(report_display_window, text=f"Full report saved to {path}", bg="#34495e", fg="white", font=("Arial", 11), wraplength=560).pack(pady=10)
 
 # New Function: View Sync Log
 def view_sync_log():
@@ -563,9 +583,16 @@ def view_sync_log():
     for log_entry in sync_log:
         log_listbox.insert(tk.END, log_entry)
 
+    if sync_core.run_metrics.kind != "idle":  # Timings of the last run
+        log_listbox.insert(tk.END, "")
+        for line in sync_core.run_metrics.format_lines():
+            log_listbox.insert(tk.END, line)
+
 # Main Application Window
 def create_main_window():
-    global sync_direction
+    global sync_direction, full_reconcile
+
+    sync_core.error_handler = queue_error  # Surface per-item errors as dialogs, from the Tk thread
 
     window = tk.Tk()
     window.title("NetSuite & Azure DevOps Sync")
@@ -573,6 +600,7 @@ def create_main_window():
     window.configure(bg="#34495e")
 
     sync_direction = IntVar(value=1)  # Default to NetSuite to DevOps
+    full_reconcile = BooleanVar(value=False)  # Default to delta syncs after the first run
 
     tk.Label(window, text="NetSuite & Azure DevOps Sync Tool", font=("Arial", 18, "bold"), bg="#34495e", fg="white").pack(pady=20)
 
@@ -590,6 +618,12 @@ def create_main_window():
     devops_to_netsuite_rb = Radiobutton(direction_frame, text="Azure DevOps to NetSuite", variable=sync_direction, value=2, bg="#34495e", fg="white", font=("Arial", 12))
     devops_to_netsuite_rb.grid(row=1, column=1, padx=5, pady=5)
 
+    bidirectional_rb = Radiobutton(direction_frame, text="Both Directions", variable=sync_direction, value=3, bg="#34495e", fg="white", font=("Arial", 12))
+    bidirectional_rb.grid(row=2, column=0, columnspan=2, padx=5, pady=5)
+
+    full_reconcile_cb = Checkbutton(direction_frame, text="Full reconcile (ignore last sync time)", variable=full_reconcile, bg="#34495e", fg="white", selectcolor="#34495e", font=("Arial", 12))
+    full_reconcile_cb.grid(row=3, column=0, columnspan=2, pady=5)
+
     settings_button = tk.Button(button_frame, text="API Settings", command=open_api_settings, font=("Arial", 14), bg="orange", fg="white", width=18)
     settings_button.grid(row=0, column=0, padx=10, pady=10)
 
@@ -611,6 +645,7 @@ def create_main_window():
     exit_button = tk.Button(window, text="Exit", command=window.quit, font=("Arial", 14), bg="red", fg="white", width=18)
     exit_button.pack(pady=20)
     
+    window.after(200, process_ui_queue, window)
     window.mainloop()
 
 if __name__ == '__main__':
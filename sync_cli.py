@@ -0,0 +1,195 @@
+"""Headless entry point for the NetSuite & Azure DevOps Sync Tool.
+
+Runs a sync once (for cron or a container job) or keeps syncing on a schedule as a daemon.
+Settings come from a JSON config file and/or SYNCTOOL_* environment variables. Tk is never
+imported.
+
+    python sync_cli.py --direction netsuite-to-azure --config synctool.json
+    python sync_cli.py --direction azure-to-netsuite --daemon --interval 60
+    python sync_cli.py --direction bidirectional --config synctool.json
+    python sync_cli.py --list-runs
+    python sync_cli.py --undo 42
+    python sync_cli.py --report "Company A" "Company B" --output open_tickets.csv.gz
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+import zoneinfo
+
+import sync_core
+
+# Exit codes
+EXIT_OK = 0
+EXIT_SYNC_FAILED = 1  # The sync stopped with an error
+EXIT_CONFIG_ERROR = 2  # Bad arguments or settings (argparse also exits with 2)
+EXIT_PARTIAL = 3  # The sync finished but some items failed
+EXIT_INTERRUPTED = 130
+
+DIRECTIONS = {
+    "netsuite-to-azure": sync_core.NETSUITE_TO_AZURE,
+    "azure-to-netsuite": sync_core.AZURE_TO_NETSUITE,
+    "bidirectional": sync_core.BIDIRECTIONAL,
+}
+
+REQUIRED_SETTINGS = ["azure_org", "azure_project", "azure_pat"]
+NETSUITE_AUTH_SETTINGS = {  # Required for each netsuite_auth
+    "tba": ["netsuite_account", "netsuite_consumer_key", "netsuite_consumer_secret", "netsuite_token_key", "netsuite_token_secret"],
+    "bearer": ["netsuite_token_key"],
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sync NetSuite support cases and Azure DevOps work items without the GUI.")
+    parser.add_argument("--direction", choices=sorted(DIRECTIONS), help="Which system is the source (required to sync).")
+    parser.add_argument("--config", help="JSON file of settings (same names as the API Settings window).")
+    parser.add_argument("--full", action="store_true", help="Full reconcile instead of a delta sync since the last run.")
+    parser.add_argument("--daemon", action="store_true", help="Keep running and sync every --interval seconds.")
+    parser.add_argument("--interval", type=float, default=300, help="Seconds between daemon runs (default: 300).")
+    parser.add_argument("--metrics-json", help="Write each run's performance summary to this file as JSON.")
+    parser.add_argument("--metrics-prom", help="Write each run's performance summary to this file in Prometheus text format.")
+    parser.add_argument("--profile", help="Profile each run with cProfile and write the stats to this file.")
+    parser.add_argument("--list-runs", action="store_true", help="List recent runs that made changes and how many can still be undone.")
+    parser.add_argument("--undo", nargs="?", const="last", metavar="RUN_ID",
+                        help="Roll back a run (default: the latest one with changes left to undo) instead of syncing.")
+    parser.add_argument("--report", nargs="+", metavar="COMPANY", help="Export the open tickets of these companies instead of syncing.")
+    parser.add_argument("--output", default="company_tickets_report.csv",
+                        help="Report file; .csv or .jsonl, add .gz to compress (default: company_tickets_report.csv).")
+    args = parser.parse_args(argv)
+    if not (args.direction or args.list_runs or args.undo or args.report):
+        parser.error("--direction is required unless --undo, --list-runs or --report is given")
+    if not args.output.removesuffix(".gz").endswith((".csv", ".jsonl")):
+        parser.error("--output must end in .csv, .jsonl, .csv.gz or .jsonl.gz")
+    if args.undo not in (None, "last") and not args.undo.isdigit():
+        parser.error("--undo takes a run ID from --list-runs")
+    return args
+
+def log(message):
+    print(f"{time.strftime('%Y-%m-%dT%H:%M:%S')} {message}", flush=True)
+
+def configure(args):
+    """Load settings from the config file, then the environment. Returns an error message or None."""
+    try:
+        if args.config:
+            sync_core.load_config_file(args.config)
+        sync_core.load_config_from_env(os.environ)
+    except (OSError, ValueError) as e:
+        return f"Could not load settings: {e}"
+    for option, key in (("metrics_json", "metrics_json_path"), ("metrics_prom", "metrics_prometheus_path"), ("profile", "profile_path")):
+        if getattr(args, option, None):
+            sync_core.config[key] = getattr(args, option)
+    return check_settings()
+
+def check_settings():
+    """Check the loaded settings and compile the field mapping. Returns an error message or None."""
+    try:
+        sync_core.get_mapping()  # Compile and check the field mapping before any run
+    except (OSError, ValueError) as e:
+        return f"Could not load the field mapping: {e}"
+    try:
+        sync_core.netsuite_zone()
+    except (ValueError, zoneinfo.ZoneInfoNotFoundError):
+        return f"Unknown netsuite_timezone: {sync_core.config['netsuite_timezone']} (install tzdata on Windows)"
+    if sync_core.config["netsuite_auth"] not in NETSUITE_AUTH_SETTINGS:
+        return f"netsuite_auth must be one of: {', '.join(NETSUITE_AUTH_SETTINGS)}"
+    required = NETSUITE_AUTH_SETTINGS[sync_core.config["netsuite_auth"]] + REQUIRED_SETTINGS
+    missing = [key for key in required if not sync_core.config[key]]
+    if not (sync_core.config["netsuite_account"] or sync_core.config["netsuite_base_url"] or "netsuite_account" in missing):
+        missing.insert(0, "netsuite_account")
+    if missing:
+        return f"Missing settings: {', '.join(missing)} (set them in --config or as SYNCTOOL_<NAME> variables)"
+    return None
+
+def run_once(direction, full):
+    """Run one sync and return its exit code."""
+    started = time.monotonic()
+    try:
+        sync_core.run_sync(direction, full)
+    except Exception as e:
+        log(f"Sync failed: {e}")
+        return EXIT_SYNC_FAILED
+
+    for entry in sync_core.sync_log:
+        log(entry)
+    log(f"Sync finished in {time.monotonic() - started:.1f}s: {len(sync_core.sync_log)} changes, "
+        f"{len(sync_core.run_errors)} errors")
+    for line in sync_core.run_metrics.format_lines():
+        log(line)
+    return EXIT_PARTIAL if sync_core.run_errors else EXIT_OK
+
+def undo_once(run_id):
+    """Roll back a run and return the exit code."""
+    try:
+        undone = sync_core.run_undo(run_id)
+    except Exception as e:
+        log(f"Undo failed: {e}")
+        return EXIT_SYNC_FAILED
+
+    for entry in sync_core.sync_log:
+        log(entry)
+    if undone is None:
+        log("Nothing to undo.")
+    for line in sync_core.run_metrics.format_lines():
+        log(line)
+    return EXIT_PARTIAL if sync_core.run_errors else EXIT_OK
+
+def report_once(companies, path):
+    """Export the companies' open tickets to path and return the exit code."""
+    def progress(count):
+        if count and count % 100000 == 0:
+            log(f"{count} tickets exported")
+
+    started = time.monotonic()
+    try:
+        count = sync_core.export_company_report(companies, path, progress)
+    except Exception as e:
+        log(f"Report failed: {e}")
+        return EXIT_SYNC_FAILED
+    log(f"Exported {count} tickets to {path} in {time.monotonic() - started:.1f}s")
+    return EXIT_OK
+
+def list_runs():
+    runs = sync_core.get_store().list_runs()
+    print(f"{'run':>6}  {'kind':<14}{'started':<34}{'changes':>8}{'pending':>9}")
+    for run in runs:
+        print(f"{run['id']:>6}  {run['kind']:<14}{run['started']:<34}{run['changes']:>8}{run['pending']:>9}")
+    return EXIT_OK
+
+def run_daemon(direction, interval, full):
+    """Sync every interval seconds until SIGINT/SIGTERM; returns the exit code of the last run."""
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    exit_code = EXIT_OK
+    while not stop.is_set():
+        started = time.monotonic()
+        exit_code = run_once(direction, full)
+        stop.wait(max(0.0, interval - (time.monotonic() - started)))
+    log("Stopping.")
+    return exit_code
+
+def main(argv=None):
+    args = parse_args(argv)
+    error = configure(args)
+    if error:
+        print(error, file=sys.stderr)
+        return EXIT_CONFIG_ERROR
+
+    if args.list_runs:
+        return list_runs()
+    try:
+        if args.report:
+            return report_once(args.report, args.output)
+        if args.undo:
+            return undo_once(None if args.undo == "last" else int(args.undo))
+        direction = DIRECTIONS[args.direction]
+        if args.daemon:
+            return run_daemon(direction, args.interval, args.full)
+        return run_once(direction, args.full)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,2617 @@
+"""Sync core for the NetSuite & Azure DevOps Sync Tool: API clients, local mirror and sync engine.
+
+Nothing here imports tkinter, so the core runs under the GUI (match_csvs.py) and headless (sync_cli.py) alike.
+"""
+import requests
+import requests.adapters
+import requests.auth
+import urllib3.exceptions
+import threading
+import email.utils
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+import json
+import csv
+import gzip
+import os
+import time
+import queue
+import atexit
+import cProfile
+import functools
+import base64
+import hashlib
+import hmac
+import secrets
+import urllib.parse
+import zoneinfo
+import heapq
+import itertools
+import re
+from collections import Counter, deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+# Field mapping between Azure DevOps and NetSuite: the built-in default, used unless mapping_path names a file
+# in the same format. Tables map Azure DevOps values to NetSuite values; "types" overlays them per ticket type.
+DEFAULT_MAPPING = {
+    "fields": {
+        "status": {
+            "netsuite_format": "name",
+            "values": {
+                "New": "Open",
+                "Active": "In Progress",
+                "Resolved": "Resolved",
+                "Closed": "Closed"
+            },
+            "types": {
+                "Enhancement": {},
+                "Bug": {"Resolved": "Fixed"},
+                "User Story": {"Resolved": "Completed"}
+            },
+            "defaults": {"netsuite": "Open", "azure": "New"}  # For values missing from the tables
+        }
+    },
+    "work_item_types": {  # NetSuite ticket type -> Azure DevOps work item type created for it
+        "values": {"Bug": "Bug", "User Story": "User Story"},
+        "default": "Task"  # For ticket types missing from the table; every process template has Task
+    }
+}
+
+# Default configurations (replace with your actual values or leave blank)
+config = {
+    "netsuite_account": '',
+    "netsuite_consumer_key": '',
+    "netsuite_consumer_secret": '',
+    "netsuite_token_key": '',
+    "netsuite_token_secret": '',
+    "netsuite_auth": 'tba',  # 'tba' (OAuth 1.0a token-based auth, HMAC-SHA256) or 'bearer' (netsuite_token_key is an OAuth 2.0 access token)
+    "azure_org": '',
+    "azure_project": '',
+    "azure_pat": '',
+    "netsuite_timezone": 'UTC',  # Time zone in the NetSuite preferences of the integration user (IANA name); SuiteQL dates are in it
+    "netsuite_base_url": '',  # '' for the account's own REST host; point these at local stand-ins for benchmarks
+    "azure_base_url": 'https://dev.azure.com',
+    "azure_external_id_field": '',  # Optional Azure field holding the NetSuite case ID, e.g. Custom.NetSuiteCaseId
+    "fuzzy_match_threshold": 0.8,  # Title similarity (0-1) to pair records with no ID or exact title match; 0 turns fuzzy matching off
+    "fuzzy_match_candidates": 50,  # Most candidates scored per fuzzy lookup
+    "teams_webhook_url": '',  # Add Teams webhook URL here
+    "teams_notifications_enabled": True,  # Initial state for Teams notifications
+    "teams_digest_max_items": 20,  # Status changes per Teams digest card
+    "teams_digest_seconds": 10,  # Longest a change waits before its digest is sent
+    "teams_queue_size": 5000,  # Notifications held in memory before they spill to disk
+    "teams_spill_path": 'teams_outbox.jsonl',  # Overflow and undelivered notifications; '' drops them instead
+    "netsuite_page_size": 1000,  # Rows per SuiteQL page (max 1000)
+    "netsuite_type_column": 'category',  # supportcase column whose display value is the ticket type ('' to treat all as Enhancement)
+    "azure_page_size": 200,  # Work items per workitemsbatch read (max 200)
+    "netsuite_max_workers": 5,  # Concurrent NetSuite requests (keep within the account's concurrency limit)
+    "netsuite_requests_per_second": 10,
+    "azure_max_workers": 8,  # Concurrent Azure DevOps requests
+    "azure_requests_per_second": 20,  # Azure also slows us down via Retry-After when TSTU usage runs high
+    "netsuite_pool_size": 10,  # Keep-alive connections per service
+    "azure_pool_size": 16,
+    "teams_pool_size": 2,
+    "http_connect_timeout": 5,  # Seconds
+    "http_read_timeout": 60,  # Seconds
+    "http_max_retries": 5,  # Retries for connection errors, 429 and 5xx
+    "http_backoff_factor": 0.5,  # Backoff is factor * 2^attempt seconds unless Retry-After says otherwise
+    "local_store_path": 'synctool.db',  # SQLite mirror of both systems, their links and sync watermarks
+    "netsuite_cases_from_mirror": False,  # Azure to NetSuite runs match against the mirror's open cases instead of reading NetSuite (offline use; may be stale)
+    "checkpoint_every": 2000,  # Records between checkpoints of a long sync, which an interrupted run resumes from
+    "delta_overlap_seconds": 300,  # Re-read this much history on delta syncs to cover clock skew
+    "mapping_path": '',  # JSON file of synced fields and value tables ('' for DEFAULT_MAPPING)
+    "conflict_policy": 'last_writer_wins',  # Bidirectional syncs: 'last_writer_wins' (by modified time) or 'source_of_truth'
+    "field_owners": 'status=netsuite',  # System that wins each field under source_of_truth, and on timestamp ties
+    "webhook_host": '127.0.0.1',  # Address the webhook listener binds to
+    "webhook_port": 8080,
+    "webhook_secret": '',  # If set, events must send it in the X-SyncTool-Secret header
+    "webhook_coalesce_seconds": 5,  # Events for the same record within this window become one write
+    "metrics_json_path": '',  # If set, each run's performance summary is written here as JSON
+    "metrics_prometheus_path": '',  # ...and here in Prometheus text format (e.g. for node_exporter's textfile collector)
+    "profile_path": ''  # If set, each run is profiled with cProfile and the stats written here
+}
+
+# Global log list to track sync changes (the undo journal lives in the local store)
+sync_log = []
+selected_cases = []
+run_errors = []  # Errors reported during the current run that did not stop it
+
+# Sync directions (the values match the GUI's direction radio buttons)
+NETSUITE_TO_AZURE = 1
+AZURE_TO_NETSUITE = 2
+BIDIRECTIONAL = 3
+
+# Called with (title, message) for errors that don't stop a sync; the GUI sets this to show a dialog
+error_handler = None
+
+def report_error(title, message):
+    run_errors.append(f"{title}: {message}")
+    if error_handler is not None:
+        error_handler(title, message)
+    else:
+        print(f"{title}: {message}", file=sys.stderr)
+
+# Run instrumentation: timing spans per phase and per API call, plus counters
+class RunMetrics:
+    """Timings and counters for one sync run, summarized as a dict, JSON or Prometheus text."""
+
+    SLOWEST_CALLS = 10
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.started = time.time()
+        self.started_clock = time.perf_counter()
+        self.duration = None
+        self.phases = {}  # Name -> [seconds, times entered], in first-entered order
+        self.services = {}  # Service -> request stats
+        self.items = {}  # Counter name -> count
+        self.slowest = []  # Min-heap of (seconds, method, url, status)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self.lock:
+                totals = self.phases.setdefault(name, [0.0, 0])
+                totals[0] += time.perf_counter() - started
+                totals[1] += 1
+
+    def service(self, name):
+        return self.services.setdefault(name, {"requests": 0, "retries": 0, "errors": 0, "bytes_sent": 0,
+                                               "bytes_received": 0, "seconds": 0.0, "durations": []})
+
+    def observe_request(self, service, method, url, status, seconds, bytes_sent=0, bytes_received=0):
+        with self.lock:
+            stats = self.service(service)
+            stats["requests"] += 1
+            stats["errors"] += status is None or status >= 400
+            stats["bytes_sent"] += bytes_sent
+            stats["bytes_received"] += bytes_received
+            stats["seconds"] += seconds
+            stats["durations"].append(seconds)
+            call = (seconds, method, url, status)
+            if len(self.slowest) < self.SLOWEST_CALLS:
+                heapq.heappush(self.slowest, call)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, call)
+
+    def count_retry(self, service):
+        with self.lock:
+            self.service(service)["retries"] += 1
+
+    def count(self, name, amount=1):
+        with self.lock:
+            self.items[name] = self.items.get(name, 0) + amount
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started_clock
+
+    def summary(self):
+        with self.lock:
+            duration = self.duration if self.duration is not None else time.perf_counter() - self.started_clock
+            services = {}
+            for name, stats in self.services.items():
+                durations = sorted(stats["durations"])
+                services[name] = {key: value for key, value in stats.items() if key != "durations"}
+                services[name]["p50_seconds"] = durations[int(0.50 * (len(durations) - 1))] if durations else 0.0
+                services[name]["p99_seconds"] = durations[int(0.99 * (len(durations) - 1))] if durations else 0.0
+            return {
+                "kind": self.kind,
+                "started": datetime.fromtimestamp(self.started, timezone.utc).isoformat(),
+                "duration_seconds": duration,
+                "phases": {name: {"seconds": seconds, "count": count} for name, (seconds, count) in self.phases.items()},
+                "services": services,
+                "items": dict(self.items),
+                "items_per_second": {name: count / duration if duration else 0.0 for name, count in self.items.items()},
+                "slowest_calls": [{"seconds": seconds, "method": method, "url": url, "status": status}
+                                  for seconds, method, url, status in sorted(self.slowest, reverse=True)],
+            }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self):
+        summary = self.summary()
+        lines = []
+
+        def metric(name, metric_type, help_text, samples):
+            lines.append(f"# HELP synctool_{name} {help_text}")
+            lines.append(f"# TYPE synctool_{name} {metric_type}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"synctool_{name}{{{label_text}}} {value}" if label_text else f"synctool_{name} {value}")
+
+        services = summary["services"]
+        metric("run_duration_seconds", "gauge", "Wall time of the last run.", [({"kind": self.kind}, summary["duration_seconds"])])
+        metric("phase_seconds", "gauge", "Time spent in each phase of the last run.",
+               [({"phase": name}, phase["seconds"]) for name, phase in summary["phases"].items()])
+        metric("requests_total", "counter", "HTTP requests sent, by service.",
+               [({"service": name}, stats["requests"]) for name, stats in services.items()])
+        metric("request_retries_total", "counter", "HTTP requests retried, by service.",
+               [({"service": name}, stats["retries"]) for name, stats in services.items()])
+        metric("request_errors_total", "counter", "HTTP requests that failed or returned 4xx/5xx, by service.",
+               [({"service": name}, stats["errors"]) for name, stats in services.items()])
+        metric("request_bytes_total", "counter", "HTTP body bytes, by service and direction.",
+               [({"service": name, "direction": direction}, stats[f"bytes_{direction}"])
+                for name, stats in services.items() for direction in ("sent", "received")])
+        metric("request_seconds", "summary", "HTTP request latency, by service.",
+               [({"service": name, "quantile": quantile}, stats[f"p{int(float(quantile) * 100)}_seconds"])
+                for name, stats in services.items() for quantile in ("0.5", "0.99")])
+        metric("items_total", "counter", "Items processed in the last run, by kind.",
+               [({"kind": name}, count) for name, count in summary["items"].items()])
+        return "\n".join(lines) + "\n"
+
+    def format_lines(self):
+        """Short human-readable summary for logs."""
+        summary = self.summary()
+        lines = [f"{self.kind} took {summary['duration_seconds']:.2f}s"]
+        lines += [f"  phase {name}: {phase['seconds']:.2f}s" for name, phase in summary["phases"].items()]
+        lines += [f"  {name}: {stats['requests']} requests ({stats['retries']} retries, {stats['errors']} errors), "
+                  f"{stats['seconds']:.2f}s in calls, p50 {stats['p50_seconds'] * 1000:.0f}ms, "
+                  f"p99 {stats['p99_seconds'] * 1000:.0f}ms, {stats['bytes_received']} bytes in"
+                  for name, stats in summary["services"].items()]
+        lines += [f"  {name}: {count} ({summary['items_per_second'][name]:.1f}/s)" for name, count in summary["items"].items()]
+        return lines
+
+run_metrics = RunMetrics("idle")  # Metrics of the current (or last) run
+
+def phase(name):
+    """Timing span around one phase of the current run: `with phase("fetch_netsuite"): ...`"""
+    return run_metrics.phase(name)
+
+def count_items(name, amount=1):
+    run_metrics.count(name, amount)
+
+def write_file_atomically(path, text):
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(temporary_path, path)
+
+def measured_run(kind):
+    """Give each call of a run function fresh RunMetrics and export them when it returns.
+
+    With profile_path set, the run is also profiled with cProfile (calling thread only;
+    work done on pool threads shows up as time waiting on them).
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            global run_metrics
+            run_metrics = RunMetrics(kind)
+            profiler = cProfile.Profile() if config["profile_path"] else None
+            if profiler is not None:
+                profiler.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                finish_run()
+                if profiler is not None:
+                    profiler.disable()
+                    profiler.dump_stats(config["profile_path"])
+                run_metrics.finish()
+                try:
+                    if config["metrics_json_path"]:
+                        write_file_atomically(config["metrics_json_path"], run_metrics.to_json())
+                    if config["metrics_prometheus_path"]:
+                        write_file_atomically(config["metrics_prometheus_path"], run_metrics.to_prometheus())
+                except OSError as e:
+                    print(f"Could not write run metrics: {e}", file=sys.stderr)
+        return wrapper
+    return decorate
+
+# Per-thread buffers so concurrent tasks can record log entries that are merged in a fixed order
+task_records = threading.local()
+
+def record_log(entry):
+    buffer = getattr(task_records, "entries", None)
+    (buffer if buffer is not None else sync_log).append(entry)
+
+def collect_log_entries(func, *args):
+    """Call func, collecting the entries it records on this thread instead of adding them to sync_log. Returns them."""
+    outer = getattr(task_records, "entries", None)
+    task_records.entries = []
+    try:
+        func(*args)
+        return task_records.entries
+    finally:
+        task_records.entries = outer
+
+class TokenBucket:
+    """Token-bucket rate limiter: allows `rate` acquisitions per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate or 1)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds`, e.g. when the server sends Retry-After."""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+class ServiceThrottle:
+    """Caps in-flight requests to a service and paces them with a token bucket."""
+
+    def __init__(self, max_concurrent, requests_per_second):
+        self.slots = threading.BoundedSemaphore(max_concurrent)
+        self.bucket = TokenBucket(requests_per_second)
+
+    def __enter__(self):
+        self.slots.acquire()
+        self.bucket.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.slots.release()
+
+    def observe(self, response):
+        retry_after = parse_retry_after(response)
+        if retry_after:
+            self.bucket.pause(retry_after)
+
+class ServiceClient:
+    """Keep-alive HTTP client for one service.
+
+    Requests share a pooled session carrying the service's auth headers, run within the
+    service's throttle, and are retried with exponential backoff on connection errors,
+    429 and 5xx responses, honouring Retry-After. 5xx responses and errors after the
+    connection was opened are only retried for idempotent methods unless the caller passes
+    idempotent=True (e.g. POST reads), so a create that may have gone through is not sent twice.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, name, headers=None, auth=None, pool_size=10, connect_timeout=5, read_timeout=60,
+                 max_retries=5, backoff_factor=0.5, throttle=None):
+        self.name = name
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.session.auth = auth
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.throttle = throttle
+
+    def request(self, method, url, idempotent=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in self.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            try:
+                response = self._send(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries or not (idempotent or request_not_sent(e)):
+                    raise
+                delay = self.backoff_factor * (2 ** attempt)
+            else:
+                retryable = response.status_code == 429 or (idempotent and response.status_code in self.RETRY_STATUSES)
+                if not retryable or attempt >= self.max_retries:
+                    return response
+                delay = parse_retry_after(response)
+                if delay is None:
+                    delay = self.backoff_factor * (2 ** attempt)
+            attempt += 1
+            run_metrics.count_retry(self.name)
+            time.sleep(delay)
+
+    def _send(self, method, url, **kwargs):
+        if self.throttle is None:
+            return self._timed_request(method, url, **kwargs)
+        with self.throttle:
+            response = self._timed_request(method, url, **kwargs)
+            self.throttle.observe(response)
+        return response
+
+    def _timed_request(self, method, url, **kwargs):
+        """Send one HTTP request, record it in run_metrics and tell request_listeners how long it took (status None on errors)."""
+        started = time.perf_counter()
+        status = None
+        bytes_sent = bytes_received = 0
+        try:
+            response = self.session.request(method, url, **kwargs)
+            status = response.status_code
+            bytes_sent = len(response.request.body or b"")
+            bytes_received = len(response.content)
+            return response
+        finally:
+            seconds = time.perf_counter() - started
+            run_metrics.observe_request(self.name, method, url.split('?')[0], status, seconds, bytes_sent, bytes_received)
+            for listener in request_listeners:
+                listener(self.name, method, url, status, seconds)
+
+    def close(self):
+        self.session.close()
+
+def request_not_sent(error):
+    """Whether a failed request surely never reached the server (its connection could not be opened)."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+def parse_retry_after(response):
+    """Seconds to wait according to a Retry-After header (delta-seconds or HTTP date), or None."""
+    retry_after = response.headers.get('Retry-After')
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def oauth_quote(value):
+    """Percent-encode as OAuth 1.0a requires (RFC 3986 unreserved characters only)."""
+    return urllib.parse.quote(str(value), safe='')
+
+@functools.lru_cache(maxsize=1024)
+def oauth_url_parts(url):
+    """The encoded base URL and encoded query parameters of a URL, for the OAuth base string."""
+    parts = urllib.parse.urlsplit(url)
+    netloc = parts.hostname.lower() if parts.hostname else ''
+    if parts.port and (parts.scheme, parts.port) not in (("http", 80), ("https", 443)):
+        netloc += f":{parts.port}"
+    base_url = oauth_quote(f"{parts.scheme.lower()}://{netloc}{parts.path or '/'}")
+    return base_url, tuple((oauth_quote(key), oauth_quote(value)) for key, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+
+class NetSuiteTokenAuth(requests.auth.AuthBase):
+    """Signs NetSuite requests with OAuth 1.0a token-based authentication (TBA) and HMAC-SHA256.
+
+    What is the same on every request is worked out once: the HMAC key (each signature
+    copies the keyed HMAC instead of keying a new one), the encoded oauth_* parameters and
+    the header they go in, and, per URL, the encoded base URL and query. Every request,
+    retries included, is signed with a fresh timestamp and nonce.
+    """
+
+    def __init__(self, account, consumer_key, consumer_secret, token_key, token_secret):
+        key = f"{oauth_quote(consumer_secret)}&{oauth_quote(token_secret)}".encode()
+        self.signer = hmac.new(key, digestmod=hashlib.sha256)
+        self.params = tuple((oauth_quote(name), oauth_quote(value)) for name, value in (
+            ("oauth_consumer_key", consumer_key), ("oauth_token", token_key),
+            ("oauth_signature_method", "HMAC-SHA256"), ("oauth_version", "1.0")))
+        realm = account.strip().upper().replace("-", "_")  # The account ID, e.g. 1234567_SB1
+        self.header_prefix = f'OAuth realm="{realm}", ' + ", ".join(f'{name}="{value}"' for name, value in self.params)
+
+    def __call__(self, request):
+        base_url, query = oauth_url_parts(request.url)
+        timestamp, nonce = str(int(time.time())), secrets.token_hex(16)
+        params = sorted((*self.params, *query, ("oauth_nonce", nonce), ("oauth_timestamp", timestamp)))
+        signer = self.signer.copy()
+        signer.update(f"{request.method.upper()}&{base_url}&{oauth_quote('&'.join(f'{name}={value}' for name, value in params))}".encode())
+        signature = oauth_quote(base64.b64encode(signer.digest()).decode())
+        request.headers['Authorization'] = f'{self.header_prefix}, oauth_timestamp="{timestamp}", oauth_nonce="{nonce}", oauth_signature="{signature}"'
+        return request
+
+def netsuite_auth():
+    """Auth for the NetSuite client, per netsuite_auth."""
+    if config["netsuite_auth"] == "tba":
+        return NetSuiteTokenAuth(config["netsuite_account"], config["netsuite_consumer_key"], config["netsuite_consumer_secret"],
+                                 config["netsuite_token_key"], config["netsuite_token_secret"])
+    if config["netsuite_auth"] == "bearer":
+        return None  # Sent as a session header
+    raise ValueError(f"Unknown netsuite_auth: {config['netsuite_auth']} (use 'tba' or 'bearer')")
+
+# Callables taking (service, method, url, status, seconds), called after every HTTP request
+request_listeners = []
+
+http_clients = {}
+http_clients_lock = threading.Lock()
+
+def create_client(service):
+    options = {
+        "pool_size": config[f"{service}_pool_size"],
+        "connect_timeout": config["http_connect_timeout"],
+        "read_timeout": config["http_read_timeout"],
+        "max_retries": config["http_max_retries"],
+        "backoff_factor": config["http_backoff_factor"],
+    }
+    if service == "netsuite":
+        headers = {'Accept': 'application/json'}
+        if config["netsuite_auth"] == "bearer":
+            headers['Authorization'] = f'Bearer {config["netsuite_token_key"]}'
+        return ServiceClient(service, headers=headers, auth=netsuite_auth(),
+                             throttle=ServiceThrottle(config["netsuite_max_workers"], config["netsuite_requests_per_second"]), **options)
+    if service == "azure":
+        return ServiceClient(service, headers={'Accept': 'application/json'}, auth=("", config["azure_pat"]),
+                             throttle=ServiceThrottle(config["azure_max_workers"], config["azure_requests_per_second"]), **options)
+    return ServiceClient(service, **options)
+
+def get_client(service):
+    """Shared client for "netsuite", "azure" or "teams", created on first use."""
+    with http_clients_lock:
+        if service not in http_clients:
+            http_clients[service] = create_client(service)
+        return http_clients[service]
+
+def reset_clients():
+    """Drop the shared clients so the next call picks up changed credentials and settings."""
+    with http_clients_lock:
+        for client in http_clients.values():
+            client.close()
+        http_clients.clear()
+
+def run_in_pool(service, func, items):
+    """Call func for each item on a bounded worker pool sized for the service.
+
+    Each task records its log entries into its own buffer; the buffers are merged into
+    sync_log in item order, so the log reads the same as after a serial run.
+    """
+    max_workers = config[f"{service}_max_workers"]
+
+    def merge(future):
+        sync_log.extend(future.result())
+
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for item in items:
+            in_flight.append(executor.submit(collect_log_entries, func, item))
+            if len(in_flight) >= max_workers * 2:  # Bound the work queued ahead of the merge
+                merge(in_flight.popleft())
+        while in_flight:
+            merge(in_flight.popleft())
+
+def prefetch(iterable, buffer_size=1000):
+    """Iterate over iterable in a background thread so its network reads overlap with processing.
+
+    If the consumer stops early (or fails), the thread stops and closes iterable instead of
+    waiting for room in the buffer forever.
+    """
+    buffer = queue.Queue(maxsize=buffer_size)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        items = iter(iterable)
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            if hasattr(items, "close"):
+                items.close()  # Ends a generator's reads now rather than when it is collected
+        put(done)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+# Local mirror: SQLite copy of both systems, the links between them and sync state
+class LocalStore:
+    """SQLite (WAL mode) mirror of NetSuite cases and Azure work items.
+
+    Fetchers write every page they read into the mirror and the write paths keep it in
+    step with what was sent, so lookups and lists can be served locally. The links table
+    records which work item belongs to which case and fingerprints the state each linked
+    pair was last synced in; sync_state holds small JSON values such as the delta watermarks. runs and undo_log are the undo journal: one row per
+    change, committed as soon as the change is made. checkpoints hold the progress of
+    interrupted runs and azure_creates the work item creates they sent, by idempotency key.
+    Each thread gets its own connection.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS netsuite_cases (
+            id TEXT PRIMARY KEY, title TEXT, title_key TEXT, status TEXT, type TEXT, modified TEXT);
+        CREATE INDEX IF NOT EXISTS netsuite_cases_title_key ON netsuite_cases (title_key);
+        CREATE TABLE IF NOT EXISTS azure_work_items (
+            id INTEGER PRIMARY KEY, title TEXT, title_key TEXT, status TEXT, type TEXT,
+            external_id TEXT, rev INTEGER, modified TEXT);
+        CREATE INDEX IF NOT EXISTS azure_work_items_title_key ON azure_work_items (title_key);
+        CREATE TABLE IF NOT EXISTS links (
+            netsuite_id TEXT PRIMARY KEY, azure_id INTEGER UNIQUE, linked_at TEXT);
+        CREATE TABLE IF NOT EXISTS fingerprints (
+            direction TEXT, netsuite_id TEXT, azure_id INTEGER, fingerprint TEXT, PRIMARY KEY (direction, netsuite_id));
+        CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT, started TEXT, finished TEXT);
+        CREATE TABLE IF NOT EXISTS undo_log (
+            seq INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, system TEXT NOT NULL, record_id TEXT NOT NULL,
+            field TEXT NOT NULL, before TEXT, after TEXT, rev INTEGER, undone_by_run INTEGER);
+        CREATE INDEX IF NOT EXISTS undo_log_run ON undo_log (run_id);
+        CREATE TABLE IF NOT EXISTS checkpoints (name TEXT PRIMARY KEY, run_id INTEGER, state TEXT);
+        CREATE TABLE IF NOT EXISTS azure_creates (
+            key TEXT PRIMARY KEY, run_id INTEGER, netsuite_id TEXT, title TEXT, sent_at TEXT, azure_id INTEGER);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.connection.executescript(self.SCHEMA)
+
+    @property
+    def connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; skips an fsync per commit
+            self.local.connection = connection
+        return connection
+
+    def write(self, sql, rows):
+        with self.connection:  # One transaction per call
+            self.connection.executemany(sql, rows)
+
+    def upsert_netsuite_cases(self, cases):
+        self.write(
+            "INSERT INTO netsuite_cases (id, title, title_key, status, type, modified) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET title = excluded.title, title_key = excluded.title_key, "
+            "status = excluded.status, type = excluded.type, modified = excluded.modified",
+            [(str(case['id']), case['title'], normalize_title(case['title']), case['status'], case.get('type'),
+              case.get('modified')) for case in cases])
+
+    def upsert_azure_work_items(self, work_items):
+        self.write(
+            "INSERT INTO azure_work_items (id, title, title_key, status, type, external_id, rev, modified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET title = excluded.title, title_key = excluded.title_key, "
+            "status = excluded.status, type = COALESCE(excluded.type, type), external_id = excluded.external_id, "
+            "rev = COALESCE(excluded.rev, rev), modified = COALESCE(excluded.modified, modified)",
+            [(item['id'], item['title'], normalize_title(item['title']), item['status'], item.get('type'),
+              None if item.get('external_id') is None else str(item['external_id']), item.get('rev'),
+              item.get('modified')) for item in work_items])
+
+    def set_netsuite_status(self, case_id, status):
+        self.write("UPDATE netsuite_cases SET status = ? WHERE id = ?", [(status, str(case_id))])
+
+    def set_azure_status(self, work_item_id, status):
+        self.write("UPDATE azure_work_items SET status = ? WHERE id = ?", [(status, work_item_id)])
+
+    def delete_azure_work_item(self, work_item_id):
+        self.write("DELETE FROM azure_work_items WHERE id = ?", [(work_item_id,)])
+        self.write("DELETE FROM links WHERE azure_id = ?", [(work_item_id,)])
+        self.write("DELETE FROM fingerprints WHERE azure_id = ?", [(work_item_id,)])
+
+    def link(self, netsuite_id, azure_id):
+        self.write("DELETE FROM links WHERE azure_id = ? AND netsuite_id != ?", [(azure_id, str(netsuite_id))])
+        self.write("INSERT OR REPLACE INTO links (netsuite_id, azure_id, linked_at) VALUES (?, ?, ?)",
+                   [(str(netsuite_id), azure_id, datetime.now(timezone.utc).isoformat())])
+
+    def links_by_azure_id(self):
+        return {azure_id: netsuite_id for netsuite_id, azure_id in self.connection.execute("SELECT netsuite_id, azure_id FROM links")}
+
+    def linked_azure_ids(self, netsuite_ids):
+        """The IDs of the work items linked to the given cases."""
+        netsuite_ids = [str(netsuite_id) for netsuite_id in netsuite_ids]
+        azure_ids = []
+        for start in range(0, len(netsuite_ids), 500):  # Below SQLite's limit on query parameters
+            chunk = netsuite_ids[start:start + 500]
+            azure_ids.extend(azure_id for (azure_id,) in self.connection.execute(
+                f"SELECT azure_id FROM links WHERE netsuite_id IN ({', '.join('?' * len(chunk))}) ORDER BY azure_id", chunk))
+        return azure_ids
+
+    def load_fingerprints(self, direction):
+        return dict(self.connection.execute("SELECT netsuite_id, fingerprint FROM fingerprints WHERE direction = ?", (direction,)))
+
+    def save_fingerprints(self, direction, fingerprints):
+        """Store {netsuite_id: (azure_id, fingerprint)} for a direction in one transaction."""
+        self.write("INSERT OR REPLACE INTO fingerprints (direction, netsuite_id, azure_id, fingerprint) VALUES (?, ?, ?, ?)",
+                   [(direction, netsuite_id, azure_id, fingerprint) for netsuite_id, (azure_id, fingerprint) in fingerprints.items()])
+
+    def iter_netsuite_cases(self, exclude_status=None):
+        sql = "SELECT id, title, status, type, modified FROM netsuite_cases"
+        params = ()
+        if exclude_status is not None:
+            sql += " WHERE status IS NOT ?"
+            params = (exclude_status,)
+        for row in self.connection.execute(sql + " ORDER BY id", params):
+            yield self.netsuite_case_from_row(row)
+
+    def get_netsuite_case(self, case_id):
+        row = self.connection.execute(
+            "SELECT id, title, status, type, modified FROM netsuite_cases WHERE id = ?", (str(case_id),)).fetchone()
+        return self.netsuite_case_from_row(row) if row else None
+
+    def find_netsuite_case_by_title(self, title):
+        row = self.connection.execute(
+            "SELECT id, title, status, type, modified FROM netsuite_cases WHERE title_key = ? ORDER BY id LIMIT 1",
+            (normalize_title(title),)).fetchone()
+        return self.netsuite_case_from_row(row) if row else None
+
+    @staticmethod
+    def netsuite_case_from_row(row):
+        id, title, status, type, modified = row
+        return NetSuiteCase(id=id, title=title, status=intern_value(status), type=intern_value(type or "Enhancement"),
+                            modified=modified)
+
+    def count_netsuite_cases(self):
+        return self.connection.execute("SELECT COUNT(*) FROM netsuite_cases").fetchone()[0]
+
+    def iter_azure_work_items(self):
+        for id, title, status, type, external_id, rev, modified in self.connection.execute(
+                "SELECT id, title, status, type, external_id, rev, modified FROM azure_work_items ORDER BY id"):
+            yield AzureWorkItem(id=id, title=title, status=intern_value(status), type=intern_value(type),
+                                external_id=external_id, rev=rev, modified=modified)
+
+    def get_state(self, key):
+        row = self.connection.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_state(self, key, value):
+        self.write("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", [(key, json.dumps(value))])
+
+    def start_run(self, kind):
+        with self.connection:
+            return self.connection.execute("INSERT INTO runs (kind, started) VALUES (?, ?)",
+                                           (kind, datetime.now(timezone.utc).isoformat())).lastrowid
+
+    def finish_run(self, run_id):
+        self.write("UPDATE runs SET finished = ? WHERE id = ?", [(datetime.now(timezone.utc).isoformat(), run_id)])
+        # The creates of a run only matter while it can still be resumed
+        self.write("DELETE FROM azure_creates WHERE run_id = ? AND run_id NOT IN (SELECT run_id FROM checkpoints)", [(run_id,)])
+
+    def load_checkpoint(self, name):
+        row = self.connection.execute("SELECT run_id, state FROM checkpoints WHERE name = ?", (name,)).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def save_checkpoint(self, name, run_id, state):
+        self.write("INSERT OR REPLACE INTO checkpoints (name, run_id, state) VALUES (?, ?, ?)", [(name, run_id, json.dumps(state))])
+
+    def delete_checkpoint(self, name):
+        self.write("DELETE FROM checkpoints WHERE name = ?", [(name,)])
+
+    def record_creates(self, run_id, creates):
+        """Note creates about to be sent, as [(idempotency key, NetSuite case ID, title)]."""
+        sent_at = datetime.now(timezone.utc).isoformat()
+        self.write("INSERT OR REPLACE INTO azure_creates (key, run_id, netsuite_id, title, sent_at) VALUES (?, ?, ?, ?, ?)",
+                   [(key, run_id, str(case_id), title, sent_at) for key, case_id, title in creates])
+
+    def confirm_creates(self, created):
+        """Record the work items that creates made, as {idempotency key: work item ID}."""
+        self.write("UPDATE azure_creates SET azure_id = ? WHERE key = ?", [(azure_id, key) for key, azure_id in created.items()])
+
+    def unconfirmed_creates(self, run_id):
+        """Creates of a run sent without hearing back, as (key, NetSuite case ID, title, sent_at) rows."""
+        return self.connection.execute(
+            "SELECT key, netsuite_id, title, sent_at FROM azure_creates WHERE run_id = ? AND azure_id IS NULL", (run_id,)).fetchall()
+
+    def journal_change(self, run_id, system, record_id, field, before, after, rev=None, undoes=()):
+        """Append a change; the journal rows it reverts (if any) are marked in the same transaction."""
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO undo_log (run_id, system, record_id, field, before, after, rev) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, system, str(record_id), field, before, after, rev))
+            self.connection.executemany("UPDATE undo_log SET undone_by_run = ? WHERE seq = ?", [(run_id, seq) for seq in undoes])
+
+    def mark_undone(self, seqs, run_id):
+        self.write("UPDATE undo_log SET undone_by_run = ? WHERE seq = ?", [(run_id, seq) for seq in seqs])
+
+    def pending_changes(self, run_id):
+        """Changes of a run that have not been rolled back, newest first."""
+        rows = self.connection.execute(
+            "SELECT seq, system, record_id, field, before, after, rev FROM undo_log "
+            "WHERE run_id = ? AND undone_by_run IS NULL ORDER BY seq DESC", (run_id,))
+        return [dict(zip(("seq", "system", "record_id", "field", "before", "after", "rev"), row)) for row in rows]
+
+    def last_undoable_run(self):
+        """The latest sync run with changes left to roll back (rollbacks themselves are not picked)."""
+        return self.connection.execute(
+            "SELECT MAX(u.run_id) FROM undo_log u JOIN runs r ON r.id = u.run_id "
+            "WHERE u.undone_by_run IS NULL AND r.kind != 'undo'").fetchone()[0]
+
+    def list_runs(self, limit=20):
+        """Recent runs that made changes, newest first, with how many are still pending rollback."""
+        rows = self.connection.execute(
+            "SELECT r.id, r.kind, r.started, r.finished, COUNT(u.seq), COUNT(u.seq) - COUNT(u.undone_by_run) "
+            "FROM runs r JOIN undo_log u ON u.run_id = r.id GROUP BY r.id ORDER BY r.id DESC LIMIT ?", (limit,))
+        return [dict(zip(("id", "kind", "started", "finished", "changes", "pending"), row)) for row in rows]
+
+local_store = None
+local_store_lock = threading.Lock()
+
+def get_store():
+    """Shared local mirror, opened on first use."""
+    global local_store
+    with local_store_lock:
+        if local_store is None:
+            local_store = LocalStore(config["local_store_path"])
+        return local_store
+
+def enable_teams_notifications():
+    config["teams_notifications_enabled"] = True
+    print("Teams notifications enabled.")
+
+def disable_teams_notifications():
+    config["teams_notifications_enabled"] = False
+    print("Teams notifications disabled.")
+
+class TeamsNotifier:
+    """Sends Teams notifications from a background thread as digest cards.
+
+    Queued lines are gathered into one card per teams_digest_max_items or teams_digest_seconds,
+    whichever comes first, so a slow or throttled webhook never holds up a sync. Lines that
+    do not fit in the queue, or whose card still fails after the client's retries, are
+    appended to the spill file and sent again once the queue is idle and Teams has
+    recovered; with no spill file they are dropped.
+    """
+
+    MAX_BACKOFF = 300  # Seconds
+
+    def __init__(self, queue_size, max_items, window, spill_path=''):
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.max_items = max_items
+        self.window = window
+        self.spill_path = spill_path
+        self.spill_lock = threading.Lock()
+        self.dropped = 0
+        self.failures = 0  # Consecutive failed cards
+        self.retry_at = 0
+        self.hurry = object()  # Queued by flush() to send a partial digest at once
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def submit(self, line):
+        try:
+            self.queue.put_nowait(line)
+        except queue.Full:
+            self.spill([line])
+
+    def run(self):
+        while True:
+            try:
+                first = self.queue.get(timeout=self.window)
+            except queue.Empty:
+                self.resend_spilled()
+                continue
+            lines = [] if first is self.hurry else [first]
+            taken = 1
+            deadline = time.monotonic() + self.window
+            while lines and len(lines) < self.max_items:
+                try:
+                    line = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                taken += 1
+                if line is self.hurry:
+                    break
+                lines.append(line)
+            try:
+                if lines:
+                    self.send(lines)
+            except Exception as e:  # Keep the worker alive, e.g. if the spill file cannot be written
+                print(f"Failed to post update to Teams: {e}")
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+
+    def send(self, lines):
+        if time.monotonic() < self.retry_at:  # Still backing off after a failure
+            self.spill(lines)
+            return
+        try:
+            response = get_client("teams").request("POST", config["teams_webhook_url"], json=teams_digest_message(lines))
+            error = None if response.status_code == 200 else f"{response.status_code}, {response.text}"
+        except requests.exceptions.RequestException as e:
+            error = str(e)
+        if error is None:
+            self.failures = 0
+            print(f"Posted {len(lines)} update(s) to Teams successfully.")
+            return
+        self.failures += 1
+        self.retry_at = time.monotonic() + min(self.MAX_BACKOFF, config["http_backoff_factor"] * 2 ** self.failures)
+        print(f"Failed to post update to Teams: {error}")
+        self.spill(lines)
+
+    def spill(self, lines):
+        if not self.spill_path:
+            self.dropped += len(lines)
+            return
+        with self.spill_lock:
+            with open(self.spill_path, "a", encoding="utf-8") as file:
+                file.writelines(json.dumps(line) + "\n" for line in lines)
+
+    def resend_spilled(self):
+        """Send spilled lines, a digest at a time, once Teams is not backing off."""
+        if not self.spill_path or time.monotonic() < self.retry_at:
+            return
+        with self.spill_lock:
+            if not os.path.exists(self.spill_path):
+                return
+            with open(self.spill_path, "r+", encoding="utf-8") as file:
+                lines = [json.loads(line) for line in file if line.strip()]
+                file.truncate(0)
+        for start in range(0, len(lines), self.max_items):
+            self.send(lines[start:start + self.max_items])
+
+    def flush(self, timeout=None):
+        """Send queued notifications now. Returns False if they were not all handled within timeout."""
+        try:
+            self.queue.put_nowait(self.hurry)
+        except queue.Full:
+            pass  # A full queue already sends full digests
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout=10):
+        """Flush before exit; whatever is still queued afterwards goes to the spill file."""
+        if self.flush(timeout):
+            return
+        lines = []
+        while True:
+            try:
+                line = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if line is not self.hurry:
+                lines.append(line)
+        self.spill(lines)
+
+def teams_digest_message(lines):
+    if len(lines) == 1:
+        return {"text": lines[0]}
+    return {"text": f"{len(lines)} tickets updated:\n\n" + "\n\n".join(f"- {line}" for line in lines)}
+
+teams_notifier = None
+teams_notifier_lock = threading.Lock()
+
+def get_notifier():
+    """Shared Teams notifier, started on first use and flushed when the process exits."""
+    global teams_notifier
+    with teams_notifier_lock:
+        if teams_notifier is None:
+            teams_notifier = TeamsNotifier(config["teams_queue_size"], config["teams_digest_max_items"],
+                                           config["teams_digest_seconds"], config["teams_spill_path"])
+            atexit.register(teams_notifier.close)
+        return teams_notifier
+
+def flush_notifications(timeout=None):
+    """Wait until queued Teams notifications have been sent (or spilled)."""
+    if teams_notifier is not None:
+        return teams_notifier.flush(timeout)
+    return True
+
+def post_to_teams(case, status):
+    """Queue a Teams notification; it is sent in the background as part of a digest."""
+    if not config["teams_notifications_enabled"]:
+        return
+
+    if not config["teams_webhook_url"]:
+        return
+
+    count_items("teams_notifications")
+    get_notifier().submit(f"Ticket ID: {case['id']} | Title: {case['title']} | Status: {status} has been updated in Azure DevOps.")
+
+# Field mapping: the mapping document compiled into flat lookup tables
+RECORD_KEYS = {"id", "title", "type", "modified", "rev", "external_id", "linked_case_id"}  # Not available as field names
+NETSUITE_FORMATS = {  # How a value is written in a NetSuite PATCH body
+    "value": lambda value: value,
+    "name": lambda value: {"name": value},
+    "id": lambda value: {"id": value},
+}
+
+def netsuite_field_value(value):
+    """Plain value of a NetSuite REST field (select fields come back as objects)."""
+    if isinstance(value, dict):
+        value = value.get("name", value.get("refName", value.get("id")))
+    return None if value is None else str(value)
+
+def azure_field_value(value):
+    """Plain value of an Azure DevOps field (identity fields come back as objects)."""
+    if isinstance(value, dict):
+        value = value.get("uniqueName", value.get("displayName"))
+    return None if value is None else str(value)
+
+class MappedField:
+    """One compiled field: where it lives on each side and its lookup tables keyed by (ticket type, value)."""
+    __slots__ = ("name", "netsuite_key", "netsuite_column", "azure_path", "wrap", "to_netsuite", "to_azure",
+                 "netsuite_default", "azure_default")
+
+class FieldMapping:
+    """Maps the synced fields of a case and its work item in both directions.
+
+    Compiled once from a mapping document (see DEFAULT_MAPPING): every table, overlaid per
+    ticket type, becomes a dict keyed by (ticket type, value), and the reverse of each is
+    checked to be unambiguous. Mapping a record is then one lookup per field. Ticket types
+    without tables of their own use the base tables, with a warning the first time. The
+    work_item_types table picks the work item type created for each ticket type.
+    """
+
+    def __init__(self, document):
+        specs = document.get("fields", {})
+        if "status" not in specs:
+            raise ValueError("The mapping must define the status field")
+        self.types = {ticket_type for spec in specs.values() for ticket_type in spec.get("types", {})}
+        self.fields = [self.compile_field(name, spec) for name, spec in specs.items()]
+        self.by_name = {field.name: field for field in self.fields}
+        self.by_netsuite_key = {field.netsuite_key: field for field in self.fields}
+        self.extra_fields = [field for field in self.fields if field.name != "status"]  # Read alongside the status
+        self.warned_types = set()
+        work_item_types = document.get("work_item_types", DEFAULT_MAPPING["work_item_types"])
+        self.work_item_types = {str(k): str(v) for k, v in work_item_types.get("values", {}).items()}
+        self.default_work_item_type = str(work_item_types.get("default") or "")
+        if not self.default_work_item_type or not all(self.work_item_types.values()):
+            raise ValueError("work_item_types needs a default and a non-empty Azure work item type for each ticket type")
+
+    def compile_field(self, name, spec):
+        if not re.fullmatch(r"[a-z][a-z0-9_]*", name) or name in RECORD_KEYS:
+            raise ValueError(f"Mapped field name {name!r} must be a lower-case identifier and not one of {', '.join(sorted(RECORD_KEYS))}")
+        field = MappedField()
+        field.name = name
+        if name == "status":  # The sync reads these two directly
+            field.netsuite_key, field.azure_path = "status", "System.State"
+        elif "netsuite" not in spec or "azure" not in spec:
+            raise ValueError(f"Mapped field {name!r} needs both a netsuite and an azure field name")
+        else:
+            field.netsuite_key, field.azure_path = spec["netsuite"], spec["azure"]
+        field.netsuite_column = spec.get("netsuite_column", f"BUILTIN.DF(sc.{field.netsuite_key})")
+        if spec.get("netsuite_format", "value") not in NETSUITE_FORMATS:
+            raise ValueError(f"netsuite_format of {name!r} must be one of {', '.join(NETSUITE_FORMATS)}")
+        field.wrap = NETSUITE_FORMATS[spec.get("netsuite_format", "value")]
+        defaults = spec.get("defaults", {})
+        field.netsuite_default, field.azure_default = defaults.get("netsuite"), defaults.get("azure")
+
+        base = {str(k): str(v) for k, v in spec.get("values", {}).items()}
+        overrides = {str(k): str(v) for k, v in spec.get("reverse", {}).items()}  # NetSuite value -> Azure value, where the forward table is ambiguous
+        field.to_netsuite, field.to_azure = {}, {}
+        for ticket_type in [None, *sorted(self.types)]:
+            table = dict(base)
+            if ticket_type is not None:
+                table.update((str(k), str(v)) for k, v in spec.get("types", {}).get(ticket_type, {}).items())
+            reverse = {}
+            for azure_value, netsuite_value in table.items():
+                if netsuite_value in reverse and netsuite_value not in overrides:
+                    raise ValueError(f"The {name} mapping ({ticket_type or 'base tables'}) is not invertible: Azure values "
+                                     f"{reverse[netsuite_value]!r} and {azure_value!r} both map to {netsuite_value!r}; "
+                                     f"add a \"reverse\" entry to choose one")
+                reverse[netsuite_value] = azure_value
+            for netsuite_value, azure_value in overrides.items():
+                if netsuite_value in reverse:
+                    if table.get(azure_value) != netsuite_value:
+                        raise ValueError(f"The {name} reverse entry {netsuite_value!r} -> {azure_value!r} does not map back "
+                                         f"({ticket_type or 'base tables'})")
+                    reverse[netsuite_value] = azure_value
+            field.to_netsuite.update(((ticket_type, azure_value), netsuite_value) for azure_value, netsuite_value in table.items())
+            field.to_azure.update(((ticket_type, netsuite_value), azure_value) for netsuite_value, azure_value in reverse.items())
+        return field
+
+    def work_item_type(self, ticket_type):
+        """The Azure DevOps work item type to create for a case of this ticket type."""
+        return self.work_item_types.get(ticket_type, self.default_work_item_type)
+
+    def type_key(self, ticket_type):
+        if ticket_type in self.types or ticket_type is None:
+            return ticket_type
+        if ticket_type not in self.warned_types:
+            self.warned_types.add(ticket_type)
+            print(f"No mapping tables for ticket type {ticket_type!r}; using the base tables.")
+        return None
+
+    def to_netsuite_value(self, name, ticket_type, value):
+        field = self.by_name[name]
+        return field.to_netsuite.get((self.type_key(ticket_type), value), field.netsuite_default or value)
+
+    def to_azure_value(self, name, ticket_type, value):
+        field = self.by_name[name]
+        return field.to_azure.get((self.type_key(ticket_type), value), field.azure_default or value)
+
+    def diff(self, case, work_item):
+        """The mapped fields on which a linked pair disagrees, in one pass over the fields.
+
+        Returns (field, value for Azure, value for NetSuite) per field: the case's value
+        mapped to Azure and the work item's value mapped to NetSuite, so either side can
+        win. A field counts only if both records carry it.
+        """
+        type_key = self.type_key(case.get('type'))
+        changes = []
+        for field in self.fields:
+            case_value, item_value = case.get(field.name), work_item.get(field.name)
+            if case_value is None or item_value is None:
+                continue
+            azure_value = field.to_azure.get((type_key, case_value), field.azure_default or case_value)
+            if azure_value == item_value:
+                continue
+            netsuite_value = field.to_netsuite.get((type_key, item_value), field.netsuite_default or item_value)
+            if netsuite_value != case_value:
+                changes.append((field, azure_value, netsuite_value))
+        return changes
+
+    def new_work_item_values(self, case):
+        """Azure values of every mapped field a case carries, for a new work item: {field name: value}."""
+        type_key = self.type_key(case.get('type'))
+        return {field.name: field.to_azure.get((type_key, case[field.name]), field.azure_default or case[field.name])
+                for field in self.fields if case.get(field.name) is not None}
+
+    @staticmethod
+    def azure_ops(changes):
+        return [{"op": "add", "path": f"/fields/{field.azure_path}", "value": azure_value} for field, azure_value, _ in changes]
+
+    @staticmethod
+    def netsuite_body(changes):
+        return {field.netsuite_key: field.wrap(netsuite_value) for field, _, netsuite_value in changes}
+
+    def wrap_netsuite(self, netsuite_key, value):
+        field = self.by_netsuite_key.get(netsuite_key)
+        return field.wrap(value) if field else value
+
+field_mapping = None
+field_mapping_lock = threading.Lock()
+
+def load_mapping(path=''):
+    """Compile a mapping file, or DEFAULT_MAPPING without one. Raises OSError or ValueError."""
+    if not path:
+        return FieldMapping(DEFAULT_MAPPING)
+    with open(path) as file:
+        return FieldMapping(json.load(file))
+
+def get_mapping():
+    """Shared field mapping, compiled from mapping_path on first use."""
+    global field_mapping
+    if field_mapping is None:
+        with field_mapping_lock:
+            if field_mapping is None:
+                field_mapping = load_mapping(config["mapping_path"])
+    return field_mapping
+
+def map_status(ticket_type, status):
+    """Map an Azure DevOps state to the NetSuite status for the ticket type."""
+    return get_mapping().to_netsuite_value("status", ticket_type, status)
+
+def reverse_map_status(ticket_type, status):
+    """Map a NetSuite status to the Azure DevOps state for the ticket type."""
+    return get_mapping().to_azure_value("status", ticket_type, status)
+
+def netsuite_account_url():
+    """netsuite_base_url, or else the REST host of netsuite_account (e.g. 1234567_SB1 -> 1234567-sb1)."""
+    if config["netsuite_base_url"]:
+        return config["netsuite_base_url"].rstrip('/')
+    if not config["netsuite_account"]:
+        raise ValueError("Set netsuite_account (or netsuite_base_url) to reach NetSuite")
+    return f'https://{config["netsuite_account"].strip().lower().replace("_", "-")}.suitetalk.api.netsuite.com'
+
+def netsuite_record_url(path):
+    return f'{netsuite_account_url()}/services/rest/record/v1/{path}'
+
+def netsuite_query_url(path):
+    return f'{netsuite_account_url()}/services/rest/query/v1/{path}'
+
+def azure_project_url(path):
+    return f'{config["azure_base_url"]}/{config["azure_org"]}/{config["azure_project"]}/_apis/{path}'
+
+def azure_org_url(path):
+    return f'{config["azure_base_url"]}/{config["azure_org"]}/_apis/{path}'
+
+# Records: cases and work items are held by the hundred thousand, so they use __slots__ instead of a dict each
+def intern_value(value):
+    """Share one copy of a repeated string (status, type, company, mapped values); other values pass through."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+class Record:
+    """Fixed attributes in __slots__, read and written like a dict: record['status'], record.get('type').
+
+    An attribute never set reads as missing, as an absent dict key did. Mapped fields beyond the
+    fixed ones go in a small dict that only records with such fields allocate.
+    """
+    __slots__ = ("extra",)
+    keys_in_slots = frozenset()
+
+    def __init__(self, **values):
+        for key, value in values.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key) if key in self.keys_in_slots else self.extra[key]
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        if key in self.keys_in_slots:
+            setattr(self, key, value)
+        else:
+            try:
+                self.extra[key] = value
+            except AttributeError:
+                self.extra = {key: value}
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [key for key in self.__slots__ if hasattr(self, key)] + list(getattr(self, "extra", ()))
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.items())})"
+
+class NetSuiteCase(Record):
+    __slots__ = ("id", "title", "status", "type", "modified")
+    keys_in_slots = frozenset(__slots__)
+
+class AzureWorkItem(Record):
+    __slots__ = ("id", "title", "status", "type", "external_id", "rev", "modified", "linked_case_id")
+    keys_in_slots = frozenset(__slots__)
+
+class ReportRow(Record):
+    __slots__ = ("id", "company", "title", "status")
+    keys_in_slots = frozenset(__slots__)
+
+def netsuite_zone():
+    """Time zone SuiteQL reads and compares dates in (netsuite_timezone)."""
+    if config["netsuite_timezone"] in ('', 'UTC'):
+        return timezone.utc  # Needs no tz database (Windows has none without the tzdata package)
+    return zoneinfo.ZoneInfo(config["netsuite_timezone"])
+
+def netsuite_time_to_utc(value):
+    """A SuiteQL date (local to netsuite_timezone unless it carries an offset) as an ISO UTC string."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return value
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=netsuite_zone())
+    return parsed.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def normalize_netsuite_case(row):
+    """Case from a SuiteQL row selected with netsuite_case_columns(); modified is converted to UTC."""
+    case = NetSuiteCase(id=str(row["id"]), title=row["title"], status=intern_value(row["status"]),
+                        type=intern_value(row.get("type") or "Enhancement"), modified=netsuite_time_to_utc(row.get("modified")))
+    for field in get_mapping().extra_fields:
+        if row.get(field.name) is not None:  # SuiteQL leaves empty columns out
+            case[field.name] = sys.intern(str(row[field.name]))
+    return case
+
+def normalize_azure_work_item(item):
+    external_id_field = config["azure_external_id_field"]
+    fields = item["fields"]
+    work_item = AzureWorkItem(id=item["id"], title=fields["System.Title"], status=intern_value(fields["System.State"]),
+                              external_id=fields.get(external_id_field) if external_id_field else None,
+                              type=intern_value(fields.get("System.WorkItemType")), rev=item.get("rev"),
+                              modified=fields.get("System.ChangedDate"))
+    for field in get_mapping().extra_fields:
+        if field.azure_path in fields:
+            work_item[field.name] = intern_value(azure_field_value(fields[field.azure_path]))
+    return work_item
+
+# Server-side queries: SuiteQL on NetSuite and WIQL on Azure DevOps select just the rows and fields the sync uses
+def suiteql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def query_suiteql_page(query, limit, offset=0):
+    """Run one page of a SuiteQL query. Returns (rows, has_more)."""
+    response = get_client("netsuite").request("POST", netsuite_query_url('suiteql'), params={"limit": limit, "offset": offset},
+                                              json={"q": query}, headers={"Prefer": "transient"}, idempotent=True)  # A read, safe to retry
+    response.raise_for_status()
+    page = response.json()
+    return page.get('items', []), bool(page.get('hasMore'))
+
+def iter_case_pages(columns, conditions=(), after_id=0):
+    """Yield pages of rows of SELECT columns FROM supportcase sc WHERE conditions, for cases after after_id.
+
+    Pages are keyed on the case ID instead of an offset, so there is no 100,000-row cap.
+    """
+    last_id = int(after_id)
+    while True:
+        query = f"SELECT {columns} FROM supportcase sc WHERE {' AND '.join([*conditions, f'sc.id > {last_id}'])} ORDER BY sc.id"
+        rows, has_more = query_suiteql_page(query, config["netsuite_page_size"])
+        if rows:
+            yield rows
+        if not has_more or not rows:
+            return
+        last_id = int(rows[-1]['id'])
+
+def netsuite_case_columns():
+    type_column = f"BUILTIN.DF(sc.{config['netsuite_type_column']})" if config["netsuite_type_column"] else "NULL"
+    extra_columns = "".join(f", {field.netsuite_column} AS {field.name}" for field in get_mapping().extra_fields)
+    return (f"sc.id, sc.title, BUILTIN.DF(sc.status) AS status, {type_column} AS type, "
+            f"TO_CHAR(sc.lastmodifieddate, 'YYYY-MM-DD\"T\"HH24:MI:SS') AS modified{extra_columns}")
+
+NETSUITE_NOT_CLOSED = "BUILTIN.DF(sc.status) != 'Closed'"
+
+def iter_netsuite_cases(modified_since=None, where=None, after_id=0):
+    """Yield normalized NetSuite cases a page at a time from a SuiteQL query, in ID order.
+
+    Only the columns the sync uses are selected, and the filters run on the server:
+    modified_since (an aware datetime), where, a SuiteQL condition on supportcase sc, and
+    after_id, where a resumed run picks up.
+    """
+    conditions = []
+    if modified_since is not None:
+        since = modified_since.astimezone(netsuite_zone()).strftime('%Y-%m-%d %H:%M:%S')  # SuiteQL compares in the user's time zone
+        conditions.append(f"sc.lastmodifieddate >= TO_TIMESTAMP({suiteql_literal(since)}, 'YYYY-MM-DD HH24:MI:SS')")
+    if where:
+        conditions.append(f"({where})")
+    for rows in iter_case_pages(netsuite_case_columns(), conditions, after_id):
+        cases = [normalize_netsuite_case(row) for row in rows]
+        get_store().upsert_netsuite_cases(cases)
+        count_items("netsuite_cases_read", len(cases))
+        yield from cases
+
+WIQL_MAX_RESULTS = 20000  # WIQL returns at most this many IDs per query
+
+def iter_azure_work_item_ids(condition=None, after_id=0):
+    """Yield the IDs after after_id of the project's work items matching a WIQL condition, paging by ID past the WIQL result cap."""
+    last_id = int(after_id)
+    while True:
+        ids = query_azure_work_item_ids(
+            "SELECT [System.Id] FROM WorkItems WHERE [System.TeamProject] = @project "
+            + (f"AND ({condition}) " if condition else "")
+            + f"AND [System.Id] > {last_id} ORDER BY [System.Id]", top=WIQL_MAX_RESULTS)
+        yield from ids
+        if len(ids) < WIQL_MAX_RESULTS:
+            return
+        last_id = ids[-1]
+
+def iter_azure_work_items(condition=None, after_id=0):
+    """Yield normalized work items matching a WIQL condition (default: all in the project), in ID order.
+
+    WIQL picks the IDs on the server and workitemsbatch reads only the fields the sync uses.
+    """
+    return iter_azure_work_items_by_ids(iter_azure_work_item_ids(condition, after_id))
+
+AZURE_CLOSED = "[System.State] = 'Closed'"
+
+def normalize_title(title):
+    """Normalize a title for matching: collapse whitespace and ignore case."""
+    return " ".join(str(title or "").split()).casefold()
+
+def title_grams(title):
+    """Character trigrams of a normalized title, padded so short words and word starts count."""
+    padded = f"  {title} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class RecordMatcher:
+    """Pairs records with their counterparts in the other system, in near-linear time overall.
+
+    A lookup tries the cross-reference key first (the NetSuite case ID, from the Azure external ID
+    field or a stored link), then the normalized title, then fuzzy title similarity. Fuzzy lookups
+    only score the candidates in the blocks of the title's rarest words, never the whole set.
+    Titles that differ in a number ("Release 2.1" and "Release 2.2") never fuzzy-match, and title
+    and fuzzy matches skip candidates already paired with another record.
+    """
+
+    def __init__(self, key, paired_key=None):
+        self.key = key  # Candidate -> case ID to look it up by, or None
+        self.paired_key = paired_key or key  # Candidate -> case ID it is already paired with, or None
+        self.by_key = {}
+        self.by_title = {}
+        self.blocks = {}  # Title word -> candidates whose title has it
+
+    def add(self, record):
+        """Add a new candidate; each record is added once. The first one seen for a title wins exact title matches."""
+        key = self.key(record)
+        if key is not None:
+            self.by_key[str(key)] = record
+        title = normalize_title(record['title'])
+        self.by_title.setdefault(title, record)
+        for word in set(re.findall(r"\w+", title)):
+            self.blocks.setdefault(word, []).append(record)
+
+    def available(self, record, key):
+        paired = self.paired_key(record)
+        return paired is None or (key is not None and str(paired) == str(key))
+
+    def match(self, title, key=None, fallback=True):
+        """The candidate for a record with this title and case ID key, or None.
+
+        With fallback False, only the key is used (for a record known to be paired already).
+        """
+        record = self.by_key.get(str(key)) if key is not None else None
+        if record is not None or not fallback:
+            return record
+        title = normalize_title(title)
+        record = self.by_title.get(title)
+        if record is not None and self.available(record, key):
+            return record
+        return self.fuzzy_match(title, key)
+
+    def fuzzy_match(self, title, key):
+        threshold = config["fuzzy_match_threshold"]
+        words = set(re.findall(r"\w+", title))
+        if not threshold or not words:
+            return None
+        numbers = {word for word in words if word.isdigit()}
+        blocks = sorted(filter(None, (self.blocks.get(word) for word in numbers or words)), key=len)
+        if numbers:
+            blocks = blocks[:1]  # Every match has all the numbers, so the rarest one's block holds them all
+        limit = config["fuzzy_match_candidates"]
+        distinctive, looked_at = [], 0  # The rarest words' blocks, up to limit records in all
+        for block in blocks:
+            if looked_at + len(block) > limit:
+                break  # Words this common identify nothing
+            distinctive.append(block)
+            looked_at += len(block)
+        if distinctive:  # Score only the candidates sharing the most distinctive words, and at least half of them
+            shared = Counter(itertools.chain.from_iterable(distinctive))  # Records compare by identity
+            most = max(shared.values())
+            candidates = [record for record, count in shared.items() if count == most] if most * 2 >= len(distinctive) else []
+        else:
+            candidates = blocks[0][:limit] if blocks else []
+
+        grams = title_grams(title)
+        best, best_score, tied = None, threshold, False
+        for record in candidates:
+            if not self.available(record, key):
+                continue
+            candidate_title = normalize_title(record['title'])
+            if len(candidate_title) + 1 < best_score * len(grams):
+                continue  # Too short to reach the best score: a title has at most len + 1 trigrams
+            if {word for word in re.findall(r"\w+", candidate_title) if word.isdigit()} != numbers:
+                continue
+            candidate_grams = title_grams(candidate_title)
+            score = len(grams & candidate_grams) / len(grams | candidate_grams)
+            if score > best_score or best is None and score >= best_score:
+                best, best_score, tied = record, score, False
+            elif score == best_score and record is not best:
+                tied = True
+        if best is None or tied:  # No close title, or two equally close: leave it unmatched
+            return None
+        count_items("fuzzy_matches")
+        print(f"Matched \"{title}\" to \"{normalize_title(best['title'])}\" by similar title ({best_score:.2f}).")
+        return best
+
+def azure_work_item_case_id(item):
+    """The NetSuite case ID a work item is paired with: its external ID, else its stored link."""
+    return item.get('external_id') if item.get('external_id') not in (None, '') else item.get('linked_case_id')
+
+def build_azure_work_item_index(work_items, links=None):
+    """Index Azure work items by the NetSuite case ID they carry and by title (a RecordMatcher).
+
+    links maps work item IDs to linked NetSuite case IDs (see LocalStore.links_by_azure_id)
+    and stands in for the external ID on items that have none.
+    """
+    index = RecordMatcher(azure_work_item_case_id)
+    for item in work_items:
+        if links and item.get('external_id') in (None, '') and item['id'] in links:
+            item['linked_case_id'] = links[item['id']]
+        index.add(item)
+    return index
+
+def index_azure_work_item(index, item):
+    """Add a work item that is not in the index yet, e.g. one created during the run."""
+    index.add(item)
+
+def lookup_azure_work_item(index, case):
+    """Find the work item for a NetSuite case, preferring its case ID over the title."""
+    return index.match(case['title'], case['id'])
+
+def build_netsuite_case_index(cases, links):
+    """Index NetSuite cases for matching work items to; a case with a linked work item counts as paired."""
+    linked_case_ids = set(links.values())
+    index = RecordMatcher(lambda case: case['id'], lambda case: case['id'] if case['id'] in linked_case_ids else None)
+    for case in cases:
+        index.add(case)
+    return index
+
+def iter_netsuite_cases_for_work_items(work_items, links):
+    """Yield the NetSuite cases that could match the given work items, read from NetSuite.
+
+    Cases are looked up by the case ID a work item carries or is linked to, else by title
+    (ignoring case) and by the ID of a case the mirror holds under that title.
+    """
+    case_ids, titles = set(), set()
+    for work_item in work_items:
+        case_id = work_item.get('external_id') or links.get(work_item['id'])
+        if case_id is None:
+            titles.add(work_item['title'].lower())
+            mirrored = get_store().find_netsuite_case_by_title(work_item['title'])
+            case_id = mirrored['id'] if mirrored is not None else None
+        if case_id is not None and str(case_id).isdigit():
+            case_ids.add(int(case_id))
+    conditions = []
+    case_ids, titles = sorted(case_ids), sorted(titles)
+    for start in range(0, len(case_ids), WIQL_CHUNK_SIZE):
+        conditions.append(f"sc.id IN ({', '.join(map(str, case_ids[start:start + WIQL_CHUNK_SIZE]))})")
+    for start in range(0, len(titles), WIQL_CHUNK_SIZE):
+        conditions.append(f"LOWER(sc.title) IN ({', '.join(map(suiteql_literal, titles[start:start + WIQL_CHUNK_SIZE]))})")
+    found = set()
+    for condition in conditions:
+        for case in iter_netsuite_cases(where=condition):
+            if case['id'] not in found:
+                found.add(case['id'])
+                yield case
+
+def lookup_netsuite_case(index, work_item, links):
+    """Find the case for a work item. One already paired is only found by its case ID."""
+    case_id = work_item.get('external_id') or links.get(work_item['id'])
+    return index.match(work_item['title'], case_id, fallback=case_id is None)
+
+def create_or_update_azure_work_item(case, index, batch, fingerprints=None):
+    """Queue the create or update of the work item for a case on an AzureWriteBatch.
+
+    With a FingerprintTracker, a linked pair that has not changed since its last sync is skipped.
+    """
+    work_item = lookup_azure_work_item(index, case)
+    if work_item:
+        if work_item['id'] is None:  # Creation still pending in the batch
+            return
+        if fingerprints is not None and fingerprints.unchanged(case, work_item):
+            return
+        ensure_linked(case, work_item)
+        if case['status'] == 'Closed' and work_item['status'] != 'Closed':  # The other mapped fields follow along
+            queue_azure_update(batch, case, work_item, get_mapping().diff(case, work_item), fingerprints)
+            return
+        if fingerprints is not None:  # Already in sync
+            fingerprints.record(case, work_item)
+    else:
+        values = get_mapping().new_work_item_values(case)
+        mapped_status = values['status']
+        pending_item = AzureWorkItem(**values, id=None, title=case['title'],
+                                     external_id=case['id'] if config["azure_external_id_field"] else None)
+        index_azure_work_item(index, pending_item)  # Stops duplicate titles in the same run creating twice
+
+        def on_created(body):
+            pending_item['id'] = body.get('id')
+            pending_item['rev'] = body.get('rev')
+            if pending_item['id'] is not None:
+                get_store().upsert_azure_work_items([pending_item])
+                get_store().link(case['id'], pending_item['id'])
+                journal_change("azure", pending_item['id'], CREATED, None, mapped_status, pending_item['rev'])  # Rolled back by deleting it
+            record_log(f"Azure Work Item {pending_item['id']} created with status {mapped_status} for NetSuite case {case['id']}.")
+            post_to_teams(case, mapped_status)
+            if fingerprints is not None and pending_item['id'] is not None:
+                fingerprints.record(case, pending_item)
+        batch.queue_create(get_mapping().work_item_type(case.get('type')), build_azure_work_item_patch(case, values), on_created, case)
+
+def ensure_linked(case, work_item):
+    """Record the link between a case and the work item matched to it, if it is not recorded yet."""
+    if str(work_item.get('linked_case_id', work_item.get('external_id'))) != str(case['id']):
+        get_store().link(case['id'], work_item['id'])
+        work_item['linked_case_id'] = str(case['id'])
+
+def queue_azure_update(batch, case, work_item, changes, fingerprints=None):
+    """Queue a work item's mapped field changes (from FieldMapping.diff) on the batch.
+
+    The index copy is updated straight away; the changes are journaled once the write succeeds.
+    """
+    before = {field.name: work_item[field.name] for field, _, _ in changes}
+
+    def on_updated(body):
+        record_azure_changes(case, work_item, changes, before, body)
+        if fingerprints is not None:
+            fingerprints.record(case, work_item)
+    batch.queue_update(work_item['id'], FieldMapping.azure_ops(changes), on_updated)
+    for field, azure_value, _ in changes:
+        work_item[field.name] = azure_value
+
+def record_azure_changes(case, work_item, changes, before, body):
+    """Mirror, journal, log and announce field changes written to a work item."""
+    for field, azure_value, _ in changes:
+        journal_change("azure", work_item['id'], field.azure_path, before[field.name], azure_value, body.get('rev'))
+        if field.name == "status":
+            get_store().set_azure_status(work_item['id'], azure_value)
+            record_log(f"Azure Work Item {work_item['id']} updated to {azure_value}.")
+            record_log(f"Azure Work Item {work_item['id']} updated to {azure_value} due to NetSuite case {case['id']} status change.")
+            post_to_teams(work_item, azure_value)
+        else:
+            record_log(f"Azure Work Item {work_item['id']} {field.name} set to {azure_value} from NetSuite case {case['id']}.")
+
+def build_azure_work_item_patch(case, values):
+    """JSON-patch document for a new work item created from a NetSuite case (values from new_work_item_values)."""
+    mapping = get_mapping()
+    data = [{"op": "add", "path": "/fields/System.Title", "value": case['title']}]
+    data += [{"op": "add", "path": f"/fields/{mapping.by_name[name].azure_path}", "value": value} for name, value in values.items()]
+    if config["azure_external_id_field"]:
+        data.append({"op": "add", "path": f"/fields/{config['azure_external_id_field']}", "value": str(case['id'])})
+    return data
+
+# Azure DevOps batch APIs: $batch for writes, workitemsbatch for reads by ID
+AZURE_BATCH_LIMIT = 200  # Maximum requests per $batch call and IDs per workitemsbatch call
+
+def iter_azure_work_items_by_ids(ids):
+    """Yield normalized work items for the given IDs, fetching azure_page_size (at most 200) at a time."""
+    url = azure_project_url('wit/workitemsbatch?api-version=6.0')
+    fields = ["System.Id", "System.Title", "System.State", "System.WorkItemType", "System.ChangedDate"]
+    if config["azure_external_id_field"]:
+        fields.append(config["azure_external_id_field"])
+    fields += [field.azure_path for field in get_mapping().extra_fields]
+
+    ids = iter(ids)
+    chunk_size = min(config["azure_page_size"], AZURE_BATCH_LIMIT)
+    while True:
+        chunk = list(itertools.islice(ids, chunk_size))  # IDs may still be streaming in from WIQL pages
+        if not chunk:
+            return
+        data = {"ids": chunk, "fields": fields, "errorPolicy": "Omit"}
+        response = get_client("azure").request("POST", url, json=data, idempotent=True)  # A read, safe to retry
+        response.raise_for_status()
+        work_items = [normalize_azure_work_item(item) for item in response.json().get('value', []) if item]  # errorPolicy=Omit returns null for missing IDs
+        get_store().upsert_azure_work_items(work_items)
+        count_items("azure_work_items_read", len(work_items))
+        yield from work_items
+
+class AzureWriteBatch:
+    """Collects Azure work item creates, updates and deletes and sends them as $batch requests.
+
+    Each queued write carries a callback that runs with the parsed response body once the
+    write succeeds. Callbacks run in queue order, so sync_log and the undo journal keep the
+    same order as when every write was sent on its own. Creates queued for a case are noted
+    under an idempotency key before they are sent; if a batch fails in a way that may have
+    left some applied, the work items they made are looked up and their callbacks run, so
+    nothing is created twice.
+    """
+
+    def __init__(self):
+        self.pending = []
+
+    def queue_create(self, work_item_type, patch, on_success=None, case=None):
+        create = (create_key(case['id']), case['id'], case['title']) if case is not None else None
+        self._queue("PATCH", f'/{urllib.parse.quote(config["azure_project"], safe="")}/_apis/wit/workitems/${urllib.parse.quote(work_item_type, safe="")}?api-version=6.0', patch, on_success, create)
+
+    def queue_update(self, work_item_id, patch, on_success=None):
+        self._queue("PATCH", f'/_apis/wit/workitems/{work_item_id}?api-version=6.0', patch, on_success)
+
+    def queue_delete(self, work_item_id, on_success=None):
+        self._queue("DELETE", f'/_apis/wit/workitems/{work_item_id}?api-version=6.0', None, on_success)
+
+    def _queue(self, method, uri, body, on_success, create=None):
+        request = {"method": method, "uri": uri, "headers": {"Content-Type": "application/json-patch+json"}}
+        if body is not None:
+            request["body"] = body
+        self.pending.append((request, on_success, create))
+        if len(self.pending) >= AZURE_BATCH_LIMIT * config["azure_max_workers"]:
+            self.flush()
+
+    def flush(self):
+        """Send all queued writes, AZURE_BATCH_LIMIT per request, and run their callbacks."""
+        url = azure_org_url('wit/$batch?api-version=6.0')
+        chunks = [self.pending[start:start + AZURE_BATCH_LIMIT] for start in range(0, len(self.pending), AZURE_BATCH_LIMIT)]
+        self.pending = []
+        started = datetime.now(timezone.utc)
+
+        def send(chunk):
+            creates = [create for _, _, create in chunk if create is not None]
+            if creates:
+                get_store().record_creates(ensure_run(), creates)
+            try:
+                response = get_client("azure").request("POST", url, json=[request for request, _, _ in chunk])
+                response.raise_for_status()
+                return response.json().get('value', [])
+            except requests.exceptions.RequestException as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=config["azure_max_workers"]) as executor:
+            for chunk, results in zip(chunks, executor.map(send, chunks)):  # Callbacks run in queue order
+                if isinstance(results, Exception):
+                    report_error("Batch Error", f"Failed to send {len(chunk)} Azure DevOps changes: {str(results)}")
+                    creates = [create for _, _, create in chunk if create is not None]
+                    if not creates or request_not_sent(results):
+                        continue
+                    found = find_created_work_items(creates, started)  # The batch may have been applied before it failed
+                    results = [{"code": 200, "body": found[create[0]]} if create is not None and create[0] in found else None
+                               for _, _, create in chunk]
+                created = {}
+                for (request, on_success, create), result in zip(chunk, results):
+                    if result is None:  # Part of a failed batch, reported above
+                        continue
+                    if result.get('code', 500) >= 400:
+                        report_error("Batch Error", f"Failed {request['method']} {request['uri']}: {result.get('code')}, {result.get('body')}")
+                        continue
+                    count_items("azure_writes")
+                    body = result.get('body')
+                    body = json.loads(body) if isinstance(body, str) and body else (body or {})
+                    if create is not None:
+                        created[create[0]] = body.get('id')
+                    if on_success:
+                        on_success(body)
+                if created:
+                    get_store().confirm_creates(created)
+
+def create_key(case_id):
+    """Idempotency key of the create of a case's work item: one per case and run (a resumed run keeps its ID)."""
+    return f"{ensure_run()}:azure:create:{case_id}"
+
+def find_created_work_items(creates, since):
+    """Work items made by creates that were sent without a reply, as {idempotency key: {"id", "rev", "status"}}.
+
+    creates are (key, NetSuite case ID, title). A create went through if a work item with its
+    title was created since it was sent (less delta_overlap_seconds for clock skew); each work
+    item is credited to one create at most.
+    """
+    keys_by_title = {}
+    for key, _, title in creates:
+        keys_by_title.setdefault(normalize_title(title), []).append(key)
+    created_since = wiql_literal((since - timedelta(seconds=config["delta_overlap_seconds"])).strftime('%Y-%m-%dT%H:%M:%SZ'))
+    found = {}
+    for start in range(0, len(creates), WIQL_CHUNK_SIZE):
+        titles = ', '.join(wiql_literal(title) for _, _, title in creates[start:start + WIQL_CHUNK_SIZE])
+        ids = query_azure_work_item_ids(f"SELECT [System.Id] FROM WorkItems WHERE [System.TeamProject] = @project "
+                                        f"AND [System.CreatedDate] >= {created_since} AND [System.Title] IN ({titles}) ORDER BY [System.Id]")
+        for item in iter_azure_work_items_by_ids(ids):
+            keys = keys_by_title.get(normalize_title(item['title']))
+            if keys:
+                found[keys.pop(0)] = {"id": item['id'], "rev": item['rev'], "status": item['status']}
+    return found
+
+def recover_creates(run_id):
+    """Settle the creates an interrupted run sent without hearing back.
+
+    The work items that were made are linked to their cases and journalled as created by the
+    run, so the resumed run updates them instead of creating them again and an undo removes them.
+    """
+    rows = get_store().unconfirmed_creates(run_id)
+    if not rows:
+        return
+    found = find_created_work_items([(key, case_id, title) for key, case_id, title, _ in rows],
+                                    min(parse_timestamp(sent_at) for _, _, _, sent_at in rows))
+    for key, case_id, title, _ in rows:
+        if key in found:
+            work_item = found[key]
+            get_store().link(case_id, work_item['id'])
+            journal_change("azure", work_item['id'], CREATED, None, work_item['status'], work_item['rev'])
+            record_log(f"Azure Work Item {work_item['id']} created with status {work_item['status']} for NetSuite case {case_id}.")
+    get_store().confirm_creates({key: work_item['id'] for key, work_item in found.items()})
+
+def set_netsuite_case_fields(case_id, body):
+    """PATCH a case with a body of NetSuite fields as given (no mapping)."""
+    response = get_client("netsuite").request("PATCH", netsuite_record_url(f'supportCase/{case_id}'), json=body)
+    response.raise_for_status()
+    count_items("netsuite_writes")
+
+def set_netsuite_case_status(case_id, status):
+    """PATCH a case's status as given (no mapping) and mirror it locally."""
+    set_netsuite_case_fields(case_id, {"status": get_mapping().wrap_netsuite("status", status)})
+    get_store().set_netsuite_status(case_id, status)
+
+def update_netsuite_case_status(case_id, status, current_status=None, ticket_type=None):
+    """Set a case to the NetSuite status mapped from an Azure state for its ticket type.
+
+    Returns the case's status afterwards, or None if the update failed. A case already in
+    the mapped status is left alone.
+    """
+    try:
+        mapped_status = map_status(ticket_type, status)
+        if current_status == mapped_status:
+            count_items("writes_skipped")
+            return mapped_status
+
+        set_netsuite_case_status(case_id, mapped_status)
+        if current_status is None:  # Unknown: assume it was the opposite
+            current_status = "Open" if mapped_status == "Closed" else "Closed"
+        journal_change("netsuite", case_id, "status", current_status, mapped_status)
+        record_log(f"NetSuite case {case_id} updated to {mapped_status} due to Azure Work Item status change.")
+        return mapped_status
+    except requests.exceptions.RequestException as e:
+        report_error("Update Error", f"Failed to update NetSuite case {case_id}: {str(e)}")
+        return None
+
+# Incremental (delta) sync: per-direction watermarks and change queries
+WIQL_CHUNK_SIZE = 100  # Titles per WIQL IN (...) clause
+
+def load_watermark(direction):
+    """Watermark for a direction ("netsuite_to_azure" or "azure_to_netsuite"), or None before the first sync."""
+    return get_store().get_state(f"watermark:{direction}")
+
+def save_watermark(direction, watermark):
+    get_store().set_state(f"watermark:{direction}", watermark)
+
+def parse_timestamp(value, zone=timezone.utc):
+    """Aware datetime of an ISO timestamp; one without an offset is taken to be in zone."""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=zone)
+
+class WatermarkTracker:
+    """Builds the next watermark for a direction while a run streams records through it.
+
+    A watermark is the time the last successful run started plus the IDs (and their
+    modified times) seen inside the overlap window before it. A delta run re-reads that
+    window to cover clock skew and uses the seen IDs to skip records it already synced.
+    The IDs a run reads are only saved as seen along with a watermark from a run without
+    errors, so a record whose write failed is read and written again by the next delta.
+    The watermark is never later than the newest modified time the source returned, so it
+    stays on the source's clock even if this machine's clock (or netsuite_timezone) is off.
+    """
+
+    def __init__(self, direction, full=False):
+        self.direction = direction
+        self.previous = None if full else load_watermark(direction)
+        self.started = datetime.now(timezone.utc)
+        self.window_start = self.started - timedelta(seconds=config["delta_overlap_seconds"])
+        self.seen = {}
+        self.newest = None  # Latest modified time read
+
+    @property
+    def since(self):
+        """Lower bound for the change query, or None for a full read."""
+        if not self.previous:
+            return None
+        return parse_timestamp(self.previous["synced_at"]) - timedelta(seconds=config["delta_overlap_seconds"])
+
+    def track(self, records):
+        """Pass records through, skipping ones already synced by the previous run."""
+        previously_seen = self.previous.get("seen", {}) if self.previous else {}
+        for record in records:
+            key = str(record['id'])
+            modified = parse_timestamp(record.get('modified'))
+            if modified and (self.newest is None or modified > self.newest):
+                self.newest = modified
+            if modified and modified >= self.window_start:
+                self.seen[key] = record['modified']
+            if record.get('modified') and previously_seen.get(key) == record['modified']:
+                continue
+            yield record
+
+    def state(self):
+        synced_at = min(self.started, self.newest) if self.newest else self.started
+        return {"synced_at": synced_at.isoformat(), "seen": self.seen}
+
+    def resume(self, state):
+        """Carry on from the state() of an interrupted run, so the watermark still starts when that run did."""
+        self.started = parse_timestamp(state["synced_at"])
+        self.window_start = self.started - timedelta(seconds=config["delta_overlap_seconds"])
+        self.seen = dict(state["seen"])
+
+    def commit(self, earlier_errors=0):
+        """Persist the watermark, unless this run (or the interrupted part before it) had errors.
+
+        Then the previous watermark stays, so the next delta re-reads what this run read.
+        """
+        if run_errors or earlier_errors:
+            print(f"Keeping the previous {self.direction} watermark: the run had {len(run_errors) + earlier_errors} errors.")
+            return
+        save_watermark(self.direction, self.state())
+
+class RunCheckpoint:
+    """Progress of a long sync, saved every checkpoint_every records so an interrupted run can resume.
+
+    Records are handled in ID order (SuiteQL and WIQL pages are keyed on it), so progress is
+    the last ID whose writes have all been sent. A resumed run keeps the interrupted run's ID,
+    so the undo journal treats both parts as one run, and its watermark start, so the next
+    delta still covers everything changed since the run first began. An interrupted delta
+    run is dropped when a full one is asked for instead.
+    """
+
+    def __init__(self, name, full=False):
+        self.name = name
+        saved = get_store().load_checkpoint(name)
+        if saved and full and not saved[1]["full"]:
+            get_store().delete_checkpoint(name)
+            saved = None
+        self.run_id, self.state = saved or (None, {"full": full, "after": 0, "processed": 0, "errors": 0, "watermarks": {}})
+        self.full = self.state["full"]
+        self.after = self.state["after"]  # Fetchers start after this ID
+        self.earlier_errors = self.state.get("errors", 0)  # Of the interrupted part; they hold back the watermarks too
+        self.watermarks = []
+        self.last_id = None
+        self.pending_count = 0
+
+    def start(self, kind):
+        """Start the run, or carry on with the interrupted one after settling the creates it left unconfirmed."""
+        start_run(kind, self.run_id)
+        if self.run_id is not None:
+            print(f"Resuming run {self.run_id} after record {self.after} ({self.state['processed']} done before it stopped).")
+            recover_creates(self.run_id)
+
+    def track_watermark(self, watermark):
+        """Save watermark with each checkpoint (restoring it first when resuming) and return it."""
+        if watermark.direction in self.state["watermarks"]:
+            watermark.resume(self.state["watermarks"][watermark.direction])
+        self.watermarks.append(watermark)
+        return watermark
+
+    def chunks(self, records):
+        """Yield records in lists of checkpoint_every; call save() once the writes of each list are done."""
+        records = iter(records)
+        while True:
+            chunk = list(itertools.islice(records, config["checkpoint_every"] or 1000))
+            if not chunk:
+                return
+            self.last_id = chunk[-1]['id']
+            self.pending_count += len(chunk)
+            yield chunk
+
+    def save(self):
+        if not config["checkpoint_every"] or self.last_id is None:
+            return
+        self.state.update(after=self.last_id, processed=self.state["processed"] + self.pending_count,
+                          errors=self.earlier_errors + len(run_errors),
+                          watermarks={watermark.direction: watermark.state() for watermark in self.watermarks})
+        self.pending_count = 0
+        get_store().save_checkpoint(self.name, current_run_id, self.state)
+
+    def finish(self):
+        """Drop the checkpoint once the run has completed."""
+        get_store().delete_checkpoint(self.name)
+
+# Change detection: fingerprints of the synced fields of each linked pair
+def pair_fingerprint(case, work_item):
+    """Hash of the fields a sync reads from a linked case and work item."""
+    values = [str(case['id']), work_item['id'], case.get('type') or "Enhancement"]
+    for field in get_mapping().fields:
+        values += [case.get(field.name), work_item.get(field.name)]
+    return hashlib.blake2b(json.dumps(values).encode(), digest_size=16).hexdigest()
+
+class FingerprintTracker:
+    """Skips linked pairs whose synced fields are unchanged since they were last synced.
+
+    Fingerprints are kept per direction ("netsuite_to_azure" or "azure_to_netsuite"), as a
+    pair in sync one way may still need a write the other way. They are loaded once per
+    run; a pair is recorded once it is known to be in sync, and commit() saves what the
+    run recorded in one transaction.
+    """
+
+    def __init__(self, direction):
+        self.direction = direction
+        self.stored = get_store().load_fingerprints(direction)
+        self.recorded = {}
+
+    def unchanged(self, case, work_item):
+        if self.stored.get(str(case['id'])) == pair_fingerprint(case, work_item):
+            count_items("pairs_unchanged")
+            return True
+        return False
+
+    def record(self, case, work_item):
+        self.recorded[str(case['id'])] = (work_item['id'], pair_fingerprint(case, work_item))
+
+    def commit(self):
+        if self.recorded:
+            get_store().save_fingerprints(self.direction, self.recorded)
+            self.stored.update((case_id, fingerprint) for case_id, (_, fingerprint) in self.recorded.items())
+            self.recorded = {}
+
+def sync_case_from_work_item(case, work_item, fingerprints):
+    """Bring a linked case in line with its work item and record the pair once it is in sync."""
+    changes = get_mapping().diff(case, work_item)
+    if changes:
+        update_netsuite_case(case, work_item, changes, fingerprints)
+    else:
+        count_items("writes_skipped")
+        fingerprints.record(case, work_item)
+
+def update_netsuite_case(case, work_item, changes, fingerprints=None):
+    """PATCH a case with its work item's values for the given changes (from FieldMapping.diff) in one request."""
+    try:
+        set_netsuite_case_fields(case['id'], FieldMapping.netsuite_body(changes))
+    except requests.exceptions.RequestException as e:
+        report_error("Update Error", f"Failed to update NetSuite case {case['id']}: {str(e)}")
+        return
+    for field, _, netsuite_value in changes:
+        journal_change("netsuite", case['id'], field.netsuite_key, case[field.name], netsuite_value)
+        case[field.name] = netsuite_value
+        if field.name == "status":
+            get_store().set_netsuite_status(case['id'], netsuite_value)
+            record_log(f"NetSuite case {case['id']} updated to {netsuite_value} due to Azure Work Item status change.")
+        else:
+            record_log(f"NetSuite case {case['id']} {field.name} set to {netsuite_value} from Azure Work Item {work_item['id']}.")
+    if fingerprints is not None:
+        fingerprints.record(case, work_item)
+
+def query_azure_work_item_ids(wiql, top=None):
+    """Run a WIQL query and return the matching work item IDs."""
+    url = azure_project_url('wit/wiql?api-version=6.0')
+    params = {"timePrecision": "true"}
+    if top:
+        params["$top"] = top
+    response = get_client("azure").request("POST", url, json={"query": wiql}, params=params, idempotent=True)
+    response.raise_for_status()
+    return [item["id"] for item in response.json().get('workItems', [])]
+
+def wiql_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+def iter_azure_work_items_changed_since(since, condition=None, after_id=0):
+    """Yield work items whose System.ChangedDate is at or after since (and that match condition, if given)."""
+    changed = f"[System.ChangedDate] >= {wiql_literal(since.strftime('%Y-%m-%dT%H:%M:%SZ'))}"
+    return iter_azure_work_items(f"{changed} AND ({condition})" if condition else changed, after_id)
+
+def iter_azure_work_items_for_cases(cases):
+    """Yield the work items that could match the given cases: by title, external ID or stored link.
+
+    Linked work items are read by ID, so a pair stays matched after either title is edited.
+    """
+    ids = []
+    for start in range(0, len(cases), WIQL_CHUNK_SIZE):
+        chunk = cases[start:start + WIQL_CHUNK_SIZE]
+        condition = f"[System.Title] IN ({', '.join(wiql_literal(case['title']) for case in chunk)})"
+        if config["azure_external_id_field"]:
+            condition += f" OR [{config['azure_external_id_field']}] IN ({', '.join(wiql_literal(case['id']) for case in chunk)})"
+        ids.extend(query_azure_work_item_ids(
+            f"SELECT [System.Id] FROM WorkItems WHERE [System.TeamProject] = @project AND ({condition})"))
+    ids.extend(get_store().linked_azure_ids(case['id'] for case in cases))
+    return iter_azure_work_items_by_ids(dict.fromkeys(ids))
+
+# Undo journal: each change is appended to the local store as it is made, under the ID of its run
+CREATED = "(created)"  # Field recorded for a work item a run created; rolled back by deleting it
+DELETED = "(deleted)"  # ...and for one it deleted; rolled back by restoring it from the recycle bin
+
+current_run_id = None
+
+def start_run(kind, run_id=None):
+    """Start a run, or carry on with an interrupted one (run_id) so both parts share one undo entry."""
+    global current_run_id
+    sync_log.clear()  # Clear the log before starting a new sync
+    run_errors.clear()
+    current_run_id = run_id if run_id is not None else get_store().start_run(kind)
+
+def ensure_run():
+    """ID of the current run. A write outside any run (e.g. a direct call) gets a run of its own."""
+    global current_run_id
+    if current_run_id is None:
+        current_run_id = get_store().start_run("manual")
+    return current_run_id
+
+def finish_run():
+    global current_run_id
+    if current_run_id is not None:
+        get_store().finish_run(current_run_id)
+        current_run_id = None
+
+def journal_change(system, record_id, field, before, after, rev=None, undoes=()):
+    """Append a committed change to the undo journal of the current run."""
+    get_store().journal_change(ensure_run(), system, record_id, field, before, after, rev, undoes)
+
+# Bidirectional sync: one read of each system, change sets for both sides, writes applied concurrently
+CONFLICT_POLICIES = ("last_writer_wins", "source_of_truth")
+
+def field_owners():
+    """Parse the field_owners setting ("status=netsuite,...") into {field: system}."""
+    if config["conflict_policy"] not in CONFLICT_POLICIES:
+        raise ValueError(f"conflict_policy must be one of {', '.join(CONFLICT_POLICIES)}, not {config['conflict_policy']!r}")
+    owners = {}
+    for pair in filter(None, (part.strip() for part in config["field_owners"].split(","))):
+        field, _, system = (part.strip() for part in pair.partition("="))
+        if system not in ("netsuite", "azure"):
+            raise ValueError(f"field_owners entry {pair!r} must name netsuite or azure")
+        owners[field] = system
+    return owners
+
+def resolve_conflict(field, case, work_item, owners):
+    """Which system's value of a field wins when a linked pair disagrees: "netsuite" or "azure"."""
+    if config["conflict_policy"] == "last_writer_wins":
+        # Compared in UTC: a NetSuite time without an offset (e.g. from an event) is local to netsuite_timezone
+        case_modified = parse_timestamp(case.get('modified'), netsuite_zone())
+        item_modified = parse_timestamp(work_item.get('modified'))
+        if case_modified and item_modified and case_modified != item_modified:
+            return "netsuite" if case_modified > item_modified else "azure"
+    return owners.get(field, "netsuite")  # Source of truth, and the tiebreak when a timestamp is missing
+
+def reconcile_pair(case, work_item, owners, batch, netsuite_updates, fingerprints):
+    """Plan the writes that bring a linked pair in line, field by field.
+
+    Azure changes are queued on the batch and NetSuite ones appended to netsuite_updates,
+    so both change sets can be applied at the same time. A pair written on both sides is
+    fingerprinted on the next run, once both writes are known to have succeeded.
+    """
+    if fingerprints.unchanged(case, work_item):
+        return
+    ensure_linked(case, work_item)
+    changes = get_mapping().diff(case, work_item)
+    if not changes:
+        fingerprints.record(case, work_item)
+        return
+    azure_changes, netsuite_changes = [], []
+    for change in changes:
+        winner = resolve_conflict(change[0].name, case, work_item, owners)
+        count_items(f"{winner}_wins")
+        (azure_changes if winner == "netsuite" else netsuite_changes).append(change)
+    both_sides = bool(azure_changes and netsuite_changes)
+    if azure_changes:
+        queue_azure_update(batch, case, work_item, azure_changes, None if both_sides else fingerprints)
+    if netsuite_changes:
+        netsuite_updates.append((case, work_item, netsuite_changes, None if both_sides else fingerprints))
+
+def sync_both_ways(netsuite_cases, azure_index, checkpoint=None):
+    """Join cases to the indexed work items and sync each pair in whichever direction wins.
+
+    Cases with no work item get one created, as in a NetSuite to Azure sync. The Azure
+    batch and the NetSuite updates are written concurrently, once per checkpoint's worth
+    of cases if a checkpoint is given (or all at once).
+    """
+    owners = field_owners()
+    batch = AzureWriteBatch()
+    fingerprints = FingerprintTracker("bidirectional")
+    for chunk in checkpoint.chunks(netsuite_cases) if checkpoint else [netsuite_cases]:
+        netsuite_updates = []
+        with phase("match_cases"):
+            for case in chunk:
+                work_item = lookup_azure_work_item(azure_index, case)
+                if work_item is None or work_item['id'] is None:
+                    create_or_update_azure_work_item(case, azure_index, batch, fingerprints)
+                else:
+                    reconcile_pair(case, work_item, owners, batch, netsuite_updates, fingerprints)
+                count_items("cases_processed")
+        with phase("write_both"), ThreadPoolExecutor(max_workers=1) as executor:
+            azure_writes = executor.submit(collect_log_entries, batch.flush)
+            run_in_pool("netsuite", lambda update: update_netsuite_case(*update), netsuite_updates)
+            sync_log.extend(azure_writes.result())  # After the NetSuite entries, whichever side finished first
+        fingerprints.commit()
+        if checkpoint:
+            checkpoint.save()
+
+def run_bidirectional_sync(full=False):
+    """Sync both directions from a single read of each system (full, or changes since the last run).
+
+    Full runs are checkpointed and resume where they stopped; a delta run is redone whole.
+    """
+    field_owners()  # Fail on bad settings before reading anything
+    full = full or load_watermark("bidirectional_netsuite") is None or load_watermark("bidirectional_azure") is None
+    checkpoint = RunCheckpoint("bidirectional", full)
+    full = checkpoint.full
+    checkpoint.start("sync")
+    # Separate trackers: case and work item IDs overlap
+    netsuite_watermark = checkpoint.track_watermark(WatermarkTracker("bidirectional_netsuite", full))
+    azure_watermark = checkpoint.track_watermark(WatermarkTracker("bidirectional_azure", full))
+    links = get_store().links_by_azure_id()
+    if full:
+        # NetSuite pages download while the Azure index builds
+        netsuite_cases = prefetch(netsuite_watermark.track(iter_netsuite_cases(after_id=checkpoint.after)))
+        with phase("index_azure"):
+            azure_index = build_azure_work_item_index(azure_watermark.track(iter_azure_work_items()), links)
+    else:  # Delta: the records changed on either side, joined with their counterparts
+        with phase("fetch_netsuite"):
+            netsuite_cases = list(netsuite_watermark.track(iter_netsuite_cases(modified_since=netsuite_watermark.since)))
+        with phase("index_azure"):
+            changed_work_items = list(azure_watermark.track(iter_azure_work_items_changed_since(azure_watermark.since)))
+            work_items = {item['id']: item for item in iter_azure_work_items_for_cases(netsuite_cases)}
+            work_items.update((item['id'], item) for item in changed_work_items)
+            azure_index = build_azure_work_item_index(work_items.values(), links)
+        # A case that has not changed since the last run is current in the local mirror
+        case_ids = {str(case['id']) for case in netsuite_cases}
+        for work_item in changed_work_items:
+            case_id = work_item.get('external_id') or links.get(work_item['id'])
+            case = get_store().get_netsuite_case(case_id) if case_id else get_store().find_netsuite_case_by_title(work_item['title'])
+            if case is not None and case['id'] not in case_ids:
+                case_ids.add(case['id'])
+                netsuite_cases.append(case)
+    sync_both_ways(netsuite_cases, azure_index, checkpoint if full else None)
+    netsuite_watermark.commit(checkpoint.earlier_errors)
+    azure_watermark.commit(checkpoint.earlier_errors)
+    checkpoint.finish()
+
+@measured_run("sync")
+def run_sync(direction, full=False):
+    """Sync all cases in one direction. Raises if the sync fails; per-item errors go to report_error.
+
+    Progress is checkpointed (see RunCheckpoint), so a run that stops part way resumes
+    where it left off the next time it is started.
+    """
+    if direction == NETSUITE_TO_AZURE:
+        checkpoint = RunCheckpoint("netsuite_to_azure", full)
+        checkpoint.start("sync")
+        watermark = checkpoint.track_watermark(WatermarkTracker("netsuite_to_azure", checkpoint.full))
+        if watermark.since is None:
+            # NetSuite pages download while the Azure index builds
+            netsuite_cases = prefetch(watermark.track(iter_netsuite_cases(after_id=checkpoint.after)))
+            with phase("index_azure"):
+                azure_index = build_azure_work_item_index(iter_azure_work_items(), get_store().links_by_azure_id())  # One Azure read per run
+        else:  # Delta: only changed cases, and only the work items they could match
+            with phase("fetch_netsuite"):
+                netsuite_cases = list(watermark.track(iter_netsuite_cases(modified_since=watermark.since, after_id=checkpoint.after)))
+            with phase("index_azure"):
+                azure_index = build_azure_work_item_index(iter_azure_work_items_for_cases(netsuite_cases), get_store().links_by_azure_id())
+        batch = AzureWriteBatch()
+        fingerprints = FingerprintTracker("netsuite_to_azure")
+        for chunk in checkpoint.chunks(netsuite_cases):
+            with phase("match_cases"):  # Includes waiting on NetSuite pages still downloading
+                for case in chunk:
+                    create_or_update_azure_work_item(case, azure_index, batch, fingerprints)
+                    count_items("cases_processed")
+            with phase("write_azure"):
+                batch.flush()
+            fingerprints.commit()
+            checkpoint.save()
+        watermark.commit(checkpoint.earlier_errors)
+        checkpoint.finish()
+    elif direction == AZURE_TO_NETSUITE:
+        checkpoint = RunCheckpoint("azure_to_netsuite", full)
+        checkpoint.start("sync")
+        watermark = checkpoint.track_watermark(WatermarkTracker("azure_to_netsuite", checkpoint.full))
+        if watermark.since is None:  # Only closed work items can change a case
+            azure_work_items = iter_azure_work_items(AZURE_CLOSED, after_id=checkpoint.after)
+        else:
+            azure_work_items = iter_azure_work_items_changed_since(watermark.since, AZURE_CLOSED, after_id=checkpoint.after)
+
+        candidate_cases = selected_cases
+        if not candidate_cases:  # Nothing selected (e.g. headless runs): match against every open NetSuite case
+            if config["netsuite_cases_from_mirror"]:
+                candidate_cases = get_store().iter_netsuite_cases(exclude_status='Closed')
+            else:  # Read live, which also refreshes the mirror: new cases and current statuses
+                candidate_cases = iter_netsuite_cases(where=NETSUITE_NOT_CLOSED)
+        links = get_store().links_by_azure_id()
+        with phase("index_netsuite"):
+            case_index = build_netsuite_case_index((c for c in candidate_cases if c['status'] != 'Closed'), links)
+
+        fingerprints = FingerprintTracker("azure_to_netsuite")
+
+        def pending_updates(work_items):
+            for work_item in work_items:
+                count_items("work_items_processed")
+                corresponding_case = lookup_netsuite_case(case_index, work_item, links)
+                # Both sides were filtered by status on the server (or above, for a selection)
+                if corresponding_case and not fingerprints.unchanged(corresponding_case, work_item):
+                    if work_item.get('external_id') in (None, '') and work_item['id'] not in links:
+                        ensure_linked(corresponding_case, work_item)  # Matched by title: found by ID from now on
+                    yield corresponding_case, work_item
+
+        with phase("write_netsuite"):  # Includes reading Azure pages, which download in the background
+            for chunk in checkpoint.chunks(prefetch(watermark.track(azure_work_items))):
+                run_in_pool("netsuite", lambda pair: sync_case_from_work_item(*pair, fingerprints), pending_updates(chunk))
+                fingerprints.commit()
+                checkpoint.save()
+        watermark.commit(checkpoint.earlier_errors)
+        checkpoint.finish()
+    elif direction == BIDIRECTIONAL:
+        run_bidirectional_sync(full)
+    else:
+        raise ValueError(f"Unknown sync direction: {direction}")
+
+@measured_run("selected_sync")
+def run_selected_sync(direction, cases):
+    """Sync only the given cases in one direction."""
+    start_run("selected_sync")
+
+    if direction == NETSUITE_TO_AZURE:
+        cases = list(cases)
+        with phase("index_azure"):  # Only the work items that could match the selection
+            azure_index = build_azure_work_item_index(iter_azure_work_items_for_cases(cases), get_store().links_by_azure_id())
+        batch = AzureWriteBatch()
+        fingerprints = FingerprintTracker("netsuite_to_azure")
+        with phase("match_cases"):
+            for case in cases:
+                create_or_update_azure_work_item(case, azure_index, batch, fingerprints)
+                count_items("cases_processed")
+        with phase("write_azure"):
+            batch.flush()
+        fingerprints.commit()
+    elif direction == AZURE_TO_NETSUITE:
+        with phase("write_netsuite"):  # Cases already closed are skipped without a request
+            run_in_pool("netsuite", lambda case: update_netsuite_case_status(case['id'], 'Closed', case['status'], case.get('type')), cases)  # Example logic, adjust as needed
+    elif direction == BIDIRECTIONAL:
+        cases = list(cases)
+        with phase("index_azure"):
+            azure_index = build_azure_work_item_index(iter_azure_work_items_for_cases(cases), get_store().links_by_azure_id())
+        sync_both_ways(cases, azure_index)
+    else:
+        raise ValueError(f"Unknown sync direction: {direction}")
+
+@measured_run("record_sync")
+def run_record_sync(netsuite_cases=(), azure_work_items=()):
+    """Sync just the given records (e.g. those named by webhook events) to the other system."""
+    start_run("record_sync")
+
+    netsuite_cases = list(netsuite_cases)
+    if netsuite_cases:
+        get_store().upsert_netsuite_cases(netsuite_cases)
+        with phase("index_azure"):
+            azure_index = build_azure_work_item_index(iter_azure_work_items_for_cases(netsuite_cases), get_store().links_by_azure_id())
+        batch = AzureWriteBatch()
+        fingerprints = FingerprintTracker("netsuite_to_azure")
+        with phase("match_cases"):
+            for case in netsuite_cases:
+                create_or_update_azure_work_item(case, azure_index, batch, fingerprints)
+                count_items("cases_processed")
+        with phase("write_azure"):
+            batch.flush()
+        fingerprints.commit()
+
+    azure_work_items = list(azure_work_items)
+    if azure_work_items:
+        get_store().upsert_azure_work_items(azure_work_items)
+        links = get_store().links_by_azure_id()
+        with phase("index_netsuite"):  # Read live: the mirror may not have the case, or its current status
+            case_index = build_netsuite_case_index(iter_netsuite_cases_for_work_items(azure_work_items, links), links)
+        fingerprints = FingerprintTracker("azure_to_netsuite")
+        updates = []
+        for work_item in azure_work_items:
+            corresponding_case = lookup_netsuite_case(case_index, work_item, links)
+            if (corresponding_case and work_item['status'] == 'Closed' and corresponding_case['status'] != 'Closed'
+                    and not fingerprints.unchanged(corresponding_case, work_item)):
+                updates.append((corresponding_case, work_item))
+        count_items("work_items_processed", len(azure_work_items))
+        with phase("write_netsuite"):
+            run_in_pool("netsuite", lambda pair: sync_case_from_work_item(*pair, fingerprints), updates)
+        fingerprints.commit()
+
+@measured_run("undo")
+def run_undo(run_id=None):
+    """Roll back a past run, by default the latest one with changes left to undo.
+
+    Returns the ID of the run rolled back, or None if there was nothing to undo. Azure
+    writes carry a test on the revision the run left behind and NetSuite cases are re-read
+    first, so a record edited since is skipped and logged rather than overwritten. The
+    rollback is journaled as a run of its own, so it can be undone in turn.
+    """
+    store = get_store()
+    mapping = get_mapping()
+    if run_id is None:
+        run_id = store.last_undoable_run()
+    start_run("undo")
+    if run_id is None:
+        record_log("Nothing to undo.")
+        return None
+
+    # Per record: the newest revision, and per field the oldest before-value and newest after-value
+    records = {}
+    for change in store.pending_changes(run_id):  # Newest first
+        record = records.setdefault((change['system'], change['record_id']), {"rev": change['rev'], "fields": {}, "seqs": []})
+        record["seqs"].append(change['seq'])
+        record["fields"].setdefault(change['field'], dict(change))['before'] = change['before']
+    restored = []
+    skipped = []
+
+    with phase("read_azure"):
+        azure_records = {int(record_id): record for (system, record_id), record in records.items() if system == "azure"}
+        current = {item['id']: item for item in iter_azure_work_items_by_ids(azure_records)} if azure_records else {}
+
+    batch = AzureWriteBatch()
+    restores = []
+    for work_item_id, record in azure_records.items():
+        fields = record["fields"]
+        item = current.get(work_item_id)
+        if DELETED in fields:
+            if item is None:
+                restores.append((work_item_id, record))
+            else:
+                skipped.append(f"Azure Work Item {work_item_id} (restored since)")
+            continue
+        if item is None:
+            if CREATED in fields:  # Already gone
+                store.mark_undone(record["seqs"], current_run_id)
+            else:
+                skipped.append(f"Azure Work Item {work_item_id} (deleted since)")
+            continue
+        if record["rev"] is not None and item.get('rev') != record["rev"]:
+            skipped.append(f"Azure Work Item {work_item_id} (now at revision {item.get('rev')}, run left {record['rev']})")
+            continue
+
+        if CREATED in fields:
+            def on_deleted(body, work_item_id=work_item_id, record=record, item=item):
+                store.delete_azure_work_item(work_item_id)
+                journal_change("azure", work_item_id, DELETED, item['title'], None, undoes=record["seqs"])
+                restored.append(work_item_id)
+                record_log(f"Azure Work Item {work_item_id} deleted.")
+            batch.queue_delete(work_item_id, on_deleted)
+        else:
+            patch = [{"op": "test", "path": "/rev", "value": record["rev"]}] if record["rev"] is not None else []
+            patch += [{"op": "add", "path": f"/fields/{field}", "value": change['before']} for field, change in fields.items()]
+
+            def on_restored(body, work_item_id=work_item_id, record=record):
+                for i, (field, change) in enumerate(record["fields"].items()):
+                    if field == "System.State":
+                        store.set_azure_status(work_item_id, change['before'])
+                    journal_change("azure", work_item_id, field, change['after'], change['before'], body.get('rev'),
+                                   undoes=record["seqs"] if i == 0 else ())
+                    record_log(f"Azure Work Item {work_item_id} updated to {change['before']}.")
+                restored.append(work_item_id)
+            batch.queue_update(work_item_id, patch, on_restored)
+
+    def restore(entry):
+        work_item_id, record = entry
+        try:
+            response = get_client("azure").request("PATCH", azure_project_url(f'wit/recyclebin/{work_item_id}?api-version=6.0'),
+                                                   json={"IsDeleted": False})
+            response.raise_for_status()
+            journal_change("azure", work_item_id, CREATED, None, None, undoes=record["seqs"])
+            restored.append(work_item_id)
+            record_log(f"Azure Work Item {work_item_id} restored from the recycle bin.")
+        except requests.exceptions.RequestException as e:
+            report_error("Undo Error", f"Failed to restore Azure Work Item {work_item_id}: {str(e)}")
+
+    def revert_netsuite(entry):
+        case_id, record = entry
+        fields = record["fields"]  # NetSuite field -> change
+        try:
+            response = get_client("netsuite").request("GET", netsuite_record_url(f'supportCase/{case_id}'), params={"fields": ",".join(fields)})
+            response.raise_for_status()
+            current = {key: netsuite_field_value(response.json().get(key)) for key in fields}
+            edited = [f"{key} is now {current[key]}, run set {change['after']}" for key, change in fields.items() if current[key] != change['after']]
+            if edited:
+                skipped.append(f"NetSuite case {case_id} ({'; '.join(edited)})")
+                return
+            set_netsuite_case_fields(case_id, {key: mapping.wrap_netsuite(key, change['before']) for key, change in fields.items()})
+            for i, (key, change) in enumerate(fields.items()):
+                if key == "status":
+                    store.set_netsuite_status(case_id, change['before'])
+                journal_change("netsuite", case_id, key, change['after'], change['before'], undoes=record["seqs"] if i == 0 else ())
+                record_log(f"NetSuite case {case_id} updated to {change['before']}." if key == "status"
+                           else f"NetSuite case {case_id} {key} set back to {change['before']}.")
+            restored.append(case_id)
+        except requests.exceptions.RequestException as e:
+            report_error("Undo Error", f"Failed to restore NetSuite case {case_id}: {str(e)}")
+
+    with phase("write_netsuite"):
+        run_in_pool("netsuite", revert_netsuite,
+                    [(record_id, record) for (system, record_id), record in records.items() if system == "netsuite"])
+    with phase("write_azure"):
+        run_in_pool("azure", restore, restores)
+        batch.flush()
+
+    for entry in skipped:
+        record_log(f"Skipped {entry}: edited after run {run_id}.")
+    record_log(f"Rolled back run {run_id}: {len(restored)} records restored, {len(skipped)} skipped.")
+    return run_id
+
+# Company ticket reports: streamed from NetSuite into a file with constant memory
+REPORT_COLUMNS = ["id", "company", "title", "status"]
+REPORT_HEADERS = ["ID", "Company", "Title", "Status"]
+
+def iter_tickets_by_companies(companies, status='Open'):
+    """Yield the tickets of the given companies with the given status, filtered by NetSuite.
+
+    Up to netsuite_max_workers companies are fetched at once, each paged by ID on its own
+    thread into a small bounded queue, so rows stream out as they arrive and memory stays
+    flat however large the report. Rows of different companies are interleaved.
+    """
+    companies = list(dict.fromkeys(companies))
+    if not companies:
+        return
+    columns = "sc.id, BUILTIN.DF(sc.company) AS company, sc.title, BUILTIN.DF(sc.status) AS status"
+    pages = queue.Queue(maxsize=config["netsuite_max_workers"] * 2)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch(company):
+        try:
+            for rows in iter_case_pages(columns, [f"BUILTIN.DF(sc.company) = {suiteql_literal(company)}",
+                                                  f"BUILTIN.DF(sc.status) = {suiteql_literal(status)}"]):
+                if not put(rows):
+                    return
+        except Exception as e:
+            put(e)
+        finally:
+            put(done)
+
+    executor = ThreadPoolExecutor(max_workers=min(len(companies), config["netsuite_max_workers"]))
+    try:
+        for company in companies:
+            executor.submit(fetch, company)
+        remaining = len(companies)
+        while remaining:
+            item = pages.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                for row in item:
+                    yield ReportRow(id=row["id"], company=intern_value(row["company"]), title=row["title"],
+                                    status=intern_value(row["status"]))
+    finally:
+        stop.set()  # Also unblocks the fetchers if the consumer stopped early
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def write_report(rows, path, progress=None, progress_every=1000):
+    """Stream rows into path and return how many were written.
+
+    The format follows the extension: .csv or .jsonl, with .gz added for gzip compression.
+    The file is written under a temporary name and only replaces path once complete.
+    progress, if given, is called with the running count every progress_every rows and at the end.
+    """
+    compressed = path.endswith(".gz")
+    base_path = path[:-3] if compressed else path
+    if not base_path.endswith((".csv", ".jsonl")):
+        raise ValueError(f"Unsupported report format: {path} (use .csv, .jsonl, .csv.gz or .jsonl.gz)")
+    temporary_path = f"{path}.tmp"
+    count = 0
+    try:
+        opener = gzip.open if compressed else open
+        with opener(temporary_path, "wt", encoding="utf-8", newline="") as file:
+            if base_path.endswith(".csv"):
+                writer = csv.writer(file)
+                writer.writerow(REPORT_HEADERS)
+                write = lambda row: writer.writerow([row[column] for column in REPORT_COLUMNS])
+            else:
+                write = lambda row: file.write(json.dumps({column: row[column] for column in REPORT_COLUMNS}) + "\n")
+            for row in rows:
+                write(row)
+                count += 1
+                if progress is not None and count % progress_every == 0:
+                    progress(count)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    if progress is not None:
+        progress(count)
+    return count
+
+def export_company_report(companies, path, progress=None, preview=None):
+    """Stream the open tickets of companies into path; returns the row count.
+
+    If preview is a list, the first 100 rows are also collected in it for display.
+    """
+    def rows():
+        for row in iter_tickets_by_companies(companies):
+            if preview is not None and len(preview) < 100:
+                preview.append(row)
+            yield row
+    return write_report(rows(), path, progress)
+
+def coerce_config_value(key, value):
+    """Convert a string setting (e.g. from the environment) to the type of its default."""
+    default = config.get(key)
+    if isinstance(default, bool):
+        return str(value).strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+def load_config_file(path):
+    """Update config from a JSON file of setting names to values."""
+    with open(path) as file:
+        values = json.load(file)
+    unknown = sorted(set(values) - set(config))
+    if unknown:
+        raise ValueError(f"Unknown settings in {path}: {', '.join(unknown)}")
+    config.update(values)
+    reset_clients()
+
+def load_config_from_env(environ, prefix="SYNCTOOL_"):
+    """Update config from environment variables named after the settings, e.g. SYNCTOOL_AZURE_PAT."""
+    for key in config:
+        if prefix + key.upper() in environ:
+            config[key] = coerce_config_value(key, environ[prefix + key.upper()])
+    reset_clients()
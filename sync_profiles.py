@@ -0,0 +1,235 @@
+"""Runs many sync profiles (NetSuite account / Azure DevOps project pairs) in parallel.
+
+A profile registry is a JSON file giving each profile its settings, direction and schedule:
+
+    {"defaults": {"netsuite_requests_per_second": 5},
+     "profiles": {
+       "acme": {"direction": "bidirectional", "interval": 300,
+                "settings": {"netsuite_account": "1234567", "azure_org": "acme", "azure_project": "Support",
+                             "mapping_path": "acme_mapping.json"}},
+       "globex": {"direction": "netsuite-to-azure", "interval": 900, "settings": {...}}}}
+
+Every run of a profile gets a fresh process from a pool, so profiles share no settings,
+HTTP clients, throttles or caches, and each keeps to its own rate limits. Each profile has
+its own local store (watermarks, links, checkpoints and undo journal), Teams outbox,
+metrics file and log under directory/<name>, unless its settings name other files.
+Secrets can stay out of the registry as SYNCTOOL_<PROFILE>_<SETTING> variables, e.g.
+SYNCTOOL_ACME_AZURE_PAT.
+
+    python sync_profiles.py --profiles profiles.json list
+    python sync_profiles.py --profiles profiles.json run --workers 8
+    python sync_profiles.py --profiles profiles.json daemon
+    python sync_profiles.py --profiles profiles.json list-runs acme
+    python sync_profiles.py --profiles profiles.json undo acme 42
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import sys
+import threading
+import time
+
+import sync_core
+import sync_cli
+
+PROFILE_NAME = re.compile(r"[A-Za-z0-9_-]+")
+PROFILE_KEYS = {"direction", "interval", "full", "settings"}
+DEFAULT_INTERVAL = 300  # Seconds between the runs of a profile in daemon mode
+ISOLATED_SETTINGS = ("local_store_path", "teams_spill_path", "metrics_json_path", "metrics_prometheus_path", "profile_path")
+
+class SyncProfile:
+    """One tenant: a NetSuite account and Azure DevOps project with their own settings and schedule.
+
+    settings layer the registry's defaults and then the profile's own settings over files
+    kept in the profile's directory; SYNCTOOL_<PROFILE>_* variables are applied last.
+    """
+
+    def __init__(self, name, entry, defaults, directory):
+        if not PROFILE_NAME.fullmatch(name):
+            raise ValueError(f"Bad profile name {name!r} (use letters, digits, '-' and '_')")
+        unknown = sorted(set(entry) - PROFILE_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown keys in profile {name}: {', '.join(unknown)}")
+        if entry.get("direction") not in sync_cli.DIRECTIONS:
+            raise ValueError(f"Profile {name} needs a direction: {', '.join(sorted(sync_cli.DIRECTIONS))}")
+        self.name = name
+        self.direction_name = entry["direction"]
+        self.direction = sync_cli.DIRECTIONS[self.direction_name]
+        self.interval = float(entry.get("interval", DEFAULT_INTERVAL))
+        if self.interval <= 0:
+            raise ValueError(f"Profile {name} needs an interval above 0 seconds")
+        self.full = bool(entry.get("full", False))
+        self.directory = os.path.join(directory, name)
+        self.log_path = os.path.join(self.directory, "sync.log")
+        self.settings = {
+            "local_store_path": os.path.join(self.directory, "synctool.db"),
+            "teams_spill_path": os.path.join(self.directory, "teams_outbox.jsonl"),
+            "metrics_json_path": os.path.join(self.directory, "metrics.json"),
+        }
+        self.settings.update(defaults)
+        self.settings.update(entry.get("settings", {}))
+        unknown = sorted(set(self.settings) - set(sync_core.config))
+        if unknown:
+            raise ValueError(f"Unknown settings in profile {name}: {', '.join(unknown)}")
+        self.env_prefix = f"SYNCTOOL_{name.upper().replace('-', '_')}_"
+
+    def apply(self):
+        """Load the profile into sync_core, in the process that runs it. Returns an error message or None."""
+        os.makedirs(self.directory, exist_ok=True)
+        sync_core.config.update(self.settings)
+        sync_core.load_config_from_env(os.environ, self.env_prefix)
+        return sync_cli.check_settings()
+
+def load_profiles(path):
+    """Read a profile registry. Raises OSError or ValueError."""
+    with open(path) as file:
+        registry = json.load(file)
+    directory = registry.get("directory", "tenants")  # Profile directories go here
+    profiles = [SyncProfile(name, entry, registry.get("defaults", {}), directory)
+                for name, entry in registry.get("profiles", {}).items()]
+    if not profiles:
+        raise ValueError(f"No profiles in {path}")
+    for key in ISOLATED_SETTINGS:  # A shared store would mix watermarks and undo journals
+        owners = {}
+        for profile in profiles:
+            value = profile.settings.get(key)
+            if value and value in owners:
+                raise ValueError(f"Profiles {owners[value]} and {profile.name} both use {key} {value}")
+            owners[value] = profile.name
+    return profiles
+
+def ignore_interrupts():
+    """Pool initializer: Ctrl+C is handled by the orchestrator, which lets runs in progress finish."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+def run_profile(profile, full=False):
+    """Pool task: sync a profile once, logging to its own file. Returns (name, exit code, seconds)."""
+    started = time.monotonic()
+    os.makedirs(profile.directory, exist_ok=True)
+    with open(profile.log_path, "a", encoding="utf-8") as log_file, \
+            contextlib.redirect_stdout(log_file), contextlib.redirect_stderr(log_file):
+        error = profile.apply()
+        if error:
+            sync_cli.log(error)
+            exit_code = sync_cli.EXIT_CONFIG_ERROR
+        else:
+            exit_code = sync_cli.run_once(profile.direction, full or profile.full)
+            if sync_core.teams_notifier is not None:  # Pool processes exit without running atexit handlers
+                sync_core.teams_notifier.close()
+    return profile.name, exit_code, time.monotonic() - started
+
+def orchestrate(profiles, workers, full=False, repeat=False, stop=None):
+    """Sync profiles on a pool of worker processes, at most workers at a time.
+
+    With repeat, each profile runs again interval seconds after its last run started, until
+    stop is set; runs in progress are then waited for. Returns {name: exit code of its last run}.
+    """
+    stop = stop or threading.Event()
+    by_name = {profile.name: profile for profile in profiles}
+    due = {profile.name: time.monotonic() for profile in profiles}
+    running = {}  # Name -> start time
+    finished = queue.Queue()
+    exit_codes = {}
+
+    def failed(name):
+        def callback(error):
+            sync_cli.log(f"{name}: could not run: {error}")
+            finished.put((name, sync_cli.EXIT_SYNC_FAILED, 0.0))
+        return callback
+
+    # Spawned processes start from a clean sync_core; one run per process keeps it that way
+    with multiprocessing.get_context("spawn").Pool(workers, initializer=ignore_interrupts, maxtasksperchild=1) as pool:
+        while running or (due and not stop.is_set()):
+            now = time.monotonic()
+            for name in sorted(due, key=due.get):
+                if stop.is_set() or len(running) >= workers or due[name] > now:
+                    break
+                del due[name]
+                running[name] = now
+                pool.apply_async(run_profile, (by_name[name], full), callback=finished.put, error_callback=failed(name))
+            next_due = min(due.values(), default=now + 1.0)
+            try:
+                name, exit_code, seconds = finished.get(timeout=1.0 if len(running) >= workers else min(1.0, max(0.05, next_due - now)))
+            except queue.Empty:
+                continue
+            started = running.pop(name)
+            exit_codes[name] = exit_code
+            sync_cli.log(f"{name}: exit code {exit_code} after {seconds:.1f}s (log: {by_name[name].log_path})")
+            if repeat:
+                due[name] = started + by_name[name].interval
+    return exit_codes
+
+def overall_exit_code(exit_codes):
+    """The most serious exit code of the runs."""
+    for code in (sync_cli.EXIT_SYNC_FAILED, sync_cli.EXIT_CONFIG_ERROR, sync_cli.EXIT_PARTIAL):
+        if code in exit_codes.values():
+            return code
+    return sync_cli.EXIT_OK
+
+def list_profiles(profiles):
+    print(f"{'profile':<20}{'direction':<20}{'interval':>9}  store")
+    for profile in profiles:
+        print(f"{profile.name:<20}{profile.direction_name:<20}{profile.interval:>9g}  {profile.settings['local_store_path']}")
+    return sync_cli.EXIT_OK
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run many NetSuite / Azure DevOps sync profiles in parallel.")
+    parser.add_argument("--profiles", required=True, help="JSON profile registry.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the profiles.")
+    for command, help_text in (("run", "Sync each profile once."), ("daemon", "Keep syncing each profile every interval seconds.")):
+        runner = commands.add_parser(command, help=help_text)
+        runner.add_argument("names", nargs="*", metavar="PROFILE", help="Profiles to sync (default: all).")
+        runner.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Profiles synced at once (default: one per CPU).")
+        runner.add_argument("--full", action="store_true", help="Full reconcile instead of delta syncs.")
+    runs = commands.add_parser("list-runs", help="List a profile's recent runs that made changes.")
+    runs.add_argument("name", metavar="PROFILE")
+    undo = commands.add_parser("undo", help="Roll back a run of a profile.")
+    undo.add_argument("name", metavar="PROFILE")
+    undo.add_argument("run_id", nargs="?", type=int, help="Run ID from list-runs (default: the latest with changes left to undo).")
+    args = parser.parse_args(argv)
+
+    try:
+        profiles = load_profiles(args.profiles)
+    except (OSError, ValueError) as e:
+        print(f"Could not load profiles: {e}", file=sys.stderr)
+        return sync_cli.EXIT_CONFIG_ERROR
+    if args.command == "list":
+        return list_profiles(profiles)
+    names = [args.name] if args.command in ("list-runs", "undo") else args.names
+    unknown = sorted(set(names) - {profile.name for profile in profiles})
+    if unknown:
+        print(f"Unknown profiles: {', '.join(unknown)}", file=sys.stderr)
+        return sync_cli.EXIT_CONFIG_ERROR
+
+    if args.command in ("list-runs", "undo"):
+        profile = next(profile for profile in profiles if profile.name == args.name)
+        error = profile.apply()
+        if error:
+            print(error, file=sys.stderr)
+            return sync_cli.EXIT_CONFIG_ERROR
+        return sync_cli.list_runs() if args.command == "list-runs" else sync_cli.undo_once(args.run_id)
+
+    stop = threading.Event()
+
+    def request_stop(*_):
+        if stop.is_set():  # A second Ctrl+C abandons the runs in progress; they resume from their checkpoints
+            raise KeyboardInterrupt
+        sync_cli.log("Stopping once the runs in progress finish.")
+        stop.set()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, request_stop)
+    try:
+        exit_codes = orchestrate([profile for profile in profiles if not names or profile.name in names],
+                                 max(1, args.workers), args.full, args.command == "daemon", stop)
+    except KeyboardInterrupt:
+        return sync_cli.EXIT_INTERRUPTED
+    return overall_exit_code(exit_codes)
+
+if __name__ == '__main__':
+    sys.exit(main())
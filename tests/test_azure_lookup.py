@@ -0,0 +1,49 @@
+"""Finding the work items that belong to a set of NetSuite cases."""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import sync_core
+
+class AzureWorkItemsForCasesTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = mock.patch.dict(sync_core.config, {"local_store_path": os.path.join(directory.name, "synctool.db"),
+                                                      "azure_external_id_field": ""})
+        settings.start()
+        self.addCleanup(settings.stop)
+        self.addCleanup(setattr, sync_core, "local_store", None)
+        sync_core.local_store = None
+        self.wiql = []
+        self.read_ids = []
+        for name, replacement in (("query_azure_work_item_ids", self.query), ("iter_azure_work_items_by_ids", self.read)):
+            patcher = mock.patch.object(sync_core, name, replacement)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def query(self, wiql):
+        self.wiql.append(wiql)
+        return [7]  # Whatever the title or external ID finds
+
+    def read(self, ids):
+        self.read_ids.extend(ids)
+        return iter(())
+
+    def test_linked_work_items_are_read_by_id(self):
+        sync_core.get_store().link("1001", 42)
+        sync_core.get_store().link("1002", 43)
+        list(sync_core.iter_azure_work_items_for_cases([sync_core.NetSuiteCase(id="1001", title="Printer jams")]))
+        self.assertEqual(len(self.wiql), 1)
+        self.assertIn("[System.Title] IN ('Printer jams')", self.wiql[0])
+        self.assertEqual(self.read_ids, [7, 42])  # The work item 42 keeps its link however it is titled now
+
+    def test_an_id_found_both_ways_is_read_once(self):
+        sync_core.get_store().link("1001", 7)
+        list(sync_core.iter_azure_work_items_for_cases([sync_core.NetSuiteCase(id="1001", title="Printer jams")]))
+        self.assertEqual(self.read_ids, [7])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""Which side wins when a linked pair disagrees in a bidirectional sync."""
+import unittest
+from unittest import mock
+
+import sync_core
+
+@mock.patch.dict(sync_core.config, {"conflict_policy": "last_writer_wins", "netsuite_timezone": "America/Los_Angeles"})
+class ResolveConflictTest(unittest.TestCase):
+
+    def winner(self, case_modified, item_modified, owners=None):
+        return sync_core.resolve_conflict("status", sync_core.NetSuiteCase(id="1001", modified=case_modified),
+                                          sync_core.AzureWorkItem(id=42, modified=item_modified), owners or {})
+
+    def test_netsuite_times_without_an_offset_are_local(self):
+        # 10:00 in Los Angeles is 17:00 UTC
+        self.assertEqual(self.winner("2026-07-01T10:00:00", "2026-07-01T16:59:00Z"), "netsuite")
+        self.assertEqual(self.winner("2026-07-01T10:00:00", "2026-07-01T17:01:00Z"), "azure")
+
+    def test_times_with_offsets_are_compared_as_instants(self):
+        self.assertEqual(self.winner("2026-07-01T17:00:00Z", "2026-07-01T18:30:00+02:00"), "netsuite")
+        self.assertEqual(self.winner("2026-07-01T17:00:00Z", "2026-07-01T12:30:00-05:00"), "azure")
+
+    def test_owners_break_ties_and_fill_in_missing_times(self):
+        self.assertEqual(self.winner("2026-07-01T10:00:00", "2026-07-01T17:00:00Z", {"status": "azure"}), "azure")
+        self.assertEqual(self.winner(None, "2026-07-01T17:00:00Z", {"status": "azure"}), "azure")
+        self.assertEqual(self.winner("2026-07-01T10:00:00", None), "netsuite")
+
+    def test_source_of_truth_ignores_times(self):
+        with mock.patch.dict(sync_core.config, {"conflict_policy": "source_of_truth"}):
+            self.assertEqual(self.winner("2026-07-01T10:00:00", "2026-07-01T20:00:00Z"), "netsuite")
+            self.assertEqual(self.winner("2026-07-01T20:00:00Z", "2026-07-01T10:00:00Z", {"status": "azure"}), "azure")
+
+if __name__ == "__main__":
+    unittest.main()
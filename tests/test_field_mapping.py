@@ -0,0 +1,58 @@
+"""FieldMapping: compiling mapping documents, and the checks that every table can be mapped back."""
+import unittest
+
+import sync_core
+
+def mapping(values, reverse=None, types=None):
+    spec = {"values": values}
+    if reverse is not None:
+        spec["reverse"] = reverse
+    if types is not None:
+        spec["types"] = types
+    return {"fields": {"status": spec}}
+
+class FieldMappingTest(unittest.TestCase):
+
+    def test_default_mapping_round_trips(self):
+        fields = sync_core.FieldMapping(sync_core.DEFAULT_MAPPING)
+        self.assertEqual(fields.to_netsuite_value("status", "Bug", "Resolved"), "Fixed")
+        self.assertEqual(fields.to_azure_value("status", "Bug", "Fixed"), "Resolved")
+        self.assertEqual(fields.to_netsuite_value("status", "User Story", "Resolved"), "Completed")
+        self.assertEqual(fields.to_azure_value("status", None, "In Progress"), "Active")
+
+    def test_two_azure_values_for_one_netsuite_value_are_rejected(self):
+        with self.assertRaisesRegex(ValueError, r"status mapping \(base tables\) is not invertible: Azure values 'Active' and 'Doing' both map to 'In Progress'"):
+            sync_core.FieldMapping(mapping({"New": "Open", "Active": "In Progress", "Doing": "In Progress"}))
+
+    def test_a_reverse_entry_chooses_one(self):
+        fields = sync_core.FieldMapping(mapping({"New": "Open", "Active": "In Progress", "Doing": "In Progress"},
+                                                reverse={"In Progress": "Doing"}))
+        self.assertEqual(fields.to_azure_value("status", None, "In Progress"), "Doing")
+        self.assertEqual(fields.to_netsuite_value("status", None, "Active"), "In Progress")
+
+    def test_a_reverse_entry_must_map_back(self):
+        with self.assertRaisesRegex(ValueError, r"reverse entry 'In Progress' -> 'New' does not map back \(base tables\)"):
+            sync_core.FieldMapping(mapping({"New": "Open", "Active": "In Progress", "Doing": "In Progress"},
+                                           reverse={"In Progress": "New"}))
+
+    def test_a_type_overlay_is_checked_too(self):
+        with self.assertRaisesRegex(ValueError, r"status mapping \(Bug\) is not invertible"):
+            sync_core.FieldMapping(mapping({"New": "Open", "Resolved": "Resolved"}, types={"Bug": {"New": "Resolved"}}))
+
+    def test_work_item_types(self):
+        fields = sync_core.FieldMapping(sync_core.DEFAULT_MAPPING)
+        self.assertEqual(fields.work_item_type("Bug"), "Bug")
+        self.assertEqual(fields.work_item_type("Enhancement"), "Task")
+        document = dict(mapping({"New": "Open"}), work_item_types={"values": {"Enhancement": "Product Backlog Item"}, "default": "Issue"})
+        fields = sync_core.FieldMapping(document)
+        self.assertEqual(fields.work_item_type("Enhancement"), "Product Backlog Item")
+        self.assertEqual(fields.work_item_type("Bug"), "Issue")
+        with self.assertRaisesRegex(ValueError, "work_item_types needs a default"):
+            sync_core.FieldMapping(dict(mapping({"New": "Open"}), work_item_types={"values": {"Bug": "Bug"}}))
+
+    def test_status_is_required(self):
+        with self.assertRaisesRegex(ValueError, "must define the status field"):
+            sync_core.FieldMapping({"fields": {}})
+
+if __name__ == "__main__":
+    unittest.main()
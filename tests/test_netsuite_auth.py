@@ -0,0 +1,55 @@
+"""NetSuiteTokenAuth: OAuth 1.0a signatures for NetSuite token-based authentication."""
+import base64
+import hashlib
+import hmac
+import unittest
+from unittest import mock
+
+import requests
+
+import sync_core
+
+def sign(auth, method, url, timestamp=137131202, nonce="chapoH"):
+    request = requests.Request(method, url).prepare()
+    with mock.patch.object(sync_core.time, "time", return_value=timestamp), \
+            mock.patch.object(sync_core.secrets, "token_hex", return_value=nonce):
+        return auth(request).headers["Authorization"]
+
+def header_params(header):
+    assert header.startswith("OAuth ")
+    return dict((name, value.strip('"')) for name, value in (part.split("=", 1) for part in header[len("OAuth "):].split(", ")))
+
+class NetSuiteTokenAuthTest(unittest.TestCase):
+
+    def test_rfc_5849_example(self):
+        # RFC 5849 section 1.2, which signs with HMAC-SHA1 and leaves out oauth_version
+        auth = sync_core.NetSuiteTokenAuth("x", "dpf43f3p2l4k3l03", "kd94hf93k423kf44", "nnch734d00sl2jdk", "pfkkdhi9sl3r4s00")
+        auth.signer = hmac.new(b"kd94hf93k423kf44&pfkkdhi9sl3r4s00", digestmod=hashlib.sha1)
+        auth.params = (("oauth_consumer_key", "dpf43f3p2l4k3l03"), ("oauth_token", "nnch734d00sl2jdk"),
+                       ("oauth_signature_method", "HMAC-SHA1"))
+        header = sign(auth, "GET", "http://photos.example.net/photos?file=vacation.jpg&size=original")
+        self.assertEqual(header_params(header)["oauth_signature"], "MdpQcU8iPSUjWoN%2FUDMsK2sui9I%3D")
+
+    def test_hmac_sha256_signature(self):
+        auth = sync_core.NetSuiteTokenAuth("1234567-sb1", "ck", "cs&1", "tk", "ts 2")
+        header = sign(auth, "post", "https://1234567-SB1.Suitetalk.API.netsuite.com:443/services/rest/query/v1/suiteql?limit=1000&q=a b")
+        params = header_params(header)
+        self.assertEqual(params["realm"], "1234567_SB1")
+        self.assertEqual(params["oauth_signature_method"], "HMAC-SHA256")
+        self.assertEqual((params["oauth_timestamp"], params["oauth_nonce"]), ("137131202", "chapoH"))
+        base_string = ("POST&https%3A%2F%2F1234567-sb1.suitetalk.api.netsuite.com%2Fservices%2Frest%2Fquery%2Fv1%2Fsuiteql&"
+                       "limit%3D1000%26oauth_consumer_key%3Dck%26oauth_nonce%3DchapoH%26oauth_signature_method%3DHMAC-SHA256"
+                       "%26oauth_timestamp%3D137131202%26oauth_token%3Dtk%26oauth_version%3D1.0%26q%3Da%2520b")
+        digest = hmac.new(b"cs%261&ts%202", base_string.encode(), hashlib.sha256).digest()
+        self.assertEqual(params["oauth_signature"], sync_core.oauth_quote(base64.b64encode(digest).decode()))
+
+    def test_every_request_gets_a_fresh_nonce(self):
+        auth = sync_core.NetSuiteTokenAuth("1234567", "ck", "cs", "tk", "ts")
+        url = "https://1234567.suitetalk.api.netsuite.com/services/rest/record/v1/supportCase/1"
+        first = header_params(auth(requests.Request("GET", url).prepare()).headers["Authorization"])
+        second = header_params(auth(requests.Request("GET", url).prepare()).headers["Authorization"])
+        self.assertNotEqual(first["oauth_nonce"], second["oauth_nonce"])
+        self.assertNotEqual(first["oauth_signature"], second["oauth_signature"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+"""prefetch: reading ahead on a background thread."""
+import itertools
+import threading
+import unittest
+
+import sync_core
+
+class PrefetchTest(unittest.TestCase):
+
+    def test_items_and_errors_come_through_in_order(self):
+        def items():
+            yield from range(5)
+            raise ValueError("page 2 failed")
+        prefetched = sync_core.prefetch(items(), buffer_size=2)
+        self.assertEqual(list(itertools.islice(prefetched, 5)), list(range(5)))
+        with self.assertRaisesRegex(ValueError, "page 2 failed"):
+            next(prefetched)
+
+    def test_producer_stops_when_the_consumer_does(self):
+        closed = threading.Event()
+
+        def endless():
+            try:
+                yield from itertools.count()
+            finally:
+                closed.set()
+        prefetched = sync_core.prefetch(endless(), buffer_size=3)
+        self.assertEqual(next(prefetched), 0)
+        prefetched.close()  # As when the loop over it raises
+        self.assertTrue(closed.wait(5), "the producer is still blocked on the full buffer")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""RecordMatcher: pairing records by case ID, exact title and similar title."""
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import sync_core
+
+def matcher(*titles, **external_ids):
+    index = sync_core.RecordMatcher(sync_core.azure_work_item_case_id)
+    for work_item_id, title in enumerate(titles, 1):
+        index.add(sync_core.AzureWorkItem(id=work_item_id, title=title, external_id=external_ids.get(title)))
+    return index
+
+def match_id(index, title, key=None):
+    with contextlib.redirect_stdout(io.StringIO()):  # Fuzzy matches are reported
+        record = index.match(title, key)
+    return None if record is None else record['id']
+
+@mock.patch.dict(sync_core.config, {"fuzzy_match_threshold": 0.8, "fuzzy_match_candidates": 50})
+class RecordMatcherTest(unittest.TestCase):
+
+    def test_key_before_title(self):
+        index = matcher("Printer jams", "Scanner jams", **{"Scanner jams": "17"})
+        self.assertEqual(match_id(index, "Printer jams", key=17), 2)
+        self.assertEqual(match_id(index, "printer  JAMS"), 1)
+
+    def test_first_record_wins_an_exact_title(self):
+        self.assertEqual(match_id(matcher("Printer jams", "Printer jams"), "Printer jams"), 1)
+
+    def test_similar_titles_match(self):
+        index = matcher("Printer jams on tray 2 of the office printer", "Login page times out for EU users")
+        self.assertEqual(match_id(index, "Printer jams on tray 2 of the office printers"), 1)
+
+    def test_titles_differing_in_a_number_never_match(self):
+        index = matcher("Printer jams on tray 2 of the office printer", "Release 2.1 fails to install on Windows")
+        self.assertIsNone(match_id(index, "Printer jams on tray 4 of the office printer"))
+        self.assertIsNone(match_id(index, "Release 2.2 fails to install on Windows"))
+        self.assertIsNone(match_id(index, "Printer jams on tray of the office printer"))  # A missing number counts too
+
+    def test_a_tie_matches_nothing(self):
+        self.assertEqual(match_id(matcher("Login page times out for group a"), "Login page times out for group c"), 1)
+        self.assertIsNone(match_id(matcher("Login page times out for group a", "Login page times out for group b"),
+                                   "Login page times out for group c"))
+
+    def test_paired_records_are_skipped(self):
+        index = matcher("Printer jams on tray 2 of the office printer", **{"Printer jams on tray 2 of the office printer": "5"})
+        self.assertIsNone(match_id(index, "Printer jams on tray 2 of the office printer", key=6))
+        self.assertIsNone(match_id(index, "Printer jams on tray 2 of the office printers", key=6))
+        self.assertEqual(match_id(index, "Printer jams on tray 2 of the office printers", key=5), 1)
+
+    def test_a_zero_threshold_turns_fuzzy_matching_off(self):
+        with mock.patch.dict(sync_core.config, {"fuzzy_match_threshold": 0}):
+            self.assertIsNone(match_id(matcher("Printer jams on tray 2 of the office printer"), "Printer jams on tray 2 of the office printers"))
+
+if __name__ == "__main__":
+    unittest.main()
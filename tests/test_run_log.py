@@ -0,0 +1,42 @@
+"""The sync log keeps a fixed order when records are written on several threads."""
+import random
+import threading
+import time
+import unittest
+from unittest import mock
+
+import sync_core
+
+def slow_log(entry):
+    time.sleep(random.random() / 200)
+    sync_core.record_log(entry)
+
+class RunLogTest(unittest.TestCase):
+
+    def setUp(self):
+        sync_core.sync_log.clear()
+        self.addCleanup(sync_core.sync_log.clear)
+
+    @mock.patch.dict(sync_core.config, {"netsuite_max_workers": 4})
+    def test_pool_entries_follow_item_order(self):
+        sync_core.run_in_pool("netsuite", slow_log, range(40))
+        self.assertEqual(sync_core.sync_log, list(range(40)))
+
+    def test_collected_entries_stay_out_of_the_log(self):
+        sync_core.record_log("before")
+        entries = []
+        thread = threading.Thread(target=lambda: entries.extend(sync_core.collect_log_entries(slow_log, "flush")))
+        thread.start()
+        thread.join()
+        self.assertEqual(entries, ["flush"])
+        self.assertEqual(sync_core.sync_log, ["before"])
+
+    def test_collections_nest(self):
+        def outer():
+            self.assertEqual(sync_core.collect_log_entries(slow_log, "inner"), ["inner"])
+            slow_log("outer")
+        self.assertEqual(sync_core.collect_log_entries(outer), ["outer"])
+        self.assertEqual(sync_core.sync_log, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Delta sync watermarks and the NetSuite time zone."""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+import sync_core
+
+class WatermarkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = mock.patch.dict(sync_core.config, {"local_store_path": os.path.join(directory.name, "synctool.db"),
+                                                      "delta_overlap_seconds": 300, "netsuite_timezone": "UTC"})
+        settings.start()
+        self.addCleanup(settings.stop)
+        self.addCleanup(setattr, sync_core, "local_store", None)
+        sync_core.local_store = None
+        sync_core.run_errors.clear()
+        self.addCleanup(sync_core.run_errors.clear)
+
+class WatermarkTrackerTest(WatermarkTestCase):
+
+    previous = {"synced_at": "2026-07-01T12:00:00+00:00", "seen": {"7": "2026-07-01T11:58:00Z"}}
+
+    def run_delta(self, records):
+        sync_core.save_watermark("netsuite_to_azure", self.previous)
+        tracker = sync_core.WatermarkTracker("netsuite_to_azure")
+        return tracker, [record['id'] for record in tracker.track(records)]
+
+    def test_records_already_seen_are_skipped(self):
+        _, synced = self.run_delta([{"id": 7, "modified": "2026-07-01T11:58:00Z"}, {"id": 8, "modified": "2026-07-01T11:59:00Z"}])
+        self.assertEqual(synced, [8])
+
+    def test_commit_keeps_the_previous_watermark_after_errors(self):
+        tracker, _ = self.run_delta([{"id": 8, "modified": datetime.now(timezone.utc).isoformat()}])
+        sync_core.run_errors.append("Update Error: 503")
+        tracker.commit()
+        self.assertEqual(sync_core.load_watermark("netsuite_to_azure"), self.previous)
+
+    def test_commit_keeps_the_previous_watermark_after_errors_before_a_resume(self):
+        tracker, _ = self.run_delta([])
+        tracker.commit(earlier_errors=2)
+        self.assertEqual(sync_core.load_watermark("netsuite_to_azure"), self.previous)
+
+    def test_commit_without_errors_stops_at_the_newest_record(self):
+        tracker, _ = self.run_delta([{"id": 8, "modified": "2026-07-01T12:30:00Z"}])
+        tracker.commit()
+        self.assertEqual(sync_core.load_watermark("netsuite_to_azure")["synced_at"], "2026-07-01T12:30:00+00:00")
+
+class NetSuiteTimeZoneTest(WatermarkTestCase):
+
+    def setUp(self):
+        super().setUp()
+        sync_core.config["netsuite_timezone"] = "America/Los_Angeles"
+
+    def test_netsuite_times_are_read_as_utc(self):
+        self.assertEqual(sync_core.netsuite_time_to_utc("2026-07-01 10:00:00"), "2026-07-01T17:00:00Z")  # PDT
+        self.assertEqual(sync_core.netsuite_time_to_utc("2026-01-15T10:00:00"), "2026-01-15T18:00:00Z")  # PST
+        self.assertEqual(sync_core.netsuite_time_to_utc("2026-07-01T10:00:00+02:00"), "2026-07-01T08:00:00Z")
+        self.assertIsNone(sync_core.netsuite_time_to_utc(None))
+
+    def test_since_is_queried_in_the_netsuite_time_zone(self):
+        modified = sync_core.netsuite_time_to_utc("2026-07-01 10:00:00")
+        sync_core.save_watermark("netsuite_to_azure", {"synced_at": sync_core.parse_timestamp(modified).isoformat(), "seen": {}})
+        since = sync_core.WatermarkTracker("netsuite_to_azure").since
+        self.assertEqual(since, datetime(2026, 7, 1, 17, tzinfo=timezone.utc) - timedelta(seconds=300))
+        with mock.patch.object(sync_core, "iter_case_pages", return_value=iter(())) as pages:
+            list(sync_core.iter_netsuite_cases(modified_since=since))
+        conditions = pages.call_args[0][1]
+        self.assertEqual(conditions, ["sc.lastmodifieddate >= TO_TIMESTAMP('2026-07-01 09:55:00', 'YYYY-MM-DD HH24:MI:SS')"])
+
+if __name__ == "__main__":
+    unittest.main()
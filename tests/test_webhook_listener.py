@@ -0,0 +1,54 @@
+"""EventCoalescer: dropping redelivered events and collapsing bursts into one sync."""
+import threading
+import time
+import unittest
+
+import webhook_listener
+
+def case(case_id, status):
+    return {"id": case_id, "status": status}
+
+class EventCoalescerTest(unittest.TestCase):
+
+    def test_redelivered_events_are_dropped(self):
+        coalescer = webhook_listener.EventCoalescer(60, None)
+        self.assertTrue(coalescer.submit("netsuite", case(1001, "Open"), "event-1"))
+        self.assertFalse(coalescer.submit("netsuite", case(1001, "Open"), "event-1"))
+        self.assertTrue(coalescer.submit("netsuite", case(1001, "Closed"), "event-2"))
+
+    def test_only_the_latest_event_ids_are_remembered(self):
+        coalescer = webhook_listener.EventCoalescer(60, None, remembered_event_ids=2)
+        for event_id in ("a", "b", "c"):
+            coalescer.submit("azure", {"id": 42}, event_id)
+        self.assertTrue(coalescer.submit("azure", {"id": 42}, "a"))
+        self.assertFalse(coalescer.submit("azure", {"id": 42}, "c"))
+
+    def test_a_burst_becomes_one_sync_of_the_latest_state(self):
+        batches = []
+        delivered = threading.Event()
+
+        def handler(due_records):
+            batches.append(due_records)
+            delivered.set()
+        coalescer = webhook_listener.EventCoalescer(0.2, handler)
+        for event_id, status in enumerate(("Open", "In Progress", "Closed")):
+            coalescer.submit("netsuite", case(1001, status), event_id)
+        coalescer.submit("azure", {"id": 1001, "status": "Active"}, "azure-1")  # Same ID, other system
+        stop = threading.Event()
+        threading.Thread(target=coalescer.run, args=(stop,), daemon=True).start()
+        try:
+            self.assertTrue(delivered.wait(5))
+            time.sleep(0.3)  # Nothing else is due
+        finally:
+            stop.set()
+        self.assertEqual(batches, [[("netsuite", case(1001, "Closed")), ("azure", {"id": 1001, "status": "Active"})]])
+
+    def test_a_later_event_keeps_the_first_due_time(self):
+        coalescer = webhook_listener.EventCoalescer(0.1, None)
+        coalescer.submit("netsuite", case(1001, "Open"))
+        time.sleep(0.15)
+        coalescer.submit("netsuite", case(1001, "Closed"))
+        self.assertEqual(coalescer.take_due(), [("netsuite", case(1001, "Closed"))])
+
+if __name__ == "__main__":
+    unittest.main()
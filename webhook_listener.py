@@ -0,0 +1,230 @@
+"""Webhook listener for push syncs between NetSuite and Azure DevOps.
+
+Azure DevOps service hooks (workitem.created / workitem.updated) are posted to /azure and
+NetSuite events (e.g. from a user event script) to /netsuite. Each event is turned into a
+targeted sync of that one record. Redelivered events are dropped, and a burst of events for
+the same record within webhook_coalesce_seconds collapses into a single write.
+
+    python webhook_listener.py serve --config synctool.json
+    python webhook_listener.py send-azure 42 "Login page crashes" Closed
+    python webhook_listener.py send-netsuite 1001 "Login page crashes" Closed
+"""
+import argparse
+import hmac
+import json
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import sync_core
+import sync_cli
+
+AZURE_EVENT_TYPES = {"workitem.created", "workitem.updated"}
+
+def parse_azure_event(payload):
+    """Return (event_id, normalized work item) for an Azure DevOps service hook payload."""
+    if payload.get("eventType") not in AZURE_EVENT_TYPES:
+        raise ValueError(f"Unsupported Azure event type: {payload.get('eventType')}")
+    resource = payload["resource"]
+    if "revision" in resource:  # workitem.updated carries the full new revision
+        revision = resource["revision"]
+        item = {"id": resource.get("workItemId", revision.get("id")), "rev": revision.get("rev"), "fields": revision["fields"]}
+    else:  # workitem.created carries the work item itself
+        item = {"id": resource["id"], "rev": resource.get("rev"), "fields": resource["fields"]}
+    return payload.get("id"), sync_core.normalize_azure_work_item(item)
+
+def parse_netsuite_event(payload):
+    """Return (event_id, normalized case) for a NetSuite event: {"eventId": ..., "record": {...}}."""
+    record = payload.get("record", payload)
+    status = record["status"]
+    case = sync_core.NetSuiteCase(
+        id=str(record["id"]),
+        title=record["title"],
+        status=sync_core.intern_value(status["name"] if isinstance(status, dict) else status),
+        type=sync_core.intern_value(record.get("type", "Enhancement")),
+        modified=sync_core.netsuite_time_to_utc(record.get("lastModifiedDate")),
+    )
+    for field in sync_core.get_mapping().extra_fields:  # Other mapped fields, if the event carries them
+        if record.get(field.netsuite_key) is not None:
+            case[field.name] = sync_core.intern_value(sync_core.netsuite_field_value(record[field.netsuite_key]))
+    return payload.get("eventId"), case
+
+class EventCoalescer:
+    """Collects events per record and hands them to a handler once their window has passed.
+
+    A later event for the same record replaces the pending one but keeps its due time, so
+    a burst of edits becomes one sync of the latest state. Event IDs already seen are
+    dropped, which covers redelivery by the sender.
+    """
+
+    def __init__(self, window, handler, remembered_event_ids=10000):
+        self.window = window
+        self.handler = handler
+        self.pending = OrderedDict()  # (system, record ID) -> (due time, record), in due order
+        self.seen_ids = set()
+        self.seen_order = deque()
+        self.remembered_event_ids = remembered_event_ids
+        self.condition = threading.Condition()
+
+    def submit(self, system, record, event_id=None):
+        """Queue an event. Returns False if it is a duplicate delivery."""
+        with self.condition:
+            if event_id is not None:
+                if event_id in self.seen_ids:
+                    return False
+                self.seen_ids.add(event_id)
+                self.seen_order.append(event_id)
+                if len(self.seen_order) > self.remembered_event_ids:
+                    self.seen_ids.discard(self.seen_order.popleft())
+
+            key = (system, str(record['id']))
+            due = self.pending[key][0] if key in self.pending else time.monotonic() + self.window
+            self.pending[key] = (due, record)
+            self.condition.notify()
+            return True
+
+    def take_due(self):
+        now = time.monotonic()
+        due_records = []
+        while self.pending:
+            key, (due, record) = next(iter(self.pending.items()))
+            if due > now:
+                break
+            del self.pending[key]
+            due_records.append((key[0], record))
+        return due_records
+
+    def run(self, stop):
+        """Deliver due events to the handler until stop is set."""
+        while not stop.is_set():
+            with self.condition:
+                due_records = self.take_due()
+                if not due_records:
+                    timeout = next(iter(self.pending.values()))[0] - time.monotonic() if self.pending else 1.0
+                    self.condition.wait(max(0.01, min(timeout, 1.0)))
+                    continue
+            try:
+                self.handler(due_records)
+            except Exception as e:
+                sync_cli.log(f"Push sync failed: {e}")
+
+def apply_events(due_records):
+    """Targeted sync of the records named by a set of coalesced events."""
+    sync_core.run_record_sync(
+        netsuite_cases=[record for system, record in due_records if system == "netsuite"],
+        azure_work_items=[record for system, record in due_records if system == "azure"])
+    for entry in sync_core.sync_log:
+        sync_cli.log(entry)
+
+def make_handler(coalescer):
+    class WebhookHandler(BaseHTTPRequestHandler):
+        parsers = {"/azure": ("azure", parse_azure_event), "/netsuite": ("netsuite", parse_netsuite_event)}
+
+        def do_POST(self):
+            if self.path not in self.parsers:
+                return self.reply(404, "Unknown endpoint")
+            secret = sync_core.config["webhook_secret"]
+            if secret and not hmac.compare_digest(self.headers.get("X-SyncTool-Secret", ""), secret):
+                return self.reply(401, "Bad secret")
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                system, parse = self.parsers[self.path]
+                event_id, record = parse(payload)
+            except (ValueError, KeyError, TypeError) as e:
+                return self.reply(400, f"Bad event: {e}")
+            if coalescer.submit(system, record, event_id):
+                return self.reply(202, "Queued")
+            return self.reply(200, "Duplicate")
+
+        def reply(self, code, message):
+            body = message.encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Events are logged when they are applied
+
+    return WebhookHandler
+
+def serve(host, port, window, stop=None):
+    """Run the listener until stop is set (or forever). Returns the server once it is listening."""
+    stop = stop or threading.Event()
+    coalescer = EventCoalescer(window, apply_events)
+    server = ThreadingHTTPServer((host, port), make_handler(coalescer))
+    threading.Thread(target=coalescer.run, args=(stop,), daemon=True).start()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def shutdown_when_stopped():
+        stop.wait()
+        server.shutdown()
+    threading.Thread(target=shutdown_when_stopped, daemon=True).start()
+    return server
+
+# Stub event sender, for trying the listener locally without real service hooks
+def azure_stub_event(work_item_id, title, state, event_type="workitem.updated"):
+    fields = {"System.Title": title, "System.State": state}
+    if event_type == "workitem.created":
+        resource = {"id": work_item_id, "rev": 1, "fields": fields}
+    else:
+        resource = {"workItemId": work_item_id, "revision": {"id": work_item_id, "rev": 2, "fields": fields}}
+    return {"id": str(uuid.uuid4()), "eventType": event_type, "resource": resource}
+
+def netsuite_stub_event(case_id, title, status):
+    return {"eventId": str(uuid.uuid4()), "record": {"id": case_id, "title": title, "status": {"name": status}}}
+
+def send_stub_event(url, payload, secret=''):
+    headers = {"X-SyncTool-Secret": secret} if secret else {}
+    response = requests.post(url, json=payload, headers=headers, timeout=10)
+    return response.status_code, response.text
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push sync listener for Azure DevOps and NetSuite events.")
+    parser.add_argument("--config", help="JSON file of settings.")
+    parser.add_argument("--url", help="Listener base URL for the send commands (default: from settings).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("serve", help="Run the listener.")
+    for system, help_text in (("azure", "Send a stub Azure DevOps workitem.updated event."),
+                              ("netsuite", "Send a stub NetSuite case event.")):
+        sender = commands.add_parser(f"send-{system}", help=help_text)
+        sender.add_argument("id")
+        sender.add_argument("title")
+        sender.add_argument("status")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        error = sync_cli.configure(args)
+        if error:
+            print(error, file=sys.stderr)
+            return sync_cli.EXIT_CONFIG_ERROR
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        server = serve(sync_core.config["webhook_host"], sync_core.config["webhook_port"],
+                       sync_core.config["webhook_coalesce_seconds"], stop)
+        sync_cli.log(f"Listening on http://{server.server_address[0]}:{server.server_address[1]}/azure and /netsuite")
+        stop.wait()
+        sync_cli.log("Stopping.")
+        return sync_cli.EXIT_OK
+
+    if args.config:
+        sync_core.load_config_file(args.config)
+    base_url = args.url or f"http://{sync_core.config['webhook_host']}:{sync_core.config['webhook_port']}"
+    if args.command == "send-azure":
+        payload = azure_stub_event(int(args.id), args.title, args.status)
+    else:
+        payload = netsuite_stub_event(args.id, args.title, args.status)
+    status_code, text = send_stub_event(f"{base_url}/{args.command[len('send-'):]}", payload, sync_core.config["webhook_secret"])
+    print(f"{status_code} {text}")
+    return sync_cli.EXIT_OK if status_code < 300 else sync_cli.EXIT_SYNC_FAILED
+
+if __name__ == '__main__':
+    sys.exit(main())